@@ -1,16 +1,19 @@
 from __future__ import annotations
 
+import html
 import json
 import os
 from datetime import datetime
 from pathlib import Path
-from typing import Dict
+from typing import Dict, List
 
 import streamlit as st
 from dotenv import load_dotenv
 
-from core.config import list_dealers, load_dealer_config
-from core.crm import read_mock_leads, clear_mock_leads
+from core.config import CONFIG_DIR, list_dealers, load_dealer_config
+from core.crm import CRM_LOG_PATH, read_mock_leads, clear_mock_leads
+from core.eventlog import tail_jsonl
+from core.schema import DealershipConfig
 from sms_agent.agent import run_sms_turn, clear_agent_cache
 import requests
 import streamlit.components.v1 as components
@@ -18,9 +21,131 @@ import streamlit.components.v1 as components
 LOG_PATH = Path(__file__).resolve().parent / "data" / "voice_logs.jsonl"
 PUBLIC_BASE_URL = os.getenv("PUBLIC_BASE_URL", "").rstrip("/")
 API_BASE_URL = os.getenv("PUBLIC_API_URL", "http://localhost:8000").rstrip("/")
+TRANSCRIPT_REFRESH_S = float(os.getenv("DASHBOARD_TRANSCRIPT_REFRESH_S", "10"))
+RECENT_CALL_EVENTS = 5
 
 load_dotenv()
 
+
+# Reruns happen on every widget interaction, so file reads and HTTP calls go through Streamlit's caches.
+# File-backed entries are keyed on the file's (mtime, size): edits from other processes show up on
+# the next rerun, and "Save Config" / "Clear Mock CRM" also clear them explicitly.
+def file_version(path: Path) -> tuple:
+    try:
+        stat = path.stat()
+    except OSError:
+        return (0, 0)
+    return (stat.st_mtime_ns, stat.st_size)
+
+
+@st.cache_data(ttl=30, show_spinner=False)
+def cached_dealers() -> List[str]:
+    return list_dealers()
+
+
+# Keyed on (mtime, size): only the newest version matters, so keep a few entries, not one per file change.
+@st.cache_data(max_entries=16, show_spinner=False)
+def cached_config(dealer_id: str, version: tuple) -> DealershipConfig:
+    return load_dealer_config(dealer_id)
+
+
+@st.cache_data(max_entries=4, show_spinner=False)
+def cached_leads(limit: int, version: tuple) -> List[Dict]:
+    return read_mock_leads(limit=limit)
+
+
+@st.cache_data(max_entries=4, show_spinner=False)
+def recent_voice_events(limit: int, version: tuple) -> List[Dict]:
+    return tail_jsonl(LOG_PATH, limit)
+
+
+@st.cache_resource
+def http_session() -> requests.Session:
+    # One pooled session per server process; keeps connections to the API warm across reruns.
+    return requests.Session()
+
+
+@st.cache_data(ttl=TRANSCRIPT_REFRESH_S, show_spinner=False)
+def fetch_call(call_id: str) -> Dict:
+    """Call detail and transcript lines from the API; errors raise, so they are never cached."""
+    session = http_session()
+    detail = session.get(f"{API_BASE_URL}/ultravox/calls/{call_id}", timeout=10)
+    resp = session.get(f"{API_BASE_URL}/ultravox/calls/{call_id}/messages", timeout=10)
+    if resp.status_code >= 400:
+        raise requests.HTTPError(resp.text)
+    payload = resp.json()
+    messages = (payload.get("messages") if isinstance(payload, dict) else payload) or []
+    cleaned = []
+    for msg in messages:
+        role = msg.get("role") or msg.get("sender") or "unknown"
+        text = msg.get("text") or msg.get("content") or msg.get("message") or ""
+        if text:
+            cleaned.append(f"{role}: {text}")
+    return {
+        "detail": detail.json() if detail.status_code < 400 else None,
+        "messages": messages,
+        "lines": cleaned,
+    }
+
+
+def render_waterfall(spans: List[Dict]) -> str:
+    root_start = min(span["start"] for span in spans)
+    total = max((span["end"] or span["start"]) - root_start for span in spans) or 1e-9
+    depth: Dict[str, int] = {}
+    rows = []
+    for span in spans:
+        level = depth[span["parent_id"]] + 1 if span["parent_id"] in depth else 0
+        depth[span["span_id"]] = level
+        left = (span["start"] - root_start) / total * 100
+        width = min(max(span["duration_ms"] / 1000 / total * 100, 0.4), 100 - left)
+        color = "#ff6b6b" if span["status"] == "error" else "var(--accent)"
+        rows.append(
+            f"""<div class="wf-row">
+  <div class="wf-label" style="padding-left:{level * 14}px">{html.escape(span["name"])}</div>
+  <div class="wf-track"><div class="wf-bar" style="left:{left:.2f}%; width:{width:.2f}%; background:{color};"></div></div>
+  <div class="wf-ms">{span["duration_ms"]:.1f} ms</div>
+</div>"""
+        )
+    return f"<div class='wf'><div class='muted'>trace {spans[0]['trace_id']}</div>{''.join(rows)}</div>"
+
+
+def recent_calls_panel() -> None:
+    entries = recent_voice_events(RECENT_CALL_EVENTS, file_version(LOG_PATH))
+    if not entries:
+        st.markdown("<span class='muted'>No voice logs yet.</span>", unsafe_allow_html=True)
+        return
+    for position, entry in enumerate(reversed(entries)):
+        # Highlight summary if available in webhook payloads
+        if entry.get("event") == "ultravox_webhook":
+            call = entry.get("payload", {}).get("call", {})
+            summary = call.get("summary") or call.get("shortSummary")
+            if summary:
+                st.markdown(f"**Summary:** {summary}")
+        st.json(entry, expanded=False)
+        call_id = entry.get("call_id")
+        # Transcripts are fetched only for the calls someone opens.
+        if call_id and st.toggle(f"Transcript for {call_id}", key=f"transcript_{position}_{call_id}"):
+            try:
+                call = fetch_call(call_id)
+            except requests.RequestException as exc:
+                st.error(f"Could not load transcript from the FastAPI server on :8000 ({exc})")
+                continue
+            detail = call["detail"]
+            if detail:
+                summary = detail.get("summary") or detail.get("shortSummary")
+                if summary:
+                    st.markdown(f"**Summary:** {summary}")
+                if detail.get("endReason"):
+                    st.markdown(f"**End Reason:** {detail['endReason']}")
+                with st.expander("Raw Call Detail"):
+                    st.json(detail)
+            if call["lines"]:
+                st.text("\\n".join(call["lines"]))
+            else:
+                st.markdown("_No transcript messages yet. Try Refresh or wait for call end._")
+                st.json(call["messages"])
+
+
 st.set_page_config(
     page_title="DealSmart AI Demo",
     page_icon="/",
@@ -97,6 +222,12 @@ section[data-testid="stSidebar"] {
   border-radius: 12px;
   padding: 0.8rem;
 }
+.wf { margin-bottom: 0.8rem; font-size: 0.82rem; }
+.wf-row { display: grid; grid-template-columns: 200px 1fr 80px; gap: 0.6rem; align-items: center; margin-top: 0.25rem; }
+.wf-label { white-space: nowrap; overflow: hidden; text-overflow: ellipsis; }
+.wf-track { position: relative; height: 10px; background: var(--panel-2); border: 1px solid var(--border); border-radius: 4px; }
+.wf-bar { position: absolute; top: 0; bottom: 0; border-radius: 3px; }
+.wf-ms { color: var(--muted); text-align: right; }
 </style>
 """,
     unsafe_allow_html=True,
@@ -107,9 +238,10 @@ with st.sidebar:
 
     with config_tab:
         st.subheader("Dealership Config")
-        dealers = list_dealers() or ["demo_bmw"]
+        dealers = cached_dealers() or ["demo_bmw"]
         dealer_id = st.selectbox("Dealer", dealers, index=0)
-        config = load_dealer_config(dealer_id)
+        config_path = CONFIG_DIR / f"{dealer_id}.json"
+        config = cached_config(dealer_id, file_version(config_path))
         if config.logo_url:
             st.image(config.logo_url, width=160)
         st.markdown(f"**Dealer:** {config.dealer_name}")
@@ -129,8 +261,9 @@ with st.sidebar:
         st.subheader("Mock CRM Leads")
         if st.button("Clear Mock CRM"):
             clear_mock_leads()
+            cached_leads.clear()
             st.success("Mock CRM cleared.")
-        leads = read_mock_leads(limit=25)
+        leads = cached_leads(25, file_version(CRM_LOG_PATH))
         if not leads:
             st.markdown("<span class='muted'>No leads yet.</span>", unsafe_allow_html=True)
         else:
@@ -218,6 +351,8 @@ with sms_tab:
     with st.expander("Latest Trace"):
         trace: Dict | None = st.session_state.get("sms_trace")
         if trace:
+            if trace.get("spans"):
+                st.markdown(render_waterfall(trace["spans"]), unsafe_allow_html=True)
             st.json(trace)
         else:
             st.markdown("<span class='muted'>No trace yet.</span>", unsafe_allow_html=True)
@@ -247,7 +382,7 @@ with voice_tab:
             call_submit = st.form_submit_button("Call Me")
         if call_submit and to_number:
             try:
-                resp = requests.post(
+                resp = http_session().post(
                     f"{API_BASE_URL}/outbound",
                     json={"to": to_number, "dealer_id": dealer_id},
                     timeout=10,
@@ -262,7 +397,7 @@ with voice_tab:
 
     st.subheader("In-App WebRTC Call")
     st.markdown("Call the agent directly from your browser (no phone required).")
-    webrtc_src = f"{API_BASE_URL}/webrtc/"
+    webrtc_src = f"{API_BASE_URL}/webrtc/?dealer_id={dealer_id}"
     st.markdown(
         f"""
 <iframe
@@ -275,70 +410,11 @@ with voice_tab:
     )
 
     st.subheader("Recent Voice Calls")
-    if LOG_PATH.exists():
-        lines = LOG_PATH.read_text().strip().splitlines()[-5:]
-        if lines and lines[0].strip():
-            auto_fetch = st.checkbox("Auto-fetch transcripts", value=True)
-            refresh_now = st.button("Refresh Transcripts")
-            for line in reversed(lines):
-                entry = json.loads(line)
-                # Highlight summary if available in webhook payloads
-                if entry.get("event") == "ultravox_webhook":
-                    call = entry.get("payload", {}).get("call", {})
-                    summary = call.get("summary") or call.get("shortSummary")
-                    if summary:
-                        st.markdown(f"**Summary:** {summary}")
-                st.json(entry)
-                call_id = entry.get("call_id")
-                if call_id:
-                    with st.expander(f"Transcript for {call_id}"):
-                        try:
-                            if auto_fetch:
-                                # Live-ish poll of transcript if available
-                                detail = requests.get(
-                                    f"{API_BASE_URL}/ultravox/calls/{call_id}",
-                                    timeout=10,
-                                )
-                                if detail.status_code < 400:
-                                    detail_json = detail.json()
-                                    summary = detail_json.get("summary") or detail_json.get("shortSummary")
-                                    end_reason = detail_json.get("endReason")
-                                    if summary:
-                                        st.markdown(f"**Summary:** {summary}")
-                                    if end_reason:
-                                        st.markdown(f"**End Reason:** {end_reason}")
-                                    with st.expander("Raw Call Detail"):
-                                        st.json(detail_json)
-                                resp = requests.get(
-                                    f"{API_BASE_URL}/ultravox/calls/{call_id}/messages",
-                                    timeout=10,
-                                )
-                                if resp.status_code >= 400:
-                                    st.error(resp.text)
-                                else:
-                                    payload = resp.json()
-                                    messages = payload.get("messages") if isinstance(payload, dict) else payload
-                                    if messages is None:
-                                        messages = []
-                                    cleaned = []
-                                    for msg in messages:
-                                        role = msg.get("role") or msg.get("sender") or "unknown"
-                                        text = msg.get("text") or msg.get("content") or msg.get("message") or ""
-                                        if text:
-                                            cleaned.append(f"{role}: {text}")
-                                    if cleaned:
-                                        st.text("\\n".join(cleaned))
-                                    else:
-                                        st.markdown("_No transcript messages yet. Try Refresh or wait for call end._")
-                                        st.json(messages)
-                            else:
-                                st.markdown("Enable auto-fetch to load transcripts.")
-                        except requests.RequestException as exc:
-                            st.error(f"Could not reach FastAPI server on :8000 ({exc})")
-        else:
-            st.markdown("<span class='muted'>No voice logs yet.</span>", unsafe_allow_html=True)
-    else:
-        st.markdown("<span class='muted'>No voice logs yet.</span>", unsafe_allow_html=True)
+    auto_refresh = st.checkbox("Auto-refresh transcripts", value=True)
+    if st.button("Refresh Transcripts"):
+        fetch_call.clear()
+    # Only this panel reruns on the timer; the rest of the page stays put.
+    st.fragment(recent_calls_panel, run_every=TRANSCRIPT_REFRESH_S if auto_refresh else None)()
 
 with config_tab:
     st.subheader("Customization & CRM")
@@ -361,6 +437,8 @@ with config_tab:
         nurture_queue = st.text_input("Nurture Queue", value=config.routing.get("nurture_queue", "nurture"))
         crm_provider = st.text_input("CRM Provider", value=config.crm.get("provider", "mock"))
         lead_source = st.text_input("Lead Source", value=config.crm.get("lead_source", "AI Concierge"))
+        fast_model = st.text_input("Fast Model (routine SMS turns)", value=config.models.get("fast", ""))
+        strong_model = st.text_input("Strong Model (tool / long-context turns)", value=config.models.get("strong", ""))
         require_sms_opt_in = st.checkbox(
             "Require SMS Opt-in", value=config.compliance.get("require_sms_opt_in", True)
         )
@@ -379,11 +457,14 @@ with config_tab:
         updated.routing["nurture_queue"] = nurture_queue
         updated.crm["provider"] = crm_provider
         updated.crm["lead_source"] = lead_source
+        updated.models["fast"] = fast_model.strip()
+        updated.models["strong"] = strong_model.strip()
         updated.compliance["require_sms_opt_in"] = require_sms_opt_in
         updated.compliance["require_voice_consent"] = require_voice_consent
 
-        config_path = Path(__file__).resolve().parent / "data" / "dealer_configs" / f"{dealer_id}.json"
         config_path.write_text(json.dumps(updated.model_dump(), indent=2))
+        cached_config.clear()
+        cached_dealers.clear()
         clear_agent_cache(dealer_id)
         st.success("Config saved and applied. New SMS runs will use updated tone.")
 
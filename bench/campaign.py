@@ -0,0 +1,109 @@
+from __future__ import annotations
+
+import argparse
+import json
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, List
+
+import requests
+
+from bench.fakes import FaultProfile
+from bench.loadtest import RESULTS_DIR, local_stack
+
+
+def drive_campaign(base_url: str, numbers: List[str], dealer_id: str, call_s: float, timeout_s: float) -> Dict:
+    """Start a campaign, end each connected call after `call_s` via the Ultravox webhook, and watch the pacing."""
+    session = requests.Session()
+    started = time.perf_counter()
+    resp = session.post(f"{base_url}/campaigns", json={"dealer_id": dealer_id, "numbers": numbers}, timeout=30)
+    resp.raise_for_status()
+    campaign_id = resp.json()["id"]
+
+    placed_at: Dict[str, float] = {}
+    ended: set = set()
+    peak_active = 0
+    snapshot: Dict = {}
+    deadline = time.monotonic() + timeout_s
+    while time.monotonic() < deadline:
+        snapshot = session.get(f"{base_url}/campaigns/{campaign_id}", params={"details": "true"}, timeout=30).json()
+        now = time.perf_counter()
+        active = 0
+        for call in snapshot.get("calls", []):
+            if call["status"] in ("dialing", "in_call"):
+                active += 1
+            call_id = call.get("call_id")
+            if call["status"] == "in_call" and call_id:
+                placed_at.setdefault(call_id, now)
+                if call_id not in ended and now - placed_at[call_id] >= call_s:
+                    ended.add(call_id)
+                    session.post(
+                        f"{base_url}/ultravox/webhook",
+                        json={"event": "call.ended", "callId": call_id, "call": {}},
+                        timeout=30,
+                    )
+        peak_active = max(peak_active, active)
+        if snapshot.get("status") in ("completed", "cancelled"):
+            break
+        time.sleep(0.05)
+    elapsed = time.perf_counter() - started
+
+    starts = sorted(placed_at.values())
+    return {
+        "campaign_id": campaign_id,
+        "status": snapshot.get("status"),
+        "counts": snapshot.get("counts", {}),
+        "elapsed_s": round(elapsed, 3),
+        "peak_active": peak_active,
+        "observed_calls_per_s": round((len(starts) - 1) / (starts[-1] - starts[0]), 3) if len(starts) > 1 else None,
+    }
+
+
+def main(argv: List[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description="Run an outbound campaign against local Ultravox/Twilio stand-ins.")
+    parser.add_argument("--numbers", type=int, default=20, help="Numbers to dial")
+    parser.add_argument("--dealer-id", default="demo_bmw")
+    parser.add_argument("--max-concurrent", type=int, default=4, help="Per-dealer concurrency cap")
+    parser.add_argument("--calls-per-second", type=float, default=5.0, help="Per-dealer pacing")
+    parser.add_argument("--call-s", type=float, default=0.5, help="Simulated call length before call.ended")
+    parser.add_argument("--timeout-s", type=float, default=120.0)
+    parser.add_argument("--ultravox-latency-ms", type=float, default=50.0)
+    parser.add_argument("--twilio-latency-ms", type=float, default=80.0)
+    parser.add_argument("--out", type=Path)
+    args = parser.parse_args(argv)
+
+    numbers = [f"+1555{i:07d}" for i in range(args.numbers)]
+    extra_env = {
+        "CAMPAIGN_QUIET_HOURS": "off",
+        "CAMPAIGN_MAX_CONCURRENT": str(args.max_concurrent),
+        "CAMPAIGN_CALLS_PER_SECOND": str(args.calls_per_second),
+    }
+    with local_stack(
+        FaultProfile(args.ultravox_latency_ms, 5.0),
+        FaultProfile(args.twilio_latency_ms, 10.0),
+        extra_env=extra_env,
+    ) as stack:
+        result = drive_campaign(stack.base_url, numbers, args.dealer_id, args.call_s, args.timeout_s)
+        result["twilio"] = stack.twilio.stats
+    result["meta"] = {
+        "timestamp": datetime.utcnow().isoformat() + "Z",
+        "numbers": args.numbers,
+        "max_concurrent": args.max_concurrent,
+        "calls_per_second": args.calls_per_second,
+        "call_s": args.call_s,
+    }
+
+    print(f"campaign {result['campaign_id']} {result['status']} in {result['elapsed_s']}s: {result['counts']}")
+    print(f"peak active calls {result['peak_active']} (cap {args.max_concurrent}), "
+          f"observed {result['observed_calls_per_s']} calls/s (limit {args.calls_per_second})")
+
+    out = args.out or RESULTS_DIR / f"campaign-{datetime.utcnow().strftime('%Y%m%dT%H%M%SZ')}.json"
+    out.parent.mkdir(parents=True, exist_ok=True)
+    out.write_text(json.dumps(result, indent=2))
+    print(f"Results written to {out}")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,65 @@
+from __future__ import annotations
+
+import argparse
+import json
+import statistics
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, List
+
+import requests
+
+from bench.loadtest import RESULTS_DIR, ROUTES, local_stack
+
+
+def measure_once(routes: List[str]) -> Dict:
+    with local_stack() as stack:
+        health = requests.get(f"{stack.base_url}/health", timeout=5).json()
+        sample = {"startup_s": stack.startup_s, "warmup_s": health.get("warmup_s"), "routes": {}}
+        for route in routes:
+            timings = []
+            for i in range(2):
+                method, path, kwargs = ROUTES[route](i)
+                start = time.perf_counter()
+                requests.request(method, f"{stack.base_url}{path}", timeout=60, **kwargs)
+                timings.append((time.perf_counter() - start) * 1000)
+            sample["routes"][route] = {"first_ms": timings[0], "second_ms": timings[1]}
+    return sample
+
+
+def main(argv: List[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description="Measure server startup time and first-request latency per route.")
+    parser.add_argument("--runs", type=int, default=5, help="Fresh server processes to start")
+    parser.add_argument("--routes", nargs="*", default=["tools/inventory_lookup", "tools/create_lead",
+                                                        "tools/route_lead", "twiml"])
+    parser.add_argument("--out", type=Path)
+    args = parser.parse_args(argv)
+
+    samples = [measure_once(args.routes) for _ in range(args.runs)]
+    summary = {
+        "startup_s": statistics.median(s["startup_s"] for s in samples),
+        "warmup_s": statistics.median(s["warmup_s"] or 0.0 for s in samples),
+        "routes": {
+            route: {
+                "first_ms": statistics.median(s["routes"][route]["first_ms"] for s in samples),
+                "second_ms": statistics.median(s["routes"][route]["second_ms"] for s in samples),
+            }
+            for route in args.routes
+        },
+    }
+    print(f"spawn -> ready: {summary['startup_s'] * 1000:.0f} ms (warm-up {summary['warmup_s'] * 1000:.1f} ms), "
+          f"median of {args.runs} runs")
+    for route, row in summary["routes"].items():
+        print(f"  {route:<26} first {row['first_ms']:8.2f} ms   second {row['second_ms']:8.2f} ms")
+
+    out = args.out or RESULTS_DIR / f"coldstart-{datetime.utcnow().strftime('%Y%m%dT%H%M%SZ')}.json"
+    out.parent.mkdir(parents=True, exist_ok=True)
+    out.write_text(json.dumps({"meta": {"timestamp": datetime.utcnow().isoformat() + "Z", "runs": args.runs},
+                               "summary": summary, "samples": samples}, indent=2))
+    print(f"Results written to {out}")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
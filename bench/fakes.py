@@ -0,0 +1,159 @@
+from __future__ import annotations
+
+import json
+import random
+import re
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, Tuple
+
+
+class FaultProfile:
+    def __init__(self, latency_ms: float = 0.0, jitter_ms: float = 0.0, error_rate: float = 0.0, seed: int | None = None):
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.error_rate = error_rate
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+
+    def apply(self) -> bool:
+        """Sleep for the injected latency and return True if this request should fail."""
+        with self._lock:
+            delay = self.latency_ms + (self._rng.uniform(-self.jitter_ms, self.jitter_ms) if self.jitter_ms else 0.0)
+            fail = self._rng.random() < self.error_rate
+        if delay > 0:
+            time.sleep(delay / 1000.0)
+        return fail
+
+
+class _FakeHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    routes: Tuple = ()
+    faults: FaultProfile = FaultProfile()
+    stats: Dict[str, int] = {}
+    stats_lock = threading.Lock()
+
+    def log_message(self, format, *args):  # noqa: A002 - silence default stderr logging
+        pass
+
+    def _dispatch(self, method: str) -> None:
+        length = int(self.headers.get("Content-Length") or 0)
+        raw = self.rfile.read(length) if length else b""
+        path = self.path.split("?", 1)[0]
+        self._count("requests")
+        if self.faults.apply():
+            self._count("errors")
+            self._send(500, {"error": "injected failure"})
+            return
+        for route_method, pattern, handler in self.routes:
+            match = re.fullmatch(pattern, path)
+            if route_method == method and match:
+                status, body = handler(self, raw, *match.groups())
+                self._send(status, body)
+                return
+        self._send(404, {"error": f"no fake route for {method} {path}"})
+
+    def _count(self, key: str) -> None:
+        with self.stats_lock:
+            self.stats[key] = self.stats.get(key, 0) + 1
+
+    def _send(self, status: int, body: Dict) -> None:
+        data = json.dumps(body).encode("utf-8") if status != 204 else b""
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        try:
+            self.wfile.write(data)
+        except (BrokenPipeError, ConnectionResetError):
+            pass  # the client gave up (deadline / hedged request); nothing to report
+
+    def do_GET(self):
+        self._dispatch("GET")
+
+    def do_POST(self):
+        self._dispatch("POST")
+
+    def do_DELETE(self):
+        self._dispatch("DELETE")
+
+
+def _ultravox_create_call(handler, raw: bytes):
+    call_id = str(uuid.uuid4())
+    return 201, {"callId": call_id, "joinUrl": f"wss://fake-ultravox.local/calls/{call_id}"}
+
+
+def _ultravox_delete_call(handler, raw: bytes, call_id: str):
+    handler._count("deleted_calls")
+    return 204, {}
+
+
+def _ultravox_call_detail(handler, raw: bytes, call_id: str):
+    return 200, {"callId": call_id, "endReason": "hangup", "shortSummary": "Customer asked about a 2024 X5."}
+
+
+def _ultravox_call_messages(handler, raw: bytes, call_id: str):
+    return 200, {
+        "results": [
+            {"role": "MESSAGE_ROLE_AGENT", "text": "Thanks for calling! Are you calling about sales or service today?"},
+            {"role": "MESSAGE_ROLE_USER", "text": "Sales. Looking for an X5 in the next month, budget around 70k."},
+        ]
+    }
+
+
+def _twilio_create_call(handler, raw: bytes, account_sid: str):
+    return 201, {"sid": "CA" + uuid.uuid4().hex, "account_sid": account_sid, "status": "queued"}
+
+
+ULTRAVOX_ROUTES = (
+    ("POST", r"/api/calls", _ultravox_create_call),
+    ("GET", r"/api/calls/([^/]+)", _ultravox_call_detail),
+    ("DELETE", r"/api/calls/([^/]+)", _ultravox_delete_call),
+    ("GET", r"/api/calls/([^/]+)/messages", _ultravox_call_messages),
+)
+
+TWILIO_ROUTES = (
+    ("POST", r"/2010-04-01/Accounts/([^/]+)/Calls\.json", _twilio_create_call),
+)
+
+
+class FakeServer:
+    def __init__(self, routes: Tuple, faults: FaultProfile | None = None, host: str = "127.0.0.1", port: int = 0):
+        handler = type(
+            "FakeHandler",
+            (_FakeHandler,),
+            {"routes": routes, "faults": faults or FaultProfile(), "stats": {}, "stats_lock": threading.Lock()},
+        )
+        self._handler = handler
+        self._httpd = ThreadingHTTPServer((host, port), handler)
+        self._httpd.daemon_threads = True
+        self._thread = threading.Thread(target=self._httpd.serve_forever, daemon=True)
+
+    @property
+    def url(self) -> str:
+        host, port = self._httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    @property
+    def stats(self) -> Dict[str, int]:
+        return dict(self._handler.stats)
+
+    def start(self) -> "FakeServer":
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self._httpd.shutdown()
+        self._httpd.server_close()
+
+
+def fake_ultravox(faults: FaultProfile | None = None, port: int = 0) -> FakeServer:
+    """Ultravox stand-in; point ULTRAVOX_BASE_URL at `<url>/api`."""
+    return FakeServer(ULTRAVOX_ROUTES, faults, port=port)
+
+
+def fake_twilio(faults: FaultProfile | None = None, port: int = 0) -> FakeServer:
+    """Twilio REST stand-in; point TWILIO_API_BASE_URL at `<url>`."""
+    return FakeServer(TWILIO_ROUTES, faults, port=port)
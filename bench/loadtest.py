@@ -0,0 +1,302 @@
+from __future__ import annotations
+
+import argparse
+import contextlib
+import json
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from pathlib import Path
+from typing import Callable, Dict, Iterator, List, Tuple
+
+import requests
+
+from bench.fakes import FaultProfile, fake_twilio, fake_ultravox
+from bench.stats import compare, format_table, summarize
+
+ROOT = Path(__file__).resolve().parent.parent
+RESULTS_DIR = Path(__file__).resolve().parent / "results"
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+class LocalStack:
+    def __init__(self, base_url: str, data_dir: Path, ultravox, twilio, startup_s: float):
+        self.base_url = base_url
+        self.data_dir = data_dir
+        self.ultravox = ultravox
+        self.twilio = twilio
+        self.startup_s = startup_s
+
+
+@contextlib.contextmanager
+def local_stack(
+    ultravox_faults: FaultProfile | None = None,
+    twilio_faults: FaultProfile | None = None,
+    extra_env: Dict[str, str] | None = None,
+    startup_timeout: float = 30.0,
+    workers: int = 1,
+) -> Iterator[LocalStack]:
+    """Run `server:app` under uvicorn against fake Ultravox/Twilio servers and a scratch data dir."""
+    ultravox = fake_ultravox(ultravox_faults).start()
+    twilio = fake_twilio(twilio_faults).start()
+    port = _free_port()
+    base_url = f"http://127.0.0.1:{port}"
+    with tempfile.TemporaryDirectory(prefix="bench-") as tmp:
+        data_dir = Path(tmp)
+        env = dict(os.environ)
+        env.update(
+            {
+                "ULTRAVOX_API_KEY": "bench",
+                "ULTRAVOX_BASE_URL": f"{ultravox.url}/api",
+                "TWILIO_API_BASE_URL": twilio.url,
+                "TWILIO_ACCOUNT_SID": "ACbench",
+                "TWILIO_AUTH_TOKEN": "bench",
+                "TWILIO_FROM_NUMBER": "+15550000000",
+                "PUBLIC_BASE_URL": base_url,
+                "API_BASE_PATH": "",
+                "VOICE_LOG_PATH": str(data_dir / "voice_logs.jsonl"),
+                "MOCK_CRM_PATH": str(data_dir / "mock_crm.jsonl"),
+                "STATE_DB_PATH": str(data_dir / "state.db"),
+            }
+        )
+        # Benchmarks drive one dealer far past its admission limits; opt back in with RATE_LIMITS=on.
+        env.setdefault("RATE_LIMITS", "off")
+        if workers > 1:
+            env.setdefault("STATE_BACKEND", "sqlite")
+        env.update(extra_env or {})
+        spawned = time.perf_counter()
+        proc = subprocess.Popen(
+            [sys.executable, "-m", "uvicorn", "server:app", "--host", "127.0.0.1", "--port", str(port), "--log-level", "warning",
+             "--workers", str(workers)],
+            cwd=ROOT,
+            env=env,
+        )
+        try:
+            deadline = time.monotonic() + startup_timeout
+            while True:
+                if proc.poll() is not None:
+                    raise RuntimeError(f"server exited during startup (code {proc.returncode})")
+                try:
+                    if requests.get(f"{base_url}/health", timeout=1).status_code == 200:
+                        break
+                except requests.RequestException:
+                    pass
+                if time.monotonic() > deadline:
+                    raise RuntimeError("server did not become healthy in time")
+                time.sleep(0.02)
+            yield LocalStack(base_url, data_dir, ultravox, twilio, time.perf_counter() - spawned)
+        finally:
+            proc.terminate()
+            try:
+                proc.wait(timeout=10)
+            except subprocess.TimeoutExpired:
+                proc.kill()
+            ultravox.stop()
+            twilio.stop()
+
+
+RequestSpec = Tuple[str, str, Dict]
+
+
+def _twiml(i: int) -> RequestSpec:
+    return "POST", "/twiml", {"data": {"Caller": f"client:bench_{i}", "CallSid": f"CA{uuid.uuid4().hex}"}}
+
+
+def _incoming(i: int) -> RequestSpec:
+    return "POST", "/incoming", {"data": {"CallSid": f"CA{uuid.uuid4().hex}", "From": f"+1555{i % 10_000_000:07d}"}}
+
+
+def _outbound(i: int) -> RequestSpec:
+    return "POST", "/outbound", {"json": {"to": f"+1555{i % 10_000_000:07d}", "dealer_id": "demo_bmw"}}
+
+
+_LOOKUPS = [
+    {"make": "BMW"},
+    {"year": 2024, "make": "BMW", "model": "X5"},
+    {"model": "x5", "trim": "M60i"},
+    {"make": "Honda", "model": "Civic"},
+]
+
+
+def _inventory_lookup(i: int) -> RequestSpec:
+    return "POST", "/tools/inventory_lookup", {"json": _LOOKUPS[i % len(_LOOKUPS)]}
+
+
+def _group_inventory_lookup(i: int) -> RequestSpec:
+    body = dict(_LOOKUPS[i % len(_LOOKUPS)], sort=("price", "distance")[i % 2])
+    return "POST", "/tools/group_inventory_lookup?dealer_id=demo_bmw", {"json": body}
+
+
+_VINS = ["5UXCR6C0XR9X12345", "R9X54321", "5uxcr6c0-xr9x-12345", "NOTAVIN"]
+
+
+def _vin_lookup(i: int) -> RequestSpec:
+    return "POST", "/tools/vin_lookup", {"json": {"vin": _VINS[i % len(_VINS)]}}
+
+
+def _create_lead(i: int) -> RequestSpec:
+    return "POST", "/tools/create_lead", {
+        "json": {
+            "intent": "sales",
+            "timeline": "next month" if i % 2 else "asap",
+            "budget_max": 60000 + (i % 20) * 1000,
+            "vehicle_interest": "X5",
+            "customer_name": f"Bench Customer {i}",
+            "phone": f"+1555{i % 10_000_000:07d}",
+        }
+    }
+
+
+def _route_lead(i: int) -> RequestSpec:
+    return "POST", "/tools/route_lead", {"json": {"intent": ("sales", "service", "trade_in")[i % 3]}}
+
+
+def _ultravox_webhook(i: int) -> RequestSpec:
+    event = "call.ended" if i % 2 else "call.joined"
+    return "POST", "/ultravox/webhook", {"json": {"event": event, "callId": str(uuid.uuid4()), "call": {}}}
+
+
+ROUTES: Dict[str, Callable[[int], RequestSpec]] = {
+    "twiml": _twiml,
+    "incoming": _incoming,
+    "outbound": _outbound,
+    "tools/inventory_lookup": _inventory_lookup,
+    "tools/group_inventory_lookup": _group_inventory_lookup,
+    "tools/vin_lookup": _vin_lookup,
+    "tools/create_lead": _create_lead,
+    "tools/route_lead": _route_lead,
+    "ultravox/webhook": _ultravox_webhook,
+}
+
+
+def drive_route(base_url: str, build: Callable[[int], RequestSpec], total: int, concurrency: int) -> Dict:
+    local = threading.local()
+    latencies: List[float] = []
+    errors = 0
+    lock = threading.Lock()
+
+    def one(i: int) -> None:
+        nonlocal errors
+        session = getattr(local, "session", None)
+        if session is None:
+            session = local.session = requests.Session()
+        method, path, kwargs = build(i)
+        start = time.perf_counter()
+        try:
+            resp = session.request(method, f"{base_url}{path}", timeout=60, **kwargs)
+            failed = resp.status_code >= 400
+        except requests.RequestException:
+            failed = True
+        elapsed_ms = (time.perf_counter() - start) * 1000
+        with lock:
+            latencies.append(elapsed_ms)
+            errors += int(failed)
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        list(pool.map(one, range(total)))
+    return summarize(latencies, time.perf_counter() - started, errors)
+
+
+def run(args: argparse.Namespace) -> Dict:
+    routes = args.routes or list(ROUTES)
+    unknown = [r for r in routes if r not in ROUTES]
+    if unknown:
+        raise SystemExit(f"Unknown routes: {', '.join(unknown)} (choose from {', '.join(ROUTES)})")
+
+    def drive(base_url: str) -> Dict[str, Dict]:
+        results = {}
+        for route in routes:
+            if args.warmup:
+                drive_route(base_url, ROUTES[route], args.warmup, args.concurrency)
+            results[route] = drive_route(base_url, ROUTES[route], args.requests, args.concurrency)
+        return results
+
+    if args.base_url:
+        route_results = drive(args.base_url.rstrip("/"))
+    else:
+        with local_stack(
+            FaultProfile(args.ultravox_latency_ms, args.ultravox_jitter_ms, args.ultravox_error_rate, args.seed),
+            FaultProfile(args.twilio_latency_ms, args.twilio_jitter_ms, args.twilio_error_rate, args.seed),
+            extra_env={"RATE_LIMITS": "on"} if args.rate_limits else None,
+            workers=args.workers,
+        ) as stack:
+            route_results = drive(stack.base_url)
+
+    return {
+        "meta": {
+            "timestamp": datetime.utcnow().isoformat() + "Z",
+            "concurrency": args.concurrency,
+            "requests_per_route": args.requests,
+            "base_url": args.base_url or "local",
+            "workers": args.workers,
+            "rate_limits": args.rate_limits,
+            "ultravox": {
+                "latency_ms": args.ultravox_latency_ms,
+                "jitter_ms": args.ultravox_jitter_ms,
+                "error_rate": args.ultravox_error_rate,
+            },
+            "twilio": {
+                "latency_ms": args.twilio_latency_ms,
+                "jitter_ms": args.twilio_jitter_ms,
+                "error_rate": args.twilio_error_rate,
+            },
+        },
+        "routes": route_results,
+    }
+
+
+def main(argv: List[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description="Load-test server.py against local Ultravox/Twilio stand-ins.")
+    parser.add_argument("--routes", nargs="*", help=f"Routes to drive (default: all of {', '.join(ROUTES)})")
+    parser.add_argument("--requests", type=int, default=200, help="Requests per route")
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--warmup", type=int, default=10, help="Unmeasured requests per route before timing")
+    parser.add_argument("--workers", type=int, default=1, help="uvicorn workers for the local stack")
+    parser.add_argument("--rate-limits", action="store_true", help="Keep per-dealer admission limits on (429s count as errors)")
+    parser.add_argument("--base-url", help="Drive an already running server instead of starting a local stack")
+    parser.add_argument("--ultravox-latency-ms", type=float, default=50.0)
+    parser.add_argument("--ultravox-jitter-ms", type=float, default=10.0)
+    parser.add_argument("--ultravox-error-rate", type=float, default=0.0)
+    parser.add_argument("--twilio-latency-ms", type=float, default=80.0)
+    parser.add_argument("--twilio-jitter-ms", type=float, default=20.0)
+    parser.add_argument("--twilio-error-rate", type=float, default=0.0)
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--out", type=Path, help="Where to write the JSON results (default: bench/results/loadtest-<ts>.json)")
+    parser.add_argument("--compare", type=Path, help="Baseline results JSON to check for regressions")
+    parser.add_argument("--threshold", type=float, default=0.10, help="Allowed relative regression before failing")
+    args = parser.parse_args(argv)
+
+    results = run(args)
+    print(format_table(results["routes"]))
+
+    out = args.out or RESULTS_DIR / f"loadtest-{datetime.utcnow().strftime('%Y%m%dT%H%M%SZ')}.json"
+    out.parent.mkdir(parents=True, exist_ok=True)
+    out.write_text(json.dumps(results, indent=2))
+    print(f"\nResults written to {out}")
+
+    if args.compare:
+        baseline = json.loads(args.compare.read_text())
+        regressions = compare(results["routes"], baseline.get("routes", {}), args.threshold)
+        for reg in regressions:
+            print(f"REGRESSION {reg['route']} {reg['metric']}: {reg['baseline']} -> {reg['current']}")
+        if regressions:
+            return 1
+        print("No regressions against baseline.")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
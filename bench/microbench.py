@@ -0,0 +1,206 @@
+from __future__ import annotations
+
+import argparse
+import json
+import statistics
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Callable, Dict, List, Sequence
+
+from bench.loadtest import RESULTS_DIR
+from bench.sms_corpus import generate_conversations
+from core.orchestrator import (
+    _detect_intent,
+    _extract_budget,
+    _extract_vehicle,
+    _normalize_intent,
+    _normalize_timeline,
+    fallback_sms_turn,
+    lead_hotness,
+)
+
+GOLDEN_PATH = Path(__file__).resolve().parent / "data" / "sms_golden.jsonl"
+
+
+def extract(conversations: Sequence[Sequence[str]]) -> List[Dict]:
+    """Run every thread through the SMS fallback path and the tool normalizers, one record per message."""
+    records = []
+    for conv_idx, messages in enumerate(conversations):
+        state: Dict = {}
+        for turn, message in enumerate(messages):
+            reply, lead = fallback_sms_turn(state, message)
+            timeline = _normalize_timeline(message)
+            records.append(
+                {
+                    "conv": conv_idx,
+                    "turn": turn,
+                    "message": message,
+                    "reply": reply,
+                    "lead": lead.model_dump(mode="json", exclude_none=True),
+                    "intent": _normalize_intent(message),
+                    "timeline": timeline,
+                    "hotness": lead_hotness(timeline, lead.budget_max),
+                }
+            )
+    return records
+
+
+def load_golden(path: Path = GOLDEN_PATH) -> List[Dict]:
+    with path.open() as fh:
+        return [json.loads(line) for line in fh if line.strip()]
+
+
+def write_golden(records: List[Dict], path: Path = GOLDEN_PATH) -> None:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with path.open("w") as fh:
+        for record in records:
+            fh.write(json.dumps(record, separators=(",", ":")) + "\n")
+
+
+def conversations_from_golden(golden: List[Dict]) -> List[List[str]]:
+    conversations: Dict[int, List[str]] = {}
+    for record in golden:
+        conversations.setdefault(record["conv"], []).append(record["message"])
+    return [conversations[k] for k in sorted(conversations)]
+
+
+def check_golden(golden: List[Dict]) -> List[Dict]:
+    actual = extract(conversations_from_golden(golden))
+    failures = []
+    for expected, got in zip(golden, actual):
+        if expected != got:
+            fields = sorted(k for k in expected if expected.get(k) != got.get(k))
+            failures.append({"conv": expected["conv"], "turn": expected["turn"], "message": expected["message"],
+                             "fields": fields, "expected": {k: expected[k] for k in fields},
+                             "actual": {k: got.get(k) for k in fields}})
+    return failures
+
+
+def benchmark(fn: Callable[[], int], rounds: int, warmup: int = 1) -> Dict:
+    """pytest-benchmark style timing: `fn` runs one round and returns how many messages it processed."""
+    for _ in range(warmup):
+        fn()
+    timings = []
+    ops = 0
+    for _ in range(rounds):
+        start = time.perf_counter()
+        ops = fn()
+        timings.append(time.perf_counter() - start)
+    median = statistics.median(timings)
+    return {
+        "rounds": rounds,
+        "ops_per_round": ops,
+        "min_s": min(timings),
+        "mean_s": statistics.fmean(timings),
+        "median_s": median,
+        "stddev_s": statistics.stdev(timings) if len(timings) > 1 else 0.0,
+        "msgs_per_s": round(ops / median, 1) if median > 0 else 0.0,
+    }
+
+
+def run_suite(golden: List[Dict], rounds: int) -> Dict[str, Dict]:
+    conversations = conversations_from_golden(golden)
+    messages = [record["message"] for record in golden]
+    timelines = [record["timeline"] for record in golden]
+    budgets = [record["lead"].get("budget_max") for record in golden]
+
+    def single() -> int:
+        for message in messages:
+            fallback_sms_turn({}, message)
+        return len(messages)
+
+    def batch() -> int:
+        extract(conversations)
+        return len(messages)
+
+    def fallback_threads() -> int:
+        for thread in conversations:
+            state: Dict = {}
+            for message in thread:
+                fallback_sms_turn(state, message)
+        return len(messages)
+
+    def each(fn: Callable, inputs: Sequence) -> Callable[[], int]:
+        def run() -> int:
+            for value in inputs:
+                fn(value)
+            return len(inputs)
+        return run
+
+    def hotness() -> int:
+        for timeline, budget in zip(timelines, budgets):
+            lead_hotness(timeline, budget)
+        return len(timelines)
+
+    suite = {
+        "fallback_sms_turn.single": single,
+        "fallback_sms_turn.threads": fallback_threads,
+        "extract.batch": batch,
+        "_normalize_intent": each(_normalize_intent, messages),
+        "_normalize_timeline": each(_normalize_timeline, messages),
+        "lead_hotness": hotness,
+        "_detect_intent": each(_detect_intent, messages),
+        "_extract_budget": each(_extract_budget, messages),
+        "_extract_vehicle": each(_extract_vehicle, messages),
+    }
+    return {name: benchmark(fn, rounds) for name, fn in suite.items()}
+
+
+def main(argv: List[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description="Microbenchmarks + golden check for SMS fallback extraction.")
+    parser.add_argument("--rounds", type=int, default=5)
+    parser.add_argument("--check-only", action="store_true", help="Only verify outputs against the golden corpus")
+    parser.add_argument("--regen", action="store_true",
+                        help="Regenerate the golden corpus from bench/sms_corpus.py (only for intended behavior changes)")
+    parser.add_argument("--out", type=Path)
+    parser.add_argument("--compare", type=Path, help="Baseline results JSON; fail if msgs/s drops past --threshold")
+    parser.add_argument("--threshold", type=float, default=0.10)
+    args = parser.parse_args(argv)
+
+    if args.regen:
+        records = extract(generate_conversations())
+        write_golden(records)
+        print(f"Wrote {len(records)} golden records to {GOLDEN_PATH}")
+        return 0
+
+    golden = load_golden()
+    failures = check_golden(golden)
+    if failures:
+        print(f"GOLDEN MISMATCH: {len(failures)} of {len(golden)} records differ")
+        for failure in failures[:10]:
+            print(f"  conv={failure['conv']} turn={failure['turn']} {failure['message']!r}: "
+                  f"expected {failure['expected']} got {failure['actual']}")
+        return 1
+    print(f"Golden corpus OK ({len(golden)} messages)")
+    if args.check_only:
+        return 0
+
+    results = run_suite(golden, args.rounds)
+    print(f"{'benchmark':<28}{'msgs/s':>14}{'median ms':>12}{'stddev ms':>12}")
+    for name, row in results.items():
+        print(f"{name:<28}{row['msgs_per_s']:>14,.0f}{row['median_s'] * 1000:>12.2f}{row['stddev_s'] * 1000:>12.2f}")
+
+    out = args.out or RESULTS_DIR / f"microbench-{datetime.utcnow().strftime('%Y%m%dT%H%M%SZ')}.json"
+    out.parent.mkdir(parents=True, exist_ok=True)
+    out.write_text(json.dumps({"meta": {"timestamp": datetime.utcnow().isoformat() + "Z",
+                                        "messages": len(golden), "rounds": args.rounds},
+                               "benchmarks": results}, indent=2))
+    print(f"Results written to {out}")
+
+    if args.compare:
+        baseline = json.loads(args.compare.read_text()).get("benchmarks", {})
+        slower = [
+            (name, baseline[name]["msgs_per_s"], row["msgs_per_s"])
+            for name, row in results.items()
+            if name in baseline and row["msgs_per_s"] < baseline[name]["msgs_per_s"] * (1 - args.threshold)
+        ]
+        for name, before, now in slower:
+            print(f"REGRESSION {name}: {before:,.0f} -> {now:,.0f} msgs/s")
+        if slower:
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
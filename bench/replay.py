@@ -0,0 +1,275 @@
+from __future__ import annotations
+
+import argparse
+import json
+import threading
+import time
+from collections import defaultdict, deque
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from pathlib import Path
+from typing import Deque, Dict, List
+
+import requests
+
+from bench.loadtest import RESULTS_DIR, local_stack
+from bench.stats import summarize
+
+ROOT = Path(__file__).resolve().parent.parent
+DEFAULT_LOG = ROOT / "data" / "voice_logs.jsonl"
+
+TOOL_EVENTS = {
+    "tool_inventory_lookup": "/tools/inventory_lookup",
+    "tool_group_inventory_lookup": "/tools/group_inventory_lookup",
+    "tool_vin_lookup": "/tools/vin_lookup",
+    "tool_create_lead": "/tools/create_lead",
+    "tool_route_lead": "/tools/route_lead",
+}
+VOLATILE_KEYS = {"timestamp"}
+HISTOGRAM_BOUNDS_MS = (5, 10, 25, 50, 100, 250, 500, 1000, 2500)
+
+
+class RecordedCall:
+    def __init__(
+        self,
+        tool: str,
+        body: Dict,
+        offset_s: float,
+        original: Dict | None,
+        dealer_id: str | None = None,
+        call_id: str | None = None,
+    ):
+        self.tool = tool
+        self.body = body
+        self.offset_s = offset_s
+        self.original = original
+        self.dealer_id = dealer_id
+        self.call_id = call_id
+
+    def params(self) -> Dict[str, str]:
+        return {"dealer_id": self.dealer_id} if self.dealer_id else {}
+
+    def headers(self) -> Dict[str, str]:
+        return {"X-Ultravox-Call-Id": self.call_id} if self.call_id else {}
+
+
+def _parse_ts(raw: str | None) -> float | None:
+    if not raw:
+        return None
+    try:
+        return datetime.fromisoformat(raw.rstrip("Z")).timestamp()
+    except ValueError:
+        return None
+
+
+def _body_key(tool: str, dealer_id: str | None, body: Dict) -> str:
+    # The same query against two dealers gets two different answers, so the dealer is part of the key.
+    return f"{tool}:{dealer_id or ''}:" + json.dumps(body, sort_keys=True)
+
+
+def load_recorded_calls(log_path: Path, tools: List[str] | None = None) -> List[RecordedCall]:
+    """Pull tool request events (and their logged `*_result` responses, if any) out of a voice log."""
+    events = []
+    with log_path.open() as fh:
+        for line in fh:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                events.append(json.loads(line))
+            except json.JSONDecodeError:
+                continue
+
+    originals: Dict[str, Deque[Dict]] = defaultdict(deque)
+    for entry in events:
+        name = entry.get("event") or ""
+        if name.endswith("_result") and name[: -len("_result")] in TOOL_EVENTS:
+            key = _body_key(name[: -len("_result")], entry.get("dealer_id"), entry.get("body") or {})
+            originals[key].append(entry.get("response"))
+
+    calls: List[RecordedCall] = []
+    first_ts = None
+    last_offset = 0.0
+    for entry in events:
+        name = entry.get("event")
+        if name not in TOOL_EVENTS:
+            continue
+        tool = name[len("tool_"):]
+        if tools and tool not in tools:
+            continue
+        body = entry.get("body") or {}
+        ts = _parse_ts(entry.get("timestamp"))
+        if ts is not None and first_ts is None:
+            first_ts = ts
+        offset = ts - first_ts if ts is not None and first_ts is not None else last_offset
+        last_offset = offset
+        pending = originals.get(_body_key(name, entry.get("dealer_id"), body))
+        original = pending.popleft() if pending else None
+        calls.append(RecordedCall(tool, body, offset, original, entry.get("dealer_id"), entry.get("call_id")))
+    return calls
+
+
+def _strip_volatile(value):
+    if isinstance(value, dict):
+        return {k: _strip_volatile(v) for k, v in value.items() if k not in VOLATILE_KEYS}
+    if isinstance(value, list):
+        return [_strip_volatile(v) for v in value]
+    return value
+
+
+def _diff_paths(a, b, path: str = "") -> List[str]:
+    if isinstance(a, dict) and isinstance(b, dict):
+        diffs = []
+        for key in sorted(set(a) | set(b)):
+            diffs.extend(_diff_paths(a.get(key), b.get(key), f"{path}.{key}" if path else key))
+        return diffs
+    if isinstance(a, list) and isinstance(b, list) and len(a) == len(b):
+        diffs = []
+        for idx, (x, y) in enumerate(zip(a, b)):
+            diffs.extend(_diff_paths(x, y, f"{path}[{idx}]"))
+        return diffs
+    return [] if a == b else [path or "<root>"]
+
+
+def _histogram(latencies_ms: List[float]) -> Dict[str, int]:
+    buckets = {f"<={bound}ms": 0 for bound in HISTOGRAM_BOUNDS_MS}
+    buckets["+Inf"] = 0
+    for value in latencies_ms:
+        for bound in HISTOGRAM_BOUNDS_MS:
+            if value <= bound:
+                buckets[f"<={bound}ms"] += 1
+                break
+        else:
+            buckets["+Inf"] += 1
+    return buckets
+
+
+def replay(
+    base_url: str,
+    calls: List[RecordedCall],
+    mode: str = "fast",
+    concurrency: int = 16,
+    speed: float = 1.0,
+    max_gap_s: float = 5.0,
+) -> Dict:
+    local = threading.local()
+    lock = threading.Lock()
+    latencies: Dict[str, List[float]] = defaultdict(list)
+    errors: Dict[str, int] = defaultdict(int)
+    comparison = {"match": 0, "mismatch": 0, "no_original": 0}
+    mismatches: List[Dict] = []
+
+    def one(call: RecordedCall) -> None:
+        session = getattr(local, "session", None)
+        if session is None:
+            session = local.session = requests.Session()
+        start = time.perf_counter()
+        try:
+            resp = session.post(
+                f"{base_url}{TOOL_EVENTS['tool_' + call.tool]}",
+                params=call.params(),
+                headers=call.headers(),
+                json=call.body,
+                timeout=60,
+            )
+            failed = resp.status_code >= 400
+            payload = resp.json() if not failed else None
+        except (requests.RequestException, ValueError):
+            failed, payload = True, None
+        elapsed_ms = (time.perf_counter() - start) * 1000
+        with lock:
+            latencies[call.tool].append(elapsed_ms)
+            errors[call.tool] += int(failed)
+            if call.original is None:
+                comparison["no_original"] += 1
+            elif not failed and _strip_volatile(payload) == _strip_volatile(call.original):
+                comparison["match"] += 1
+            else:
+                comparison["mismatch"] += 1
+                if len(mismatches) < 20:
+                    mismatches.append(
+                        {
+                            "tool": call.tool,
+                            "body": call.body,
+                            "fields": _diff_paths(_strip_volatile(call.original), _strip_volatile(payload)),
+                        }
+                    )
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        if mode == "recorded":
+            # Preserve recorded inter-arrival times (scaled by `speed`), collapsing idle gaps.
+            schedule = 0.0
+            previous = calls[0].offset_s if calls else 0.0
+            for call in calls:
+                schedule += min(max(call.offset_s - previous, 0.0), max_gap_s) / speed
+                previous = call.offset_s
+                delay = schedule - (time.perf_counter() - started)
+                if delay > 0:
+                    time.sleep(delay)
+                pool.submit(one, call)
+        else:
+            list(pool.map(one, calls))
+    elapsed = time.perf_counter() - started
+
+    tools = {}
+    for tool, values in latencies.items():
+        tools[tool] = summarize(values, elapsed, errors[tool])
+        tools[tool]["histogram"] = _histogram(values)
+    overall = summarize([v for values in latencies.values() for v in values], elapsed, sum(errors.values()))
+    return {"tools": tools, "overall": overall, "comparison": comparison, "mismatches": mismatches}
+
+
+def main(argv: List[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description="Replay recorded tool calls from voice_logs.jsonl against a server.")
+    parser.add_argument("--log", type=Path, default=DEFAULT_LOG, help="Voice log to replay (JSONL)")
+    parser.add_argument("--tools", nargs="*", choices=[name[len("tool_"):] for name in TOOL_EVENTS])
+    parser.add_argument("--mode", choices=["fast", "recorded"], default="fast",
+                        help="fast: as fast as --concurrency allows; recorded: keep recorded inter-arrival times")
+    parser.add_argument("--speed", type=float, default=1.0, help="Time compression for --mode recorded")
+    parser.add_argument("--max-gap-s", type=float, default=5.0, help="Cap on any single recorded idle gap")
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--limit", type=int, help="Replay only the first N calls")
+    parser.add_argument("--base-url", help="Replay against a running server instead of a local stack")
+    parser.add_argument("--out", type=Path)
+    args = parser.parse_args(argv)
+
+    if not args.log.exists():
+        raise SystemExit(f"Voice log not found: {args.log}")
+    calls = load_recorded_calls(args.log, args.tools)
+    if args.limit:
+        calls = calls[: args.limit]
+    if not calls:
+        raise SystemExit("No tool calls found in the log.")
+
+    if args.base_url:
+        result = replay(args.base_url.rstrip("/"), calls, args.mode, args.concurrency, args.speed, args.max_gap_s)
+    else:
+        with local_stack() as stack:
+            result = replay(stack.base_url, calls, args.mode, args.concurrency, args.speed, args.max_gap_s)
+    result["meta"] = {
+        "timestamp": datetime.utcnow().isoformat() + "Z",
+        "log": str(args.log),
+        "mode": args.mode,
+        "speed": args.speed,
+        "concurrency": args.concurrency,
+        "calls": len(calls),
+    }
+
+    for tool, row in result["tools"].items():
+        print(f"{tool:<20} n={row['count']:<6} err={row['errors']:<4} p50={row['p50_ms']:.2f}ms "
+              f"p95={row['p95_ms']:.2f}ms p99={row['p99_ms']:.2f}ms")
+    cmp = result["comparison"]
+    print(f"responses: {cmp['match']} match, {cmp['mismatch']} differ, {cmp['no_original']} without a recorded response")
+    for item in result["mismatches"][:5]:
+        print(f"  {item['tool']} {json.dumps(item['body'])} differs at {', '.join(item['fields'])}")
+
+    out = args.out or RESULTS_DIR / f"replay-{datetime.utcnow().strftime('%Y%m%dT%H%M%SZ')}.json"
+    out.parent.mkdir(parents=True, exist_ok=True)
+    out.write_text(json.dumps(result, indent=2))
+    print(f"Results written to {out}")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
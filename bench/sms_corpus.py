@@ -0,0 +1,84 @@
+from __future__ import annotations
+
+import random
+from typing import List
+
+MODELS = ["X5", "x5", "X3", "X7", "3 Series", "5 series", "M3", "m5", "X1", "i4", "Civic", "Accord", "CR-V"]
+YEARS = ["2022", "2023", "2024", "2025", "'24", ""]
+BUDGETS = ["$45,000", "50k", "$60k", "under 70k", "around $75,000", "90,000", "$38k", "35", "about 55"]
+TIMELINES = [
+    "asap", "today", "this week", "next week", "next month", "in a few months", "1-3 months",
+    "3-6 months", "next quarter", "later this year", "not sure yet", "someday", "now", "",
+]
+TRADES = ["my 2016 Accord", "a 2019 Audi Q5", "my old 328i", "a 2015 F-150", "our minivan", "my lease"]
+NAMES = ["Sam", "Priya", "Marcus", "Elena", "Chris", "Dana", "Jordan", "Wei", "Aisha", "Tom"]
+SERVICES = ["oil change", "brake repair", "service appointment", "tire rotation", "recall repair", "inspection"]
+
+SALES_TEMPLATES = [
+    "Hi, is the {year} {model} still available?",
+    "Looking for a {model}, budget is {budget}",
+    "Do you have any {model} under {budget}?",
+    "What's the best price on the {year} {model}?",
+    "I want to buy a {model} {timeline}",
+    "Interested in leasing a {model}. Timeline {timeline}.",
+    "Can I test drive the {model} {timeline}?",
+    "Hey this is {name}, saw the {model} online. Still there?",
+    "Thinking about a {year} {model}, maybe {budget} max",
+    "how much for the {model}",
+    "Need a family SUV, {budget} range, buying {timeline}",
+    "Yes",
+    "No trade, paying cash",
+    "Text me, {name}",
+]
+TRADE_TEMPLATES = [
+    "I want to trade in {trade} for a {model}",
+    "What would you give me for {trade}? Looking at the {model}",
+    "Have a trade-in: {trade}. Budget {budget}.",
+    "Can I trade {trade} {timeline}?",
+]
+SERVICE_TEMPLATES = [
+    "Need an {service} {timeline}",
+    "Can I book a {service} for my {model}?",
+    "My {model} needs a {service}, what's your availability {timeline}?",
+    "Schedule {service} appointment please",
+    "Is the service department open {timeline}?",
+]
+FOLLOWUP_TEMPLATES = [
+    "{timeline}",
+    "Budget is {budget}",
+    "no trade",
+    "Yes I have a trade, {trade}",
+    "Probably the {model}",
+    "Call me at 555-01{digits}",
+    "Can you text instead?",
+    "Thanks!",
+]
+
+
+def _fill(rng: random.Random, template: str) -> str:
+    text = template.format(
+        year=rng.choice(YEARS),
+        model=rng.choice(MODELS),
+        budget=rng.choice(BUDGETS),
+        timeline=rng.choice(TIMELINES),
+        trade=rng.choice(TRADES),
+        name=rng.choice(NAMES),
+        service=rng.choice(SERVICES),
+        digits=f"{rng.randint(0, 99):02d}",
+    )
+    return " ".join(text.split())
+
+
+def generate_conversations(count: int = 750, turns: int = 4, seed: int = 28) -> List[List[str]]:
+    """Deterministic synthetic dealership SMS threads: an opener followed by follow-up answers."""
+    rng = random.Random(seed)
+    conversations = []
+    for _ in range(count):
+        opener_pool = rng.choices(
+            [SALES_TEMPLATES, TRADE_TEMPLATES, SERVICE_TEMPLATES], weights=[6, 2, 2]
+        )[0]
+        messages = [_fill(rng, rng.choice(opener_pool))]
+        for _ in range(turns - 1):
+            messages.append(_fill(rng, rng.choice(FOLLOWUP_TEMPLATES)) or "ok")
+        conversations.append([m or "ok" for m in messages])
+    return conversations
@@ -0,0 +1,56 @@
+from __future__ import annotations
+
+import math
+from typing import Dict, List
+
+
+def percentile(sorted_values: List[float], pct: float) -> float:
+    if not sorted_values:
+        return 0.0
+    rank = (len(sorted_values) - 1) * pct / 100.0
+    lo = math.floor(rank)
+    hi = math.ceil(rank)
+    if lo == hi:
+        return sorted_values[lo]
+    return sorted_values[lo] + (sorted_values[hi] - sorted_values[lo]) * (rank - lo)
+
+
+def summarize(latencies_ms: List[float], elapsed_s: float, errors: int = 0) -> Dict:
+    values = sorted(latencies_ms)
+    count = len(values)
+    return {
+        "count": count,
+        "errors": errors,
+        "rps": round(count / elapsed_s, 2) if elapsed_s > 0 else 0.0,
+        "mean_ms": round(sum(values) / count, 3) if count else 0.0,
+        "p50_ms": round(percentile(values, 50), 3),
+        "p95_ms": round(percentile(values, 95), 3),
+        "p99_ms": round(percentile(values, 99), 3),
+        "max_ms": round(values[-1], 3) if values else 0.0,
+    }
+
+
+def compare(current: Dict[str, Dict], baseline: Dict[str, Dict], threshold: float = 0.10) -> List[Dict]:
+    """Flag routes whose p95/p99 grew or throughput dropped by more than `threshold`."""
+    regressions = []
+    for route, now in current.items():
+        before = baseline.get(route)
+        if not before:
+            continue
+        for key in ("p95_ms", "p99_ms"):
+            if before.get(key) and now[key] > before[key] * (1 + threshold):
+                regressions.append({"route": route, "metric": key, "baseline": before[key], "current": now[key]})
+        if before.get("rps") and now["rps"] < before["rps"] * (1 - threshold):
+            regressions.append({"route": route, "metric": "rps", "baseline": before["rps"], "current": now["rps"]})
+    return regressions
+
+
+def format_table(routes: Dict[str, Dict]) -> str:
+    header = f"{'route':<28}{'count':>8}{'err':>6}{'rps':>10}{'p50':>10}{'p95':>10}{'p99':>10}"
+    lines = [header, "-" * len(header)]
+    for route, row in routes.items():
+        lines.append(
+            f"{route:<28}{row['count']:>8}{row['errors']:>6}{row['rps']:>10.1f}"
+            f"{row['p50_ms']:>10.2f}{row['p95_ms']:>10.2f}{row['p99_ms']:>10.2f}"
+        )
+    return "\n".join(lines)
@@ -0,0 +1,68 @@
+from __future__ import annotations
+
+import copy
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, Tuple
+
+from .metrics import TOOL_CACHE_ENTRIES, TOOL_CACHE_HIT_RATIO, TOOL_CACHE_REQUESTS
+
+DEFAULT_TTL = float(os.getenv("TOOL_CACHE_TTL", "60"))
+DEFAULT_SIZE = int(os.getenv("TOOL_CACHE_SIZE", "2048"))
+
+
+class ResultCache:
+    """Per-process TTL + LRU cache for tool results shared by every session and channel.
+
+    Keys must carry whatever versions the result depends on (e.g. the inventory version) so a
+    reload makes old entries unreachable straight away; LRU eviction then reclaims them. Callers get
+    their own copy of the result, so mutating it never leaks into other sessions.
+    """
+
+    def __init__(self, name: str, max_entries: int = DEFAULT_SIZE, ttl: float = DEFAULT_TTL):
+        self.name = name
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[Hashable, Tuple[float, Any]]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        TOOL_CACHE_ENTRIES.set_function(lambda: len(self._entries), cache=name)
+        TOOL_CACHE_HIT_RATIO.set_function(self.hit_ratio, cache=name)
+
+    def get_or_compute(self, key: Hashable, compute: Callable[[], Any]) -> Any:
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] > now:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                TOOL_CACHE_REQUESTS.inc(cache=self.name, result="hit")
+                return copy.deepcopy(entry[1])
+            self.misses += 1
+        TOOL_CACHE_REQUESTS.inc(cache=self.name, result="miss" if entry is None else "expired")
+        value = compute()
+        with self._lock:
+            self._entries[key] = (now + self.ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return copy.deepcopy(value)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def hit_ratio(self) -> float:
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+    def stats(self) -> Dict:
+        return {
+            "entries": len(self._entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": round(self.hit_ratio(), 4),
+        }
@@ -0,0 +1,364 @@
+from __future__ import annotations
+
+import os
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, time as dtime, timedelta
+from typing import Callable, Dict, List, Optional, Tuple
+from zoneinfo import ZoneInfo
+
+from .metrics import CAMPAIGN_CALLS, CAMPAIGN_ACTIVE_CALLS
+from .schema import DealershipConfig
+from .store import get_store
+from .contacts import normalize_phone
+from .tenancy import DIRECTORY, UnknownDealer
+
+DEFAULT_MAX_CONCURRENT = int(os.getenv("CAMPAIGN_MAX_CONCURRENT", "2"))
+DEFAULT_CALLS_PER_SECOND = float(os.getenv("CAMPAIGN_CALLS_PER_SECOND", "1"))
+DEFAULT_QUIET_HOURS = os.getenv("CAMPAIGN_QUIET_HOURS", "21:00-09:00")
+# A placed call holds its concurrency slot until Ultravox reports call.ended, or this long at most.
+CALL_SLOT_TIMEOUT_S = float(os.getenv("CAMPAIGN_CALL_SLOT_TIMEOUT_S", "900"))
+# Store-held slots outlive the call timeout a little (dialing takes time too), then expire by themselves.
+SLOT_TTL_S = CALL_SLOT_TIMEOUT_S + 120
+CAMPAIGN_MAX_WORKERS = int(os.getenv("CAMPAIGN_MAX_WORKERS", "64"))
+# How often a waiting campaign re-checks config, quiet hours and the cancel flag.
+POLL_S = 5.0
+
+Dialer = Callable[[DealershipConfig, str, Dict], Dict]
+QuietHours = Optional[Tuple[dtime, dtime]]
+
+
+def parse_quiet_hours(spec: str | None) -> QuietHours:
+    """"21:00-09:00" -> (21:00, 09:00); empty / "off" disables quiet hours."""
+    if not spec or spec.strip().lower() == "off":
+        return None
+    start, end = (dtime.fromisoformat(part.strip()) for part in spec.split("-", 1))
+    return start, end
+
+
+def in_quiet_hours(now: datetime, window: QuietHours) -> bool:
+    if window is None:
+        return False
+    start, end = window
+    current = now.time()
+    if start <= end:
+        return start <= current < end
+    return current >= start or current < end
+
+
+def seconds_until_open(now: datetime, window: QuietHours) -> float:
+    if not in_quiet_hours(now, window):
+        return 0.0
+    end = window[1]
+    opens = now.replace(hour=end.hour, minute=end.minute, second=0, microsecond=0)
+    if opens <= now:
+        opens += timedelta(days=1)
+    return (opens - now).total_seconds()
+
+
+class Pacer:
+    """Spaces call starts at most `rate` per second for one campaign (the dealer-wide pace lives in the store)."""
+
+    def __init__(self, rate: float):
+        self.interval = 1.0 / rate if rate > 0 else 0.0
+        self._lock = threading.Lock()
+        self._next = 0.0
+
+    def wait(self, stop: threading.Event) -> bool:
+        with self._lock:
+            now = time.monotonic()
+            slot = max(now, self._next)
+            self._next = slot + self.interval
+        return not stop.wait(slot - now) if slot > now else not stop.is_set()
+
+
+def dealer_limits(config: DealershipConfig) -> Tuple[int, float]:
+    """(max concurrent calls, calls per second) for a dealer, read from its current config."""
+    return (
+        int(config.outbound.get("max_concurrent_calls", DEFAULT_MAX_CONCURRENT)),
+        float(config.outbound.get("calls_per_second", DEFAULT_CALLS_PER_SECOND)),
+    )
+
+
+def take_dealer_slot(dealer_id: str, max_concurrent: int, holder: str) -> str | None:
+    """Claim one of the dealer's `max_concurrent` call slots in the state store; the slot key, or None if all are taken.
+
+    Slots live in the store so the cap holds across workers; they expire on their own if a worker dies mid-call.
+    """
+    store = get_store()
+    for slot in range(max_concurrent):
+        key = f"{dealer_id}:{slot}"
+        if store.add("campaign_slot", key, holder, ttl=SLOT_TTL_S):
+            return key
+    return None
+
+
+def release_dealer_slot(key: str) -> None:
+    get_store().delete("campaign_slot", key)
+
+
+_CALL_ENDED: Dict[str, threading.Event] = {}
+
+
+def notify_call_ended(call_id: str | None) -> None:
+    """Free the slot a campaign call holds; called from the Ultravox call.ended webhook on any worker."""
+    if not call_id:
+        return
+    get_store().set("call_ended", call_id, True, ttl=CALL_SLOT_TIMEOUT_S)
+    event = _CALL_ENDED.get(call_id)
+    if event is not None:
+        event.set()
+
+
+class Campaign:
+    def __init__(
+        self,
+        config: DealershipConfig,
+        numbers: List[str],
+        dial: Dialer,
+        max_concurrent: int | None = None,
+        calls_per_second: float | None = None,
+        source: Dict | None = None,
+    ):
+        self.id = uuid.uuid4().hex[:12]
+        self.config = config
+        self.dial = dial
+        # A campaign may ask for less than the dealer allows, never more: the dealer cap is checked per call.
+        self.requested_concurrent = max(1, int(max_concurrent)) if max_concurrent else None
+        self._own_slots = threading.BoundedSemaphore(self.requested_concurrent or CAMPAIGN_MAX_WORKERS)
+        self._own_pacer = Pacer(float(calls_per_second)) if calls_per_second else None
+        self.source = source or {}
+        self.created_at = datetime.utcnow().isoformat() + "Z"
+        self.status = "pending"
+        self.resume_at: str | None = None
+        self._stop = threading.Event()
+        self._lock = threading.Lock()
+        self._last_saved = 0.0
+        self.calls: Dict[str, Dict] = {}
+        skipped = 0
+        for raw in numbers:
+            number = normalize_phone(raw)
+            if not number or number in self.calls:
+                skipped += 1
+                continue
+            self.calls[number] = {"to": number, "status": "queued"}
+        self.skipped = skipped
+
+    @property
+    def max_concurrent(self) -> int:
+        dealer_max = dealer_limits(self.config)[0]
+        return min(self.requested_concurrent, dealer_max) if self.requested_concurrent else dealer_max
+
+    def start(self) -> "Campaign":
+        threading.Thread(target=self._run, name=f"campaign-{self.id}", daemon=True).start()
+        return self
+
+    def cancel(self) -> None:
+        self._stop.set()
+
+    def _stopped(self) -> bool:
+        # Cancel requests may arrive on any worker; they land in the store.
+        if not self._stop.is_set() and get_store().get("campaign_cancel", self.id):
+            self._stop.set()
+        return self._stop.is_set()
+
+    def _refresh_config(self) -> None:
+        """Pick up edits to the dealer's outbound limits, quiet hours and timezone between calls."""
+        try:
+            self.config = DIRECTORY.config(self.config.dealer_id)
+        except UnknownDealer:
+            pass
+
+    def snapshot(self, details: bool = False) -> Dict:
+        with self._lock:
+            counts: Dict[str, int] = {}
+            for call in self.calls.values():
+                counts[call["status"]] = counts.get(call["status"], 0) + 1
+            data = {
+                "id": self.id,
+                "dealer_id": self.config.dealer_id,
+                "status": self.status,
+                "created_at": self.created_at,
+                "resume_at": self.resume_at,
+                "total": len(self.calls),
+                "skipped": self.skipped,
+                "counts": counts,
+                "max_concurrent": self.max_concurrent,
+                "source": self.source,
+            }
+            if details:
+                data["calls"] = list(self.calls.values())
+            return data
+
+    def _save(self, force: bool = False) -> None:
+        # Progress is readable from any worker; throttle writes while calls stream in.
+        now = time.monotonic()
+        if force or now - self._last_saved > 0.5:
+            self._last_saved = now
+            get_store().set("campaign", self.id, self.snapshot(details=True), ttl=7 * 86400)
+
+    def _update(self, number: str, **fields) -> None:
+        with self._lock:
+            self.calls[number].update(fields)
+        self._save()
+
+    def _seconds_until_open(self) -> float:
+        tz = ZoneInfo(self.config.timezone)
+        quiet_hours = parse_quiet_hours(self.config.outbound.get("quiet_hours", DEFAULT_QUIET_HOURS))
+        return seconds_until_open(datetime.now(tz), quiet_hours)
+
+    def _wait_for_window(self) -> bool:
+        while not self._stopped():
+            self._refresh_config()
+            tz = ZoneInfo(self.config.timezone)
+            wait = self._seconds_until_open()
+            if wait <= 0:
+                self.status = "running"
+                self.resume_at = None
+                return True
+            if self.status != "quiet_hours":
+                self.status = "quiet_hours"
+                self.resume_at = datetime.fromtimestamp(time.time() + wait, tz).isoformat()
+                self._save(force=True)
+            self._stop.wait(min(wait, POLL_S))
+        return False
+
+    def _acquire(self, sem: threading.BoundedSemaphore) -> bool:
+        while not self._stopped():
+            if sem.acquire(timeout=0.5):
+                return True
+        return False
+
+    def _acquire_dealer_slot(self, number: str) -> str | None:
+        while not self._stopped():
+            key = take_dealer_slot(self.config.dealer_id, dealer_limits(self.config)[0], f"{self.id}:{number}")
+            if key is not None:
+                return key
+            self._stop.wait(0.25)
+            self._refresh_config()
+        return None
+
+    def _pace(self) -> bool:
+        """Wait for the dealer-wide pace (a token bucket in the store), then this campaign's own."""
+        while not self._stopped():
+            rate = dealer_limits(self.config)[1]
+            wait = get_store().take_tokens(f"campaign_pace:{self.config.dealer_id}", rate, 1.0) if rate > 0 else 0.0
+            if wait <= 0:
+                return self._own_pacer is None or self._own_pacer.wait(self._stop)
+            self._stop.wait(min(wait, POLL_S))
+        return False
+
+    def _reserve(self, number: str) -> str | None:
+        """Slots and pace for the next call, inside the calling window; None once the campaign is stopped."""
+        while self._wait_for_window() and self._acquire(self._own_slots):
+            slot = self._acquire_dealer_slot(number)
+            if slot is None:
+                self._own_slots.release()
+                return None
+            if self._pace():
+                # Waiting for a slot can take a whole call; don't dial into quiet hours that began meanwhile.
+                self._refresh_config()
+                if self._seconds_until_open() <= 0:
+                    return slot
+            release_dealer_slot(slot)
+            self._own_slots.release()
+        return None
+
+    def _run(self) -> None:
+        self.status = "running"
+        self._save(force=True)
+        with ThreadPoolExecutor(max_workers=CAMPAIGN_MAX_WORKERS, thread_name_prefix=f"campaign-{self.id}") as pool:
+            for number in list(self.calls):
+                slot = self._reserve(number)
+                if slot is None:
+                    break
+                self._update(number, status="dialing")
+                pool.submit(self._call, number, slot)
+        with self._lock:
+            for call in self.calls.values():
+                if call["status"] == "queued":
+                    call["status"] = "cancelled"
+            self.status = "cancelled" if self._stop.is_set() else "completed"
+        self._save(force=True)
+        # Finished campaigns are served from the stored snapshot.
+        _CAMPAIGNS.pop(self.id, None)
+
+    def _call(self, number: str, slot: str) -> None:
+        call_id = None
+        CAMPAIGN_ACTIVE_CALLS.inc(dealer_id=self.config.dealer_id)
+        try:
+            try:
+                result = self.dial(self.config, number, {"campaign_id": self.id})
+            except Exception as exc:  # one bad number must not stop the campaign
+                CAMPAIGN_CALLS.inc(dealer_id=self.config.dealer_id, result="failed")
+                self._update(number, status="failed", error=str(exc), finished_at=datetime.utcnow().isoformat() + "Z")
+                return
+            call_id = result.get("call_id")
+            CAMPAIGN_CALLS.inc(dealer_id=self.config.dealer_id, result="placed")
+            self._update(
+                number,
+                status="in_call",
+                call_id=call_id,
+                twilio_call_sid=result.get("twilio_call_sid"),
+                placed_at=datetime.utcnow().isoformat() + "Z",
+            )
+            self._hold_slot(call_id)
+            self._update(number, status="completed", finished_at=datetime.utcnow().isoformat() + "Z")
+        finally:
+            CAMPAIGN_ACTIVE_CALLS.dec(dealer_id=self.config.dealer_id)
+            release_dealer_slot(slot)
+            self._own_slots.release()
+
+    def _hold_slot(self, call_id: str | None) -> None:
+        if not call_id:
+            return
+        ended = _CALL_ENDED.setdefault(call_id, threading.Event())
+        deadline = time.monotonic() + CALL_SLOT_TIMEOUT_S
+        try:
+            while time.monotonic() < deadline:
+                if ended.wait(0.5) or get_store().get("call_ended", call_id):
+                    return
+        finally:
+            _CALL_ENDED.pop(call_id, None)
+
+
+# Campaigns running on this worker; finished ones drop out and are read back from the store.
+_CAMPAIGNS: Dict[str, Campaign] = {}
+
+
+def start_campaign(
+    config: DealershipConfig,
+    numbers: List[str],
+    dial: Dialer,
+    max_concurrent: int | None = None,
+    calls_per_second: float | None = None,
+    source: Dict | None = None,
+) -> Campaign:
+    campaign = Campaign(config, numbers, dial, max_concurrent, calls_per_second, source)
+    _CAMPAIGNS[campaign.id] = campaign
+    return campaign.start()
+
+
+def get_campaign(campaign_id: str, details: bool = False) -> Dict | None:
+    campaign = _CAMPAIGNS.get(campaign_id)
+    if campaign is not None:
+        return campaign.snapshot(details)
+    stored = get_store().get("campaign", campaign_id)
+    if stored is not None and not details:
+        stored = {k: v for k, v in stored.items() if k != "calls"}
+    return stored
+
+
+def cancel_campaign(campaign_id: str) -> bool:
+    """Stop dialing; works from any worker, since the running campaign polls the flag in the store."""
+    campaign = _CAMPAIGNS.get(campaign_id)
+    if campaign is None:
+        stored = get_store().get("campaign", campaign_id)
+        if stored is None or stored.get("status") in ("completed", "cancelled"):
+            return False
+    get_store().set("campaign_cancel", campaign_id, True, ttl=7 * 86400)
+    if campaign is not None:
+        campaign.cancel()
+    return True
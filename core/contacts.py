@@ -0,0 +1,29 @@
+from __future__ import annotations
+
+import re
+
+
+def normalize_phone(raw: str | None) -> str | None:
+    """Best-effort E.164 normalization (North American default for bare 10-digit numbers)."""
+    if not raw:
+        return None
+    text = str(raw).strip()
+    if text.startswith("client:"):
+        return None
+    digits = re.sub(r"\D", "", text)
+    if not digits:
+        return None
+    if text.startswith("+"):
+        return "+" + digits
+    if len(digits) == 10:
+        return "+1" + digits
+    if len(digits) == 11 and digits.startswith("1"):
+        return "+" + digits
+    return "+" + digits
+
+
+def normalize_email(raw: str | None) -> str | None:
+    if not raw:
+        return None
+    text = str(raw).strip().lower()
+    return text if "@" in text else None
@@ -1,57 +1,184 @@
 from __future__ import annotations
 
 from abc import ABC, abstractmethod
+import hashlib
 import json
-from datetime import datetime
+import os
+import threading
+from datetime import datetime, timedelta
 from pathlib import Path
-from typing import Dict, List
+from typing import Callable, Dict, Iterator, List
 
+from .deadline import remaining
+from .eventlog import append_jsonl, tail_jsonl
+from .leads import LeadIndex, identity_keys
+from .metrics import CRM_WRITE_LATENCY
 from .schema import Lead, ToolResult
+from .stats import clear_lead_stats, record_lead
+from .store import get_store
+from .tracing import span
+
+CRM_LOG_PATH = Path(
+    os.getenv("MOCK_CRM_PATH", Path(__file__).resolve().parent.parent / "data" / "mock_crm.jsonl")
+)
+CRM_DEDUPE_TTL = float(os.getenv("CRM_DEDUPE_TTL", "600"))
+# Identity index for the mock CRM, next to its log so every process writing the log shares it.
+LEAD_INDEX = LeadIndex(Path(os.getenv("LEAD_INDEX_PATH", CRM_LOG_PATH.with_name(f"{CRM_LOG_PATH.stem}_index.db"))))
 
-CRM_LOG_PATH = Path(__file__).resolve().parent.parent / "data" / "mock_crm.jsonl"
 
 class CRMAdapter(ABC):
     @abstractmethod
     def create_lead(self, lead: Lead, metadata: Dict) -> ToolResult:
+        """Write one lead. HTTP-backed adapters should bound requests with `core.deadline.current_deadline()`."""
         raise NotImplementedError
 
 
 class MockCRMAdapter(CRMAdapter):
     def create_lead(self, lead: Lead, metadata: Dict) -> ToolResult:
+        with CRM_WRITE_LATENCY.time(provider="mock"), span("crm.create_lead", provider="mock") as crm_span:
+            left = remaining()
+            if left is not None:
+                crm_span.set(budget_ms=round(left * 1000, 1))
+            return self._create_lead(lead, metadata)
+
+    def _create_lead(self, lead: Lead, metadata: Dict) -> ToolResult:
+        timestamp = datetime.utcnow().isoformat() + "Z"
+        slots = lead.model_dump(mode="json")
+        if not identity_keys(slots):
+            return self._append_anonymous(slots, metadata, timestamp)
+
+        _ensure_lead_index()
+        event = {"at": timestamp, "channel": metadata.get("channel"), "intent": slots.get("intent")}
+        record, changed, created = LEAD_INDEX.upsert(metadata.get("dealer_id", ""), slots, event)
         payload = {
-            "lead": lead.model_dump(),
+            "lead_id": record["lead_id"],
+            "lead": record["lead"],
             "metadata": metadata,
-            "timestamp": datetime.utcnow().isoformat() + "Z",
+            "timestamp": timestamp,
+            "changed": changed,
         }
-        # De-dupe: if last lead is identical, skip write
-        if CRM_LOG_PATH.exists():
-            lines = CRM_LOG_PATH.read_text().strip().splitlines()
-            if lines and lines[-1].strip():
-                last = json.loads(lines[-1])
-                if last.get("lead") == payload["lead"] and last.get("metadata") == payload["metadata"]:
-                    return ToolResult(ok=True, message="Duplicate lead ignored", data=payload)
-
-        CRM_LOG_PATH.parent.mkdir(parents=True, exist_ok=True)
-        CRM_LOG_PATH.write_text(
-            (CRM_LOG_PATH.read_text() if CRM_LOG_PATH.exists() else "")
-            + json.dumps(payload)
-            + "\n"
-        )
-        return ToolResult(ok=True, message="Lead created in Mock CRM", data=payload)
+        data = dict(payload, history=record["history"], created_at=record.get("created_at"), created=created)
+        # Repeat turns that add nothing new are not written again.
+        if not created and not changed:
+            return ToolResult(ok=True, message="Duplicate lead ignored", data=data)
+        append_jsonl(CRM_LOG_PATH, payload)
+        record_lead(payload, created)
+        message = "Lead created in Mock CRM" if created else "Lead updated in Mock CRM"
+        return ToolResult(ok=True, message=message, data=data)
+
+    def _append_anonymous(self, slots: Dict, metadata: Dict, timestamp: str) -> ToolResult:
+        # Without a phone or email there's nothing to merge on; de-dupe identical submissions instead.
+        payload = {"lead": slots, "metadata": metadata, "timestamp": timestamp}
+        fingerprint = hashlib.sha1(
+            json.dumps({"lead": payload["lead"], "metadata": metadata}, sort_keys=True, default=str).encode()
+        ).hexdigest()
+        if not get_store().add("crm_dedupe", fingerprint, payload["timestamp"], ttl=CRM_DEDUPE_TTL):
+            return ToolResult(ok=True, message="Duplicate lead ignored", data=dict(payload, created=False, changed=[]))
+
+        append_jsonl(CRM_LOG_PATH, payload)
+        record_lead(payload, created=True)
+        return ToolResult(ok=True, message="Lead created in Mock CRM", data=dict(payload, created=True, changed=[]))
+
+
+_REBUILD_LOCK = threading.Lock()
+_INDEXED_GENERATIONS: set = set()
+
+
+def _ensure_lead_index() -> None:
+    """Replay the CRM log into the identity index once per store (e.g. after a restart on the memory backend)."""
+    generation = LEAD_INDEX.generation()
+    if generation in _INDEXED_GENERATIONS:
+        return
+    with _REBUILD_LOCK:
+        if generation in _INDEXED_GENERATIONS:
+            return
+        if LEAD_INDEX.needs_rebuild(generation):
+            _replay_log_into_index()
+        _INDEXED_GENERATIONS.add(generation)
+
+
+def _replay_log_into_index() -> None:
+    for record in iter_mock_leads():
+        slots = record.get("lead") or {}
+        if identity_keys(slots):
+            metadata = record.get("metadata") or {}
+            event = {"at": record.get("timestamp"), "channel": metadata.get("channel"), "intent": slots.get("intent")}
+            LEAD_INDEX.upsert(metadata.get("dealer_id", ""), slots, event, lead_id=record.get("lead_id"))
+
+
+def lookup_lead(dealer_id: str, phone: str | None = None, email: str | None = None) -> Dict | None:
+    """Prior lead (merged slots + recent history) for a contact, so a new conversation starts with context."""
+    _ensure_lead_index()
+    return LEAD_INDEX.find(dealer_id, phone=phone, email=email)
 
 
 def read_mock_leads(limit: int = 20) -> List[Dict]:
+    return tail_jsonl(CRM_LOG_PATH, limit)
+
+
+def iter_mock_leads() -> Iterator[Dict]:
     if not CRM_LOG_PATH.exists():
-        return []
-    lines = CRM_LOG_PATH.read_text().strip().splitlines()
-    if not lines or not lines[0].strip():
-        return []
-    return [json.loads(line) for line in lines[-limit:]]
+        return
+    with CRM_LOG_PATH.open() as fh:
+        for line in fh:
+            line = line.strip()
+            if line:
+                yield json.loads(line)
+
+
+def find_mock_leads(
+    dealer_id: str | None = None,
+    intent: str | None = None,
+    lead_type: str | None = None,
+    older_than_days: float | None = None,
+    limit: int | None = None,
+) -> List[Dict]:
+    """Latest record per lead (or phone number, for older lines) in the mock CRM log matching every given filter."""
+    cutoff = datetime.utcnow() - timedelta(days=older_than_days) if older_than_days is not None else None
+    latest: Dict[str, Dict] = {}
+    for record in iter_mock_leads():
+        key = record.get("lead_id") or record.get("lead", {}).get("phone")
+        if key:
+            latest[key] = record
+    matches = []
+    for record in latest.values():
+        lead = record.get("lead", {})
+        if dealer_id and record.get("metadata", {}).get("dealer_id") != dealer_id:
+            continue
+        if intent and lead.get("intent") != intent:
+            continue
+        if lead_type and lead.get("lead_type") != lead_type:
+            continue
+        if cutoff is not None:
+            stamp = datetime.fromisoformat(record.get("timestamp", "").rstrip("Z") or "1970-01-01")
+            if stamp > cutoff:
+                continue
+        matches.append(record)
+        if limit is not None and len(matches) >= limit:
+            break
+    return matches
 
 
 def clear_mock_leads() -> None:
     if CRM_LOG_PATH.exists():
         CRM_LOG_PATH.write_text("")
+    LEAD_INDEX.reset()
+    clear_lead_stats()
+
+
+def create_lead_result(
+    adapter: CRMAdapter,
+    lead: Lead,
+    metadata: Dict,
+    on_error: Callable[[Exception], None] | None = None,
+) -> Dict:
+    """`create_lead` tool result for any channel: an adapter exception becomes `{"ok": False, ...}`, not a crash."""
+    try:
+        return adapter.create_lead(lead, metadata).model_dump()
+    except Exception as exc:
+        if on_error is not None:
+            on_error(exc)
+        return {"ok": False, "message": f"create_lead failed: {exc}"}
 
 
 def get_crm_adapter(provider: str) -> CRMAdapter:
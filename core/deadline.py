@@ -0,0 +1,146 @@
+from __future__ import annotations
+
+import asyncio
+import contextvars
+import copy
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeout
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterator, Optional
+
+from .metrics import TOOL_TIMEOUTS
+from .tracing import span
+
+# Per-tool budgets (ms); TOOL_TIMEOUT_MS_<TOOL> overrides one, e.g. TOOL_TIMEOUT_MS_CREATE_LEAD=1500.
+DEFAULT_TOOL_TIMEOUTS_MS: Dict[str, float] = {
+    "inventory_lookup": 1500,
+    "group_inventory_lookup": 1500,
+    "vin_lookup": 800,
+    "create_lead": 2000,
+}
+SMS_TURN_DEADLINE_MS = float(os.getenv("SMS_TURN_DEADLINE_MS", "25000"))
+# Below this much budget a tool answers "will follow up" instead of starting work it can't finish.
+DEADLINE_MARGIN_MS = float(os.getenv("DEADLINE_MARGIN_MS", "100"))
+
+# Tool answers when the deadline runs out first: the agent hands off instead of leaving dead air.
+INVENTORY_FOLLOW_UP = {
+    "count": 0,
+    "results": [],
+    "message": "Inventory is slow to answer right now. Don't guess; offer to have a specialist follow up with availability.",
+}
+LEAD_FOLLOW_UP = {
+    "ok": True,
+    "pending": True,
+    "message": "Lead is still being saved. Tell the customer a specialist will follow up.",
+}
+
+# Timed-out bodies may keep running, so CRM writes get their own bounded pool: a slow CRM can fill
+# that one, never the threads inventory lookups need.
+_POOLS = {
+    "default": ThreadPoolExecutor(max_workers=int(os.getenv("DEADLINE_WORKERS", "16")), thread_name_prefix="deadline"),
+    "crm": ThreadPoolExecutor(max_workers=int(os.getenv("DEADLINE_CRM_WORKERS", "4")), thread_name_prefix="deadline-crm"),
+}
+_POOL_FOR_TOOL = {"create_lead": "crm"}
+
+
+def _pool(tool: str) -> ThreadPoolExecutor:
+    return _POOLS[_POOL_FOR_TOOL.get(tool, "default")]
+
+
+def tool_timeout_ms(tool: str) -> float:
+    raw = os.getenv(f"TOOL_TIMEOUT_MS_{tool.upper()}")
+    return float(raw) if raw else DEFAULT_TOOL_TIMEOUTS_MS.get(tool, 1000)
+
+
+class Deadline:
+    __slots__ = ("expires_at",)
+
+    def __init__(self, budget_ms: float):
+        self.expires_at = time.monotonic() + budget_ms / 1000
+
+    def remaining(self) -> float:
+        """Seconds left, never negative."""
+        return max(0.0, self.expires_at - time.monotonic())
+
+    def timeout(self, cap: float | None = None) -> float:
+        """A socket timeout that respects both the caller's own cap and the time left."""
+        left = self.remaining()
+        return left if cap is None else min(cap, left)
+
+
+_CURRENT: contextvars.ContextVar[Optional[Deadline]] = contextvars.ContextVar("deadline", default=None)
+
+
+@contextmanager
+def deadline(budget_ms: float) -> Iterator[Deadline]:
+    """Bound everything inside to `budget_ms`; a nested deadline never outlives the enclosing one."""
+    new = Deadline(budget_ms)
+    outer = _CURRENT.get()
+    if outer is not None and outer.expires_at < new.expires_at:
+        new.expires_at = outer.expires_at
+    token = _CURRENT.set(new)
+    try:
+        yield new
+    finally:
+        _CURRENT.reset(token)
+
+
+def current_deadline() -> Deadline | None:
+    return _CURRENT.get()
+
+
+def remaining(default: float | None = None) -> float | None:
+    """Seconds left on the current deadline, or `default` outside of one."""
+    current = _CURRENT.get()
+    return current.remaining() if current is not None else default
+
+
+def _budget(tool: str) -> float:
+    """Seconds this tool may run: its own timeout, clipped to the enclosing turn/request deadline."""
+    budget = tool_timeout_ms(tool) / 1000
+    current = _CURRENT.get()
+    if current is not None:
+        budget = min(budget, current.remaining())
+    return budget - DEADLINE_MARGIN_MS / 1000
+
+
+def _timed_out(tool: str, channel: str, fallback: Dict, stage: str) -> Dict:
+    TOOL_TIMEOUTS.inc(tool=tool, channel=channel, stage=stage)
+    # Deep copy: the fallbacks are shared module constants and callers may mutate what they get back.
+    return dict(copy.deepcopy(fallback), timed_out=True)
+
+
+def run_with_deadline(tool: str, channel: str, fn: Callable[..., Any], fallback: Dict, *args) -> Any:
+    """Run a blocking tool body under its budget; past it, answer with `fallback` and let the work finish behind.
+
+    The body runs on a worker thread inside a copy of this context, so it sees the same deadline
+    and trace. Work already started (e.g. a CRM write) is not abandoned, only no longer waited for;
+    a body still queued for a thread when the budget runs out is cancelled.
+    """
+    with span("deadline", tool=tool) as budget_span:
+        budget = _budget(tool)
+        budget_span.set(budget_ms=round(budget * 1000, 1))
+        if budget <= 0:
+            return _timed_out(tool, channel, fallback, "before_start")
+        with deadline(budget * 1000):
+            future = _pool(tool).submit(contextvars.copy_context().run, fn, *args)
+        try:
+            return future.result(timeout=budget)
+        except FutureTimeout:
+            budget_span.set(timed_out=True)
+            return _timed_out(tool, channel, fallback, "running" if not future.cancel() else "queued")
+
+
+async def arun_with_deadline(tool: str, channel: str, fn: Callable[..., Any], fallback: Dict, *args) -> Any:
+    """`run_with_deadline` for async handlers: the event loop is free while the body runs."""
+    budget = _budget(tool)
+    if budget <= 0:
+        return _timed_out(tool, channel, fallback, "before_start")
+    with deadline(budget * 1000):
+        future = _pool(tool).submit(contextvars.copy_context().run, fn, *args)
+    try:
+        return await asyncio.wait_for(asyncio.wrap_future(future), timeout=budget)
+    except asyncio.TimeoutError:
+        # wait_for cancelled the wrapper, which cancels the body if it hadn't started; a running one finishes.
+        return _timed_out(tool, channel, fallback, "queued" if future.cancelled() else "running")
@@ -0,0 +1,127 @@
+from __future__ import annotations
+
+import json
+import queue
+import threading
+from pathlib import Path
+from typing import Dict, List
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover - non-POSIX hosts fall back to unlocked appends
+    fcntl = None
+
+_STOP = object()
+
+
+def append_lines(path: Path, lines: List[str]) -> None:
+    """Append whole lines under an exclusive lock so concurrent workers never interleave records."""
+    path.parent.mkdir(parents=True, exist_ok=True)
+    data = "".join(line + "\n" for line in lines)
+    with path.open("a") as fh:
+        if fcntl is not None:
+            fcntl.flock(fh.fileno(), fcntl.LOCK_EX)
+        try:
+            fh.write(data)
+            fh.flush()
+        finally:
+            if fcntl is not None:
+                fcntl.flock(fh.fileno(), fcntl.LOCK_UN)
+
+
+def append_jsonl(path: Path, record: Dict) -> None:
+    append_lines(path, [json.dumps(record)])
+
+
+def tail_jsonl(path: Path, limit: int, block: int = 64 * 1024) -> List[Dict]:
+    """The last `limit` records of a JSONL file, reading backwards from the end instead of the whole file."""
+    path = Path(path)
+    if limit <= 0 or not path.exists():
+        return []
+    with path.open("rb") as fh:
+        end = fh.seek(0, 2)
+        data = b""
+        while end > 0 and data.count(b"\n") <= limit:
+            start = max(0, end - block)
+            fh.seek(start)
+            data = fh.read(end - start) + data
+            end = start
+    lines = data.splitlines()
+    if end > 0:
+        lines = lines[1:]  # starts mid-record
+    records = []
+    for line in reversed(lines):
+        if len(records) == limit:
+            break
+        if line.strip():
+            try:
+                records.append(json.loads(line))
+            except ValueError:
+                continue  # a line the writer is still appending (the reader doesn't take its lock)
+    return records[::-1]
+
+
+class EventLogWriter:
+    """Appends JSONL events from a background thread so request handlers never block on file I/O."""
+
+    def __init__(self, path: Path, max_batch: int = 256):
+        self.path = Path(path)
+        self.max_batch = max_batch
+        self._queue: "queue.Queue" = queue.Queue()
+        self._thread: threading.Thread | None = None
+        self._lock = threading.Lock()
+
+    def _ensure_started(self) -> None:
+        if self._thread is not None and self._thread.is_alive():
+            return
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name="event-log-writer", daemon=True)
+                self._thread.start()
+
+    def write(self, event: Dict) -> None:
+        self._ensure_started()
+        self._queue.put(json.dumps(event))
+
+    def depth(self) -> int:
+        return self._queue.qsize()
+
+    def flush(self, timeout: float | None = 5.0) -> None:
+        if self._thread is None:
+            return
+        done = threading.Event()
+        self._queue.put(done)
+        done.wait(timeout)
+
+    def close(self, timeout: float | None = 5.0) -> None:
+        if self._thread is None:
+            return
+        self._queue.put(_STOP)
+        self._thread.join(timeout)
+        self._thread = None
+
+    def _run(self) -> None:
+        while True:
+            item = self._queue.get()
+            batch: List[str] = []
+            waiters: List[threading.Event] = []
+            stop = False
+            while True:
+                if item is _STOP:
+                    stop = True
+                elif isinstance(item, threading.Event):
+                    waiters.append(item)
+                else:
+                    batch.append(item)
+                if stop or len(batch) >= self.max_batch:
+                    break
+                try:
+                    item = self._queue.get_nowait()
+                except queue.Empty:
+                    break
+            if batch:
+                append_lines(self.path, batch)
+            for waiter in waiters:
+                waiter.set()
+            if stop:
+                return
@@ -0,0 +1,139 @@
+from __future__ import annotations
+
+import contextvars
+import heapq
+import math
+import os
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor, wait
+from typing import Dict, List, Tuple
+
+from .deadline import remaining
+from .inventory import MAX_RESULT_LIMIT, RESULT_LIMIT, inventory_path, search_inventory
+from .metrics import FEDERATED_SHARD_FAILURES, FEDERATED_SHARD_LATENCY
+from .schema import InventoryItem, InventoryQuery
+from .tenancy import DIRECTORY, UnknownDealer
+from .tracing import span
+
+SHARD_DEADLINE_MS = float(os.getenv("FEDERATED_SHARD_DEADLINE_MS", "150"))
+_POOL = ThreadPoolExecutor(max_workers=int(os.getenv("FEDERATED_WORKERS", "8")), thread_name_prefix="inventory-shard")
+# A timed-out shard search keeps its thread until it finishes; past this many per shard, a slow feed is
+# reported busy instead of piling more work onto the pool the other shards need.
+SHARD_MAX_IN_FLIGHT = int(os.getenv("FEDERATED_SHARD_MAX_IN_FLIGHT", "2"))
+_IN_FLIGHT: Dict[str, int] = {}
+_IN_FLIGHT_LOCK = threading.Lock()
+
+
+def distance_miles(a: Dict[str, float] | None, b: Dict[str, float] | None) -> float | None:
+    if not a or not b:
+        return None
+    lat1, lng1, lat2, lng2 = map(math.radians, (a["lat"], a["lng"], b["lat"], b["lng"]))
+    h = math.sin((lat2 - lat1) / 2) ** 2 + math.cos(lat1) * math.cos(lat2) * math.sin((lng2 - lng1) / 2) ** 2
+    return 3958.8 * 2 * math.asin(math.sqrt(h))
+
+
+def _search_shard(query: InventoryQuery, dealer_id: str, limit: int) -> Tuple[int, List[InventoryItem]]:
+    start = time.perf_counter()
+    with span("inventory.shard", dealer_id=dealer_id):
+        results = search_inventory(query, dealer_id)
+    FEDERATED_SHARD_LATENCY.observe(time.perf_counter() - start, dealer_id=dealer_id)
+    # Each shard only ships its own top-k by price; the merge below picks the global top-k.
+    return len(results), heapq.nsmallest(limit, results, key=lambda item: item.price)
+
+
+def _submit_shard(query: InventoryQuery, member: str, limit: int) -> Future | None:
+    with _IN_FLIGHT_LOCK:
+        if _IN_FLIGHT.get(member, 0) >= SHARD_MAX_IN_FLIGHT:
+            return None
+        _IN_FLIGHT[member] = _IN_FLIGHT.get(member, 0) + 1
+    future = _POOL.submit(contextvars.copy_context().run, _search_shard, query, member, limit)
+    future.add_done_callback(lambda _: _shard_done(member))
+    return future
+
+
+def _shard_done(member: str) -> None:
+    with _IN_FLIGHT_LOCK:
+        _IN_FLIGHT[member] -= 1
+
+
+def federated_search(
+    query: InventoryQuery,
+    dealer_id: str,
+    sort: str = "price",
+    limit: int | None = None,
+    deadline_ms: float = SHARD_DEADLINE_MS,
+) -> Dict:
+    """Search every inventory shard in `dealer_id`'s group at once and merge the best `limit` units.
+
+    `sort` is "price" (cheapest first) or "distance" (from the asking dealer, then price). Shards
+    that miss `deadline_ms` (or the current tool deadline, if sooner) or fail are reported under
+    "shards" and left out of the answer rather than holding it up.
+    """
+    limit = RESULT_LIMIT if limit is None else max(1, min(int(limit), MAX_RESULT_LIMIT))
+    left = remaining()
+    if left is not None:
+        deadline_ms = min(deadline_ms, left * 1000)
+    origin = DIRECTORY.config(dealer_id)
+    members: List[str] = []
+    seen_paths = set()
+    for member in DIRECTORY.group_members(dealer_id):
+        # Dealers without their own feed share the fallback inventory; search it once.
+        path = inventory_path(member)
+        if path not in seen_paths:
+            seen_paths.add(path)
+            members.append(member)
+
+    with span("inventory.federated_search", dealer_id=dealer_id, shards=len(members), sort=sort) as fed_span:
+        shards: Dict[str, Dict] = {}
+        futures = {}
+        for member in members:
+            future = _submit_shard(query, member, limit)
+            if future is None:
+                shards[member] = {"status": "busy"}
+                FEDERATED_SHARD_FAILURES.inc(dealer_id=member, reason="busy")
+            else:
+                futures[future] = member
+        done, pending = wait(futures, timeout=deadline_ms / 1000)
+        merged = []
+        total = 0
+        for future, member in futures.items():
+            if future in pending:
+                future.cancel()
+                shards[member] = {"status": "timeout"}
+                FEDERATED_SHARD_FAILURES.inc(dealer_id=member, reason="timeout")
+                continue
+            try:
+                count, top = future.result()
+            except Exception as exc:  # one broken feed must not sink the group answer
+                shards[member] = {"status": "error", "error": str(exc)}
+                FEDERATED_SHARD_FAILURES.inc(dealer_id=member, reason="error")
+                continue
+            try:
+                config = DIRECTORY.config(member)
+            except UnknownDealer as exc:  # removed since group_members listed it
+                shards[member] = {"status": "error", "error": str(exc)}
+                FEDERATED_SHARD_FAILURES.inc(dealer_id=member, reason="error")
+                continue
+            shards[member] = {"status": "ok", "count": count}
+            total += count
+            miles = distance_miles(origin.location, config.location)
+            for item in top:
+                key = (miles if miles is not None else math.inf, item.price) if sort == "distance" else (item.price,)
+                merged.append((key, member, config.dealer_name, miles, item))
+        best = heapq.nsmallest(limit, merged, key=lambda entry: entry[0])
+        fed_span.set(count=total, timeouts=sum(1 for s in shards.values() if s["status"] == "timeout"))
+
+    return {
+        "count": total,
+        "results": [
+            {
+                **item.model_dump(),
+                "dealer_id": member,
+                "dealer_name": dealer_name,
+                "distance_miles": round(miles, 1) if miles is not None else None,
+            }
+            for _, member, dealer_name, miles, item in best
+        ],
+        "shards": shards,
+    }
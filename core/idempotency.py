@@ -0,0 +1,50 @@
+from __future__ import annotations
+
+import asyncio
+import os
+import time
+from typing import Awaitable, Callable, Dict
+
+from .metrics import IDEMPOTENT_REQUESTS
+from .store import get_store
+
+IDEMPOTENCY_TTL = float(os.getenv("IDEMPOTENCY_TTL", "3600"))
+# How long a duplicate waits for the first delivery to finish before doing the work itself.
+PENDING_TTL = float(os.getenv("IDEMPOTENCY_PENDING_TTL", "30"))
+_NAMESPACE = "idempotency"
+_PENDING = {"pending": True}
+
+
+async def run_once(route: str, key: str, compute: Callable[[], Awaitable[Dict]]) -> Dict:
+    """Run `compute` once per key; retries within IDEMPOTENCY_TTL get the first response back.
+
+    `compute` returns a response snapshot (status_code / media_type / body / cacheable). Only
+    successful responses are remembered, and not those marked `cacheable: False` (fallbacks), so a
+    delivery that failed can be retried for real. Keys live in the
+    shared state store, so a retry landing on another worker is still recognised. Store calls run on
+    a thread: with STATE_BACKEND=sqlite they can wait on a write lock, which must not stall the loop.
+    """
+    store = get_store()
+    deadline = time.monotonic() + PENDING_TTL
+    while True:
+        if await asyncio.to_thread(store.add, _NAMESPACE, key, _PENDING, PENDING_TTL):
+            IDEMPOTENT_REQUESTS.inc(route=route, result="first")
+            try:
+                snapshot = await compute()
+            except BaseException:
+                await asyncio.shield(asyncio.to_thread(store.delete, _NAMESPACE, key))
+                raise
+            if snapshot["status_code"] < 400 and snapshot.get("cacheable", True):
+                await asyncio.to_thread(store.set, _NAMESPACE, key, snapshot, IDEMPOTENCY_TTL)
+            else:
+                await asyncio.to_thread(store.delete, _NAMESPACE, key)
+            return snapshot
+        cached = await asyncio.to_thread(store.get, _NAMESPACE, key)
+        if cached is not None and not cached.get("pending"):
+            IDEMPOTENT_REQUESTS.inc(route=route, result="replayed")
+            return cached
+        if time.monotonic() > deadline:
+            # The first delivery is stuck; don't hold the retry hostage to it.
+            IDEMPOTENT_REQUESTS.inc(route=route, result="timeout")
+            return await compute()
+        await asyncio.sleep(0.05)
@@ -1,32 +1,551 @@
 from __future__ import annotations
 
+import csv
+import heapq
+import itertools
 import json
+import logging
+import os
+import re
+import threading
+import time
+from collections import defaultdict
+from functools import lru_cache
 from pathlib import Path
-from typing import List
+from typing import Dict, FrozenSet, Iterator, List, Optional, Set, Tuple
 
+from pydantic import ValidationError
+
+from .cache import ResultCache
+from .metrics import INVENTORY_INGEST_RECORDS, INVENTORY_INGEST_SECONDS, INVENTORY_SEARCH_LATENCY
 from .schema import InventoryItem, InventoryQuery
+from .deadline import remaining
+from .tracing import span
 
 INVENTORY_PATH = Path(__file__).resolve().parent.parent / "data" / "mock_inventory.json"
+INVENTORY_DIR = Path(__file__).resolve().parent.parent / "data" / "inventory"
+FEED_SUFFIXES = (".jsonl", ".csv", ".json")
+VIN_SUFFIX_LEN = 8
+RESULT_LIMIT = int(os.getenv("INVENTORY_RESULT_LIMIT", "5"))
+MAX_RESULT_LIMIT = 25
+PRICE_BAND = 10_000
+FUZZY_LIMIT = int(os.getenv("INVENTORY_FUZZY_LIMIT", "5"))
+FUZZY_MIN_SCORE = float(os.getenv("INVENTORY_FUZZY_MIN_SCORE", "0.5"))
+FUZZY_BUDGET_MS = float(os.getenv("INVENTORY_FUZZY_BUDGET_MS", "20"))
+# A changed feed is re-ingested only after its mtime and size have held this long.
+FEED_SETTLE_S = float(os.getenv("INVENTORY_FEED_SETTLE_S", "2"))
+
+_UNITS = {
+    "zero": 0, "oh": 0, "one": 1, "two": 2, "three": 3, "four": 4, "five": 5, "six": 6, "seven": 7,
+    "eight": 8, "nine": 9, "ten": 10, "eleven": 11, "twelve": 12, "thirteen": 13, "fourteen": 14,
+    "fifteen": 15, "sixteen": 16, "seventeen": 17, "eighteen": 18, "nineteen": 19,
+}
+_TENS = {
+    "twenty": 20, "thirty": 30, "forty": 40, "fifty": 50, "sixty": 60, "seventy": 70, "eighty": 80, "ninety": 90,
+}
+# Common DMS export headers -> InventoryItem fields.
+_FEED_ALIASES = {
+    "stock_vin": "vin", "model_year": "year", "list_price": "price", "internet_price": "price",
+    "exterior_color": "color", "ext_color": "color", "stock_status": "status", "series": "trim",
+}
+
+# Full VINs never contain I, O or Q.
+_VIN_RE = re.compile(r"\b[A-HJ-NPR-Z0-9]{17}\b")
+# A partial VIN (the last 8+ characters) uses VIN characters only (no I, O, Q) and must contain a digit,
+# so plain words like "INVENTORY" don't match.
+_PARTIAL_VIN_RE = re.compile(r"\b(?=[A-HJ-NPR-Z]*\d)[A-HJ-NPR-Z0-9]{8,17}\b")
+
+logger = logging.getLogger(__name__)
+_VERSIONS = itertools.count(1)
+
+
+def inventory_path(dealer_id: str | None = None) -> Path:
+    """Per-dealer feed at data/inventory/<dealer_id>.(jsonl|csv|json), falling back to the shared mock inventory."""
+    if dealer_id:
+        for suffix in FEED_SUFFIXES:
+            path = INVENTORY_DIR / f"{dealer_id}{suffix}"
+            if path.exists():
+                return path
+    return INVENTORY_PATH
+
+
+def iter_feed_records(path: Path) -> Iterator[Dict]:
+    """Raw records from a feed, one at a time: CSV and JSON-lines are streamed, a JSON array is parsed whole."""
+    if path.suffix == ".csv":
+        with path.open(newline="") as fh:
+            for row in csv.DictReader(fh):
+                yield row
+    elif path.suffix == ".jsonl":
+        with path.open() as fh:
+            for line in fh:
+                line = line.strip()
+                if line:
+                    try:
+                        yield json.loads(line)
+                    except json.JSONDecodeError:
+                        yield {}
+    else:
+        yield from json.loads(path.read_text())
+
 
+def parse_feed_record(record: Dict) -> InventoryItem:
+    fields = {}
+    for key, value in record.items():
+        if key is None:
+            continue
+        name = str(key).strip().lower().replace(" ", "_")
+        fields[_FEED_ALIASES.get(name, name)] = value.strip() if isinstance(value, str) else value
+    price = fields.get("price")
+    if isinstance(price, str):
+        fields["price"] = int(float(price.replace("$", "").replace(",", "") or 0))
+    elif isinstance(price, float):
+        fields["price"] = int(price)
+    if isinstance(fields.get("vin"), str):
+        fields["vin"] = fields["vin"].upper()
+    return InventoryItem.model_validate(fields)
 
-def load_inventory() -> List[InventoryItem]:
-    if not INVENTORY_PATH.exists():
+
+def load_inventory(path: Path = INVENTORY_PATH) -> List[InventoryItem]:
+    if not path.exists():
         return []
-    data = json.loads(INVENTORY_PATH.read_text())
-    return [InventoryItem.model_validate(item) for item in data]
+    return [parse_feed_record(record) for record in iter_feed_records(path)]
 
 
-def search_inventory(query: InventoryQuery) -> List[InventoryItem]:
-    items = load_inventory()
-    def matches(item: InventoryItem) -> bool:
-        if query.year and item.year != query.year:
-            return False
-        if query.make and item.make.lower() != query.make.lower():
-            return False
-        if query.model and item.model.lower() != query.model.lower():
-            return False
-        if query.trim and item.trim.lower() != query.trim.lower():
+def normalize_vehicle_tokens(text: str | None) -> List[str]:
+    """Spoken/transcribed vehicle names to compact tokens: "x-five" / "X 5" -> x5, "M sixty" -> m60, "x drive" -> xdrive."""
+    if not text:
+        return []
+    words = re.findall(r"[a-z0-9]+", text.lower())
+    numbered: List[str] = []
+    for word in words:
+        if word in _TENS:
+            numbered.append(str(_TENS[word]))
+        elif word in _UNITS:
+            # "sixty five" -> 65
+            if numbered and numbered[-1] in {str(v) for v in _TENS.values()} and _UNITS[word] < 10:
+                numbered[-1] = str(int(numbered[-1]) + _UNITS[word])
+            else:
+                numbered.append(str(_UNITS[word]))
+        else:
+            numbered.append(word)
+    tokens: List[str] = []
+    glue_next = False
+    for pos, word in enumerate(numbered):
+        # ASR splits names apart ("x drive forty i"): a single letter joins the next word (or, at the
+        # end, a preceding number: "m60 i"), and a bare number joins the word before it.
+        prev = tokens[-1] if tokens else ""
+        letter = len(word) == 1 and word.isalpha()
+        last = pos == len(numbered) - 1
+        if glue_next or (prev and word.isdigit() and prev[-1].isalpha()) or (
+            prev and letter and last and prev[-1].isdigit()
+        ):
+            tokens[-1] = prev + word
+            glue_next = False
+        else:
+            tokens.append(word)
+            glue_next = letter
+    return tokens
+
+
+def trigrams(tokens: List[str]) -> FrozenSet[str]:
+    grams = set()
+    for token in tokens:
+        padded = f"${token}$"
+        grams.update(padded[i : i + 3] for i in range(len(padded) - 2))
+    return frozenset(grams)
+
+
+_Name = Tuple[str, str, str]
+# (mtime, size) of a feed file; None when it doesn't exist.
+FeedStamp = Optional[Tuple[float, int]]
+
+
+# Feeds repeat the same make/model/trim thousands of times; share one set per name.
+@lru_cache(maxsize=4096)
+def _make_trigrams(make: str) -> FrozenSet[str]:
+    return trigrams(normalize_vehicle_tokens(make))
+
+
+@lru_cache(maxsize=65536)
+def _detail_trigrams(model: str, trim: str) -> FrozenSet[str]:
+    return trigrams(normalize_vehicle_tokens(model) + normalize_vehicle_tokens(trim))
+
+
+@lru_cache(maxsize=65536)
+def _name_trigrams(make: str, model: str, trim: str) -> FrozenSet[str]:
+    return _make_trigrams(make) | _detail_trigrams(model, trim)
+
+
+class InventoryIndex:
+    """Immutable once built: refreshes build a new index and swap it in, so readers never see a partial catalog."""
+
+    def __init__(self, items: List[InventoryItem], source: Path | None = None, stamp: FeedStamp = None):
+        self.items = items
+        self.source = source
+        self.stamp = stamp
+        # Bumped for every built index; result caches key on it so a swap invalidates them at once.
+        self.version = next(_VERSIONS)
+        self.ingest_stats: Dict[str, int] = {}
+        self._by_vin: Dict[str, int] = {}
+        self._by_vin_suffix: Dict[str, List[int]] = defaultdict(list)
+        # Trigram postings point at distinct make/model/trim names rather than vehicles: a feed has
+        # thousands of units but only a few hundred names, so fuzzy scoring stays cheap.
+        # Make and model/trim get separate postings so a matching make can't carry a different model.
+        self._by_name: Dict[_Name, List[int]] = defaultdict(list)
+        self._make_postings: Dict[str, List[_Name]] = defaultdict(list)
+        self._detail_postings: Dict[str, List[_Name]] = defaultdict(list)
+        for pos, item in enumerate(items):
+            self._by_vin[item.vin] = pos
+            self._by_vin_suffix[item.vin[-VIN_SUFFIX_LEN:]].append(pos)
+            self._by_name[(item.make, item.model, item.trim)].append(pos)
+        for name in self._by_name:
+            for gram in _make_trigrams(name[0]):
+                self._make_postings[gram].append(name)
+            for gram in _detail_trigrams(name[1], name[2]):
+                self._detail_postings[gram].append(name)
+
+    def search(self, query: InventoryQuery) -> List[InventoryItem]:
+        make = query.make.lower() if query.make else None
+        model = query.model.lower() if query.model else None
+        trim = query.trim.lower() if query.trim else None
+
+        def matches(item: InventoryItem) -> bool:
+            if query.year and item.year != query.year:
+                return False
+            if make and item.make.lower() != make:
+                return False
+            if model and item.model.lower() != model:
+                return False
+            if trim and item.trim.lower() != trim:
+                return False
+            return True
+
+        return [item for item in self.items if matches(item)]
+
+    def find_vin(self, vin: str) -> List[InventoryItem]:
+        """Exact VIN via the hash index, or a partial VIN of at least the last 8 characters via the suffix index."""
+        if len(vin) >= 17:
+            pos = self._by_vin.get(vin)
+            return [self.items[pos]] if pos is not None else []
+        if len(vin) < VIN_SUFFIX_LEN:
+            return []
+        candidates = self._by_vin_suffix.get(vin[-VIN_SUFFIX_LEN:], ())
+        return [self.items[pos] for pos in candidates if self.items[pos].vin.endswith(vin)]
+
+    def fuzzy_search(
+        self,
+        query: InventoryQuery,
+        limit: int = FUZZY_LIMIT,
+        min_score: float = FUZZY_MIN_SCORE,
+        budget_ms: float = FUZZY_BUDGET_MS,
+    ) -> List[Tuple[InventoryItem, float]]:
+        """Top-k items by trigram overlap with make/model/trim, best first.
+
+        Make and model/trim are scored separately, each as the share of the query's trigrams found in
+        the item, and each part the query names must reach `min_score`: "BMW X7" never falls back to
+        X5s on the strength of "BMW" alone. The score is the model/trim share when given, else the make's
+        (Dice breaks ties, so tighter names win). Postings are walked rarest-first; if the budget runs
+        out the remaining trigrams are skipped and whatever has been counted so far is ranked.
+        """
+        make_grams = trigrams(normalize_vehicle_tokens(query.make))
+        detail_grams = trigrams(normalize_vehicle_tokens(query.model) + normalize_vehicle_tokens(query.trim))
+        if not make_grams and not detail_grams:
+            items = [item for item in self.items if not query.year or item.year == query.year]
+            return [(item, 1.0) for item in items[:limit]]
+
+        walk = [(self._make_postings.get(gram, ()), 0) for gram in make_grams]
+        walk += [(self._detail_postings.get(gram, ()), 1) for gram in detail_grams]
+        deadline = time.perf_counter() + budget_ms / 1000
+        hits: Dict[_Name, List[int]] = defaultdict(lambda: [0, 0])
+        for names, part in sorted(walk, key=lambda entry: len(entry[0])):
+            for name in names:
+                hits[name][part] += 1
+            if time.perf_counter() > deadline:
+                break
+
+        total = len(make_grams) + len(detail_grams)
+        ranked = []
+        for name, (make_hits, detail_hits) in hits.items():
+            make_score = make_hits / len(make_grams) if make_grams else 1.0
+            detail_score = detail_hits / len(detail_grams) if detail_grams else 1.0
+            if make_score < min_score or detail_score < min_score:
+                continue
+            score = detail_score if detail_grams else make_score
+            dice = 2 * (make_hits + detail_hits) / (total + len(_name_trigrams(*name)))
+            ranked.append((score, make_score, dice, -self._by_name[name][0], name))
+        results: List[Tuple[InventoryItem, float]] = []
+        for score, _, _, _, name in heapq.nlargest(len(ranked), ranked):
+            for pos in self._by_name[name]:
+                item = self.items[pos]
+                if query.year and item.year != query.year:
+                    continue
+                results.append((item, round(score, 3)))
+                if len(results) >= limit:
+                    return results
+        return results
+
+
+def ingest_feed(path: Path, current: InventoryIndex | None = None, stamp: FeedStamp = None) -> InventoryIndex:
+    """Stream a feed and diff it against `current` by VIN.
+
+    Unchanged vehicles keep their existing item objects; only added and updated rows are new.
+    Malformed rows and repeated VINs are skipped.
+    """
+    previous = current._by_vin if current is not None else {}
+    items: List[InventoryItem] = []
+    seen: set = set()
+    stats = {"added": 0, "updated": 0, "unchanged": 0, "removed": 0, "skipped": 0}
+    start = time.perf_counter()
+    with span("inventory.ingest", source=str(path)) as ingest_span:
+        for record in iter_feed_records(path):
+            try:
+                item = parse_feed_record(record)
+            except (ValidationError, ValueError, TypeError):
+                stats["skipped"] += 1
+                continue
+            if item.vin in seen:
+                stats["skipped"] += 1
+                continue
+            seen.add(item.vin)
+            pos = previous.get(item.vin)
+            if pos is not None and current.items[pos] == item:
+                items.append(current.items[pos])
+                stats["unchanged"] += 1
+            else:
+                items.append(item)
+                stats["updated" if pos is not None else "added"] += 1
+        stats["removed"] = len(previous) - stats["updated"] - stats["unchanged"]
+        index = InventoryIndex(items, path, stamp)
+        index.ingest_stats = stats
+        ingest_span.set(**stats)
+    INVENTORY_INGEST_SECONDS.observe(time.perf_counter() - start)
+    for change, count in stats.items():
+        INVENTORY_INGEST_RECORDS.inc(count, change=change)
+    return index
+
+
+_INDEXES: Dict[Path, InventoryIndex] = {}
+_INDEX_LOCK = threading.Lock()
+_REFRESHING: Set[Path] = set()
+# path -> (stamp, monotonic time it was first seen): a changed feed waits until it stops changing.
+_SETTLING: Dict[Path, Tuple[FeedStamp, float]] = {}
+
+
+def _feed_stamp(path: Path) -> FeedStamp:
+    try:
+        stat = path.stat()
+    except OSError:
+        return None
+    return stat.st_mtime, stat.st_size
+
+
+def _settled(path: Path, stamp: FeedStamp) -> bool:
+    """True once `stamp` has stayed the same for FEED_SETTLE_S, so a feed still being written is never ingested."""
+    now = time.monotonic()
+    with _INDEX_LOCK:
+        seen = _SETTLING.get(path)
+        if seen is None or seen[0] != stamp:
+            _SETTLING[path] = (stamp, now)
             return False
-        return True
+        return now - seen[1] >= FEED_SETTLE_S
+
+
+def refresh_inventory(path: Path) -> InventoryIndex | None:
+    """Re-ingest `path` against the live index and swap the result in; the old index serves until then."""
+    stamp = _feed_stamp(path)
+    current = _INDEXES.get(path)
+    try:
+        index = ingest_feed(path, current, stamp) if stamp is not None else InventoryIndex([], path, None)
+        if _feed_stamp(path) != stamp:
+            # Rewritten while we read it: drop this copy and let the next settled check retry.
+            logger.warning("inventory feed %s changed during ingest; keeping the previous catalog", path)
+            return None
+    except (OSError, ValueError, csv.Error) as exc:
+        # Keep serving the last good catalog; try again when the file changes next.
+        logger.warning("inventory refresh failed for %s: %s", path, exc)
+        if current is not None:
+            current.stamp = stamp
+        return None
+    finally:
+        with _INDEX_LOCK:
+            _REFRESHING.discard(path)
+    _INDEXES[path] = index
+    return index
+
+
+def _schedule_refresh(path: Path) -> None:
+    with _INDEX_LOCK:
+        if path in _REFRESHING:
+            return
+        _REFRESHING.add(path)
+    threading.Thread(target=refresh_inventory, args=(path,), name="inventory-refresh", daemon=True).start()
+
+
+def get_inventory_index(dealer_id: str | None = None) -> InventoryIndex:
+    """Parsed inventory for a dealer, kept in memory.
+
+    Only the very first load happens inline. When the feed file changes later (and its mtime and size
+    have held for FEED_SETTLE_S), the diff ingest runs on a background thread and callers keep getting
+    the previous index until the new one is swapped in.
+    """
+    path = inventory_path(dealer_id)
+    stamp = _feed_stamp(path)
+    index = _INDEXES.get(path)
+    if index is not None:
+        if index.stamp != stamp and _settled(path, stamp):
+            _schedule_refresh(path)
+        return index
+    with _INDEX_LOCK:
+        index = _INDEXES.get(path)
+        if index is None:
+            index = ingest_feed(path, None, stamp) if stamp is not None else InventoryIndex([], path, None)
+            _INDEXES[path] = index
+    return index
+
+
+def search_inventory(query: InventoryQuery, dealer_id: str | None = None, fuzzy: bool = True) -> List[InventoryItem]:
+    """Exact match first; when nothing matches (typos, spoken model names) fall back to the trigram index."""
+    return _search(query, dealer_id, fuzzy)[0]
+
+
+def _search(query: InventoryQuery, dealer_id: str | None, fuzzy: bool = True) -> Tuple[List[InventoryItem], str]:
+    """`search_inventory` plus how the results matched: "exact" or "fuzzy"."""
+    with span("inventory.search", dealer_id=dealer_id, **query.model_dump(exclude_none=True)) as search_span:
+        index = get_inventory_index(dealer_id)
+        with INVENTORY_SEARCH_LATENCY.time(mode="exact"):
+            results = index.search(query)
+        mode = "exact"
+        if not results and fuzzy:
+            mode = "fuzzy"
+            # Inside a tool deadline the trigram walk gets whatever is left, so it ranks a partial count instead.
+            left = remaining()
+            budget_ms = FUZZY_BUDGET_MS if left is None else min(FUZZY_BUDGET_MS, left * 1000)
+            with INVENTORY_SEARCH_LATENCY.time(mode="fuzzy"):
+                matches = index.fuzzy_search(query, budget_ms=budget_ms)
+            results = [item for item, _ in matches]
+            search_span.set(scores=[score for _, score in matches])
+        search_span.set(count=len(results), mode=mode)
+        return results, mode
+
+
+def summarize_inventory(items: List[InventoryItem]) -> Dict:
+    """Counts by model, trim and price band: enough for the agent to narrow a broad question."""
+    by_model: Dict[str, int] = defaultdict(int)
+    by_trim: Dict[str, int] = defaultdict(int)
+    by_band: Dict[str, int] = defaultdict(int)
+    for item in items:
+        by_model[f"{item.make} {item.model}"] += 1
+        by_trim[f"{item.model} {item.trim}"] += 1
+        low = item.price // PRICE_BAND * PRICE_BAND
+        by_band[f"{low // 1000}k-{(low + PRICE_BAND) // 1000}k"] += 1
+    prices = [item.price for item in items]
+    return {
+        "by_model": dict(by_model),
+        "by_trim": dict(by_trim),
+        "by_price_band": dict(sorted(by_band.items(), key=lambda kv: int(kv[0].split("k")[0]))),
+        "price_min": min(prices) if prices else None,
+        "price_max": max(prices) if prices else None,
+    }
+
+
+def inventory_page(
+    items: List[InventoryItem],
+    limit: int | None = None,
+    cursor: str | None = None,
+    fields: List[str] | None = None,
+    summary: bool | None = None,
+) -> Dict:
+    """Tool-sized view of a search result.
+
+    Returns at most `limit` vehicles starting at `cursor` (an offset handed back as `next_cursor`),
+    projected to `fields` (vin is always kept so a vehicle can be looked up later). The summary is
+    included when asked for, or by default whenever the matches don't fit on one page;
+    `summary=True` with `limit=0` returns counts only.
+    """
+    limit = RESULT_LIMIT if limit is None else max(0, min(int(limit), MAX_RESULT_LIMIT))
+    try:
+        offset = max(0, int(cursor)) if cursor else 0
+    except (TypeError, ValueError):
+        offset = 0
+    known = [name for name in (fields or []) if name in InventoryItem.model_fields]
+    include = ({"vin", *known}) if known else None
+    page = items[offset : offset + limit]
+    payload: Dict = {
+        "count": len(items),
+        "results": [item.model_dump(include=include) for item in page],
+        "next_cursor": str(offset + limit) if limit and offset + limit < len(items) else None,
+    }
+    if summary or (summary is None and len(items) > limit):
+        payload["summary"] = summarize_inventory(items)
+    return payload
+
+
+def normalize_vin(text: str | None) -> str:
+    """A VIN out of whatever the customer sent: the bare VIN, a spaced/dashed one, or a stock link containing it."""
+    if not text:
+        return ""
+    upper = text.upper()
+    found = _VIN_RE.findall(upper)
+    if found:
+        return found[-1]
+    # "vin ends in R9X12345", ".../used/R9X12345", "last 8: r9x12345": the last VIN-length token with a digit,
+    # preferring one with a letter too, so a phone number in the same message isn't taken for the VIN.
+    partial = _PARTIAL_VIN_RE.findall(upper)
+    if partial:
+        lettered = [token for token in partial if not token.isdigit()]
+        return (lettered or partial)[-1]
+    return re.sub(r"[^A-Z0-9]", "", upper)
+
+
+def lookup_vin(vin: str, dealer_id: str | None = None) -> Dict:
+    normalized = normalize_vin(vin)
+    with span("inventory.vin_lookup", dealer_id=dealer_id, vin=normalized) as vin_span:
+        matches = get_inventory_index(dealer_id).find_vin(normalized)
+        match = "none" if not matches else "exact" if len(normalized) >= 17 else "suffix"
+        vin_span.set(count=len(matches), match=match)
+    return {
+        "vin": normalized,
+        "match": match,
+        "count": len(matches),
+        "results": [item.model_dump() for item in matches[:MAX_RESULT_LIMIT]],
+    }
+
+
+INVENTORY_CACHE = ResultCache("inventory_lookup")
+
+
+def _clean(value: str | None) -> str | None:
+    value = " ".join(value.split()).lower() if value else None
+    return value or None
+
+
+def lookup_inventory(
+    query: InventoryQuery,
+    dealer_id: str | None = None,
+    limit: int | None = None,
+    cursor: str | None = None,
+    fields: List[str] | None = None,
+    summary: bool | None = None,
+) -> Dict:
+    """`inventory_lookup` tool result, served from INVENTORY_CACHE when the same question was asked recently."""
+    query = InventoryQuery(year=query.year, make=_clean(query.make), model=_clean(query.model), trim=_clean(query.trim))
+    index = get_inventory_index(dealer_id)
+    key = (
+        dealer_id,
+        index.version,
+        query.year,
+        query.make,
+        query.model,
+        query.trim,
+        limit,
+        cursor,
+        tuple(sorted(fields)) if fields else None,
+        summary,
+    )
+
+    def compute() -> Dict:
+        results, mode = _search(query, dealer_id)
+        # "fuzzy" tells the agent these are near matches to offer, not the exact vehicle asked for.
+        return dict(inventory_page(results, limit, cursor, fields, summary), match=mode)
 
-    return [item for item in items if matches(item)]
+    return INVENTORY_CACHE.get_or_compute(key, compute)
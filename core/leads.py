@@ -0,0 +1,218 @@
+from __future__ import annotations
+
+import json
+import os
+import sqlite3
+import threading
+import uuid
+from pathlib import Path
+from typing import Dict, List, Tuple
+
+from .contacts import normalize_email, normalize_phone
+from .orchestrator import lead_hotness
+
+LEAD_HISTORY_LIMIT = int(os.getenv("LEAD_HISTORY_LIMIT", "20"))
+
+
+def identity_keys(lead: Dict) -> List[str]:
+    """Contact keys a lead can be found by: E.164 phone first, then lowercased email."""
+    keys = []
+    phone = normalize_phone(lead.get("phone"))
+    if phone:
+        keys.append(f"phone:{phone}")
+    email = normalize_email(lead.get("email"))
+    if email:
+        keys.append(f"email:{email}")
+    return keys
+
+
+def merge_lead(current: Dict, incoming: Dict) -> List[str]:
+    """Fold non-empty incoming slots into `current` in place; returns the fields that changed."""
+    changed = []
+    for field, value in incoming.items():
+        if value is None or value == "" or field == "lead_type":
+            continue
+        if field == "phone":
+            value = normalize_phone(value) or value
+        elif field == "email":
+            value = normalize_email(value) or value
+        elif field == "notes" and current.get("notes") and value not in current["notes"]:
+            value = f"{current['notes']}; {value}"
+        if current.get(field) != value:
+            current[field] = value
+            changed.append(field)
+    # Hotness follows the merged timeline/budget, not just this turn's slots.
+    lead_type = lead_hotness(current.get("timeline"), current.get("budget_max"))
+    if current.get("lead_type") != lead_type:
+        current["lead_type"] = lead_type
+        changed.append("lead_type")
+    return changed
+
+
+class LeadIndex:
+    """Leads keyed by id, with phone/email identity keys pointing at them (per dealer), in SQLite.
+
+    It sits beside the mock CRM log rather than in the state store: every process writing that log
+    (the API workers, the dashboard's SMS agent) shares it whatever STATE_BACKEND is, and nothing in it is
+    evicted. Each upsert is one BEGIN IMMEDIATE transaction, so concurrent writers can't lose a merge.
+    Every row carries the index generation, so clearing the mock CRM is a single counter bump.
+    """
+
+    def __init__(self, path: Path, busy_timeout_ms: int = 5000):
+        self.path = Path(path)
+        self.busy_timeout_ms = busy_timeout_ms
+        self._local = threading.local()
+        self._ready = False
+        self._ready_lock = threading.Lock()
+
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            self._setup()
+            conn = sqlite3.connect(self.path, timeout=self.busy_timeout_ms / 1000, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute(f"PRAGMA busy_timeout={int(self.busy_timeout_ms)}")
+            self._local.conn = conn
+        return conn
+
+    def _setup(self) -> None:
+        with self._ready_lock:
+            if self._ready:
+                return
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            with sqlite3.connect(self.path, timeout=self.busy_timeout_ms / 1000) as conn:
+                conn.executescript(
+                    """
+                    CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value INTEGER NOT NULL);
+                    CREATE TABLE IF NOT EXISTS leads (
+                        generation INTEGER NOT NULL,
+                        lead_id TEXT NOT NULL,
+                        record TEXT NOT NULL,
+                        PRIMARY KEY (generation, lead_id)
+                    );
+                    CREATE TABLE IF NOT EXISTS identities (
+                        generation INTEGER NOT NULL,
+                        dealer_id TEXT NOT NULL,
+                        key TEXT NOT NULL,
+                        lead_id TEXT NOT NULL,
+                        PRIMARY KEY (generation, dealer_id, key)
+                    );
+                    """
+                )
+            self._ready = True
+
+    def _transaction(self) -> sqlite3.Connection:
+        conn = self._conn()
+        conn.execute("BEGIN IMMEDIATE")
+        return conn
+
+    @staticmethod
+    def _generation(conn: sqlite3.Connection) -> int:
+        row = conn.execute("SELECT value FROM meta WHERE key = 'generation'").fetchone()
+        return row[0] if row else 0
+
+    def generation(self) -> int:
+        return self._generation(self._conn())
+
+    def reset(self) -> None:
+        conn = self._transaction()
+        try:
+            gen = self._generation(conn) + 1
+            conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES ('generation', ?)", (gen,))
+            conn.execute("DELETE FROM leads WHERE generation < ?", (gen,))
+            conn.execute("DELETE FROM identities WHERE generation < ?", (gen,))
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+
+    def needs_rebuild(self, generation: int) -> bool:
+        """True once per generation, for the caller that should replay the CRM log (e.g. a fresh index file)."""
+        cur = self._conn().execute("INSERT OR IGNORE INTO meta (key, value) VALUES (?, 1)", (f"built:{generation}",))
+        return cur.rowcount == 1
+
+    def find(self, dealer_id: str, phone: str | None = None, email: str | None = None) -> Dict | None:
+        conn = self._conn()
+        gen = self._generation(conn)
+        for key in identity_keys({"phone": phone, "email": email}):
+            row = conn.execute(
+                "SELECT l.record FROM identities i JOIN leads l ON l.generation = i.generation AND l.lead_id = i.lead_id "
+                "WHERE i.generation = ? AND i.dealer_id = ? AND i.key = ?",
+                (gen, dealer_id, key),
+            ).fetchone()
+            if row:
+                return json.loads(row[0])
+        return None
+
+    def upsert(
+        self,
+        dealer_id: str,
+        lead: Dict,
+        event: Dict,
+        lead_id: str | None = None,
+    ) -> Tuple[Dict, List[str], bool]:
+        """Merge `lead` into the record its phone/email resolve to (or a new one); returns (record, changed, created)."""
+        keys = identity_keys(lead)
+        conn = self._transaction()
+        try:
+            gen = self._generation(conn)
+            linked = {}
+            for key in keys:
+                row = conn.execute(
+                    "SELECT lead_id FROM identities WHERE generation = ? AND dealer_id = ? AND key = ?",
+                    (gen, dealer_id, key),
+                ).fetchone()
+                linked[key] = row[0] if row else None
+            lead_id = next((value for value in linked.values() if value), None) or lead_id or uuid.uuid4().hex[:16]
+
+            row = conn.execute("SELECT record FROM leads WHERE generation = ? AND lead_id = ?", (gen, lead_id)).fetchone()
+            created = row is None
+            if row is not None:
+                record = json.loads(row[0])
+            else:
+                record = {"lead_id": lead_id, "dealer_id": dealer_id, "lead": {}, "history": [], "created_at": event.get("at")}
+            changed = merge_lead(record["lead"], lead)
+            # The phone and the email belonged to two different leads: fold the other one in.
+            for other_id in {value for value in linked.values() if value and value != lead_id}:
+                changed += self._absorb(conn, gen, dealer_id, record, other_id)
+            if created or changed:
+                record["updated_at"] = event.get("at")
+                record["history"] = (record["history"] + [dict(event, changed=changed)])[-LEAD_HISTORY_LIMIT:]
+                conn.execute(
+                    "INSERT OR REPLACE INTO leads (generation, lead_id, record) VALUES (?, ?, ?)",
+                    (gen, lead_id, json.dumps(record)),
+                )
+            # A later turn may add the email to a phone-only lead (or vice versa); link the new key.
+            for key in keys:
+                if linked[key] != lead_id:
+                    conn.execute(
+                        "INSERT OR REPLACE INTO identities (generation, dealer_id, key, lead_id) VALUES (?, ?, ?, ?)",
+                        (gen, dealer_id, key, lead_id),
+                    )
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        return record, changed, created
+
+    @staticmethod
+    def _absorb(conn: sqlite3.Connection, gen: int, dealer_id: str, record: Dict, other_id: str) -> List[str]:
+        """Merge lead `other_id` into `record` (its slots only fill gaps) and re-point its identity keys."""
+        row = conn.execute("SELECT record FROM leads WHERE generation = ? AND lead_id = ?", (gen, other_id)).fetchone()
+        changed = []
+        if row is not None:
+            other = json.loads(row[0])
+            gaps = {field: value for field, value in other["lead"].items() if record["lead"].get(field) in (None, "")}
+            changed = merge_lead(record["lead"], gaps)
+            history = sorted(record["history"] + other["history"], key=lambda item: item.get("at") or "")
+            record["history"] = history[-LEAD_HISTORY_LIMIT:]
+            record["created_at"] = min(filter(None, (record.get("created_at"), other.get("created_at"))), default=None)
+            record["merged_ids"] = sorted({*record.get("merged_ids", []), other_id, *other.get("merged_ids", [])})
+            conn.execute("DELETE FROM leads WHERE generation = ? AND lead_id = ?", (gen, other_id))
+        conn.execute(
+            "UPDATE identities SET lead_id = ? WHERE generation = ? AND dealer_id = ? AND lead_id = ?",
+            (record["lead_id"], gen, dealer_id, other_id),
+        )
+        return changed or ["merged_ids"]
+
@@ -0,0 +1,315 @@
+from __future__ import annotations
+
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterator, List, Sequence, Tuple
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+LabelValues = Tuple[str, ...]
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str], extra: Dict[str, str] | None = None) -> str:
+    pairs = [f'{name}="{_escape(str(value))}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.extend(f'{name}="{_escape(value)}"' for name, value in extra.items())
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) and not value.is_integer() else str(int(value))
+
+
+class _Metric:
+    kind = "untyped"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+
+    def _key(self, labels: Dict[str, str]) -> LabelValues:
+        if set(labels) != set(self.labelnames):
+            raise ValueError(f"{self.name} expects labels {self.labelnames}, got {tuple(labels)}")
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    def header(self) -> List[str]:
+        return [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+
+    def samples(self) -> List[str]:
+        raise NotImplementedError
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        super().__init__(name, documentation, labelnames)
+        self._values: Dict[LabelValues, float] = {}
+
+    def inc(self, amount: float = 1.0, **labels: str) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def value(self, **labels: str) -> float:
+        return self._values.get(self._key(labels), 0.0)
+
+    def samples(self) -> List[str]:
+        with self._lock:
+            items = list(self._values.items())
+        return [f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(val)}" for key, val in items]
+
+
+class Gauge(_Metric):
+    kind = "gauge"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        super().__init__(name, documentation, labelnames)
+        self._values: Dict[LabelValues, float] = {}
+        self._callbacks: Dict[LabelValues, Callable[[], float]] = {}
+
+    def set(self, value: float, **labels: str) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = value
+
+    def inc(self, amount: float = 1.0, **labels: str) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def dec(self, amount: float = 1.0, **labels: str) -> None:
+        self.inc(-amount, **labels)
+
+    def set_function(self, fn: Callable[[], float], **labels: str) -> None:
+        """Evaluate `fn` at scrape time instead of tracking the value on the hot path."""
+        key = self._key(labels)
+        with self._lock:
+            self._callbacks[key] = fn
+
+    def value(self, **labels: str) -> float:
+        key = self._key(labels)
+        if key in self._callbacks:
+            return float(self._callbacks[key]())
+        return self._values.get(key, 0.0)
+
+    def samples(self) -> List[str]:
+        with self._lock:
+            items = list(self._values.items())
+            callbacks = list(self._callbacks.items())
+        lines = [f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(val)}" for key, val in items]
+        for key, fn in callbacks:
+            try:
+                lines.append(f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(float(fn()))}")
+            except Exception:
+                continue
+        return lines
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                 buckets: Sequence[float] = LATENCY_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # Per label set: [count per bucket (non-cumulative, last slot is +Inf), sum]
+        self._values: Dict[LabelValues, Tuple[List[int], List[float]]] = {}
+
+    def observe(self, value: float, **labels: str) -> None:
+        key = self._key(labels)
+        idx = bisect_left(self.buckets, value)
+        with self._lock:
+            entry = self._values.get(key)
+            if entry is None:
+                entry = self._values[key] = ([0] * (len(self.buckets) + 1), [0.0])
+            entry[0][idx] += 1
+            entry[1][0] += value
+
+    @contextmanager
+    def time(self, **labels: str) -> Iterator[None]:
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, **labels)
+
+    def count(self, **labels: str) -> int:
+        entry = self._values.get(self._key(labels))
+        return sum(entry[0]) if entry else 0
+
+    def samples(self) -> List[str]:
+        with self._lock:
+            items = [(key, list(counts), total[0]) for key, (counts, total) in self._values.items()]
+        lines = []
+        for key, counts, total in items:
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += count
+                labels = _format_labels(self.labelnames, key, {"le": _format_value(bound)})
+                lines.append(f"{self.name}_bucket{labels} {cumulative}")
+            labels = _format_labels(self.labelnames, key)
+            lines.append(f"{self.name}_sum{labels} {total!r}")
+            lines.append(f"{self.name}_count{labels} {cumulative}")
+        return lines
+
+
+class Registry:
+    def __init__(self):
+        self._metrics: Dict[str, _Metric] = {}
+        self._lock = threading.Lock()
+
+    def register(self, metric: _Metric) -> _Metric:
+        with self._lock:
+            existing = self._metrics.get(metric.name)
+            if existing is not None:
+                return existing
+            self._metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Counter:
+        return self.register(Counter(name, documentation, labelnames))
+
+    def gauge(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Gauge:
+        return self.register(Gauge(name, documentation, labelnames))
+
+    def histogram(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                  buckets: Sequence[float] = LATENCY_BUCKETS) -> Histogram:
+        return self.register(Histogram(name, documentation, labelnames, buckets))
+
+    def render(self) -> str:
+        """Prometheus text exposition format (version 0.0.4)."""
+        with self._lock:
+            metrics = list(self._metrics.values())
+        lines: List[str] = []
+        for metric in metrics:
+            lines.extend(metric.header())
+            lines.extend(metric.samples())
+        return "\n".join(lines) + "\n"
+
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+REGISTRY = Registry()
+
+HTTP_REQUESTS = REGISTRY.counter(
+    "http_requests_total", "HTTP requests handled, by route template and status.", ("method", "route", "status")
+)
+HTTP_LATENCY = REGISTRY.histogram(
+    "http_request_duration_seconds", "HTTP request latency by route template.", ("method", "route")
+)
+TOOL_LATENCY = REGISTRY.histogram(
+    "tool_duration_seconds", "Agent tool execution time.", ("tool", "channel")
+)
+TOOL_ERRORS = REGISTRY.counter(
+    "tool_errors_total", "Agent tool executions that raised or returned ok=false.", ("tool", "channel")
+)
+UPSTREAM_LATENCY = REGISTRY.histogram(
+    "upstream_request_duration_seconds", "Latency of calls to Ultravox/Twilio.", ("service", "operation")
+)
+UPSTREAM_ERRORS = REGISTRY.counter(
+    "upstream_errors_total", "Failed calls to Ultravox/Twilio (HTTP >= 400 or transport error).",
+    ("service", "operation", "reason"),
+)
+CRM_WRITE_LATENCY = REGISTRY.histogram(
+    "crm_write_duration_seconds", "CRM adapter create_lead latency.", ("provider",)
+)
+EVENT_LOG_QUEUE_DEPTH = REGISTRY.gauge(
+    "event_log_queue_depth", "Events waiting to be appended to the voice log.", ()
+)
+STARTUP_SECONDS = REGISTRY.gauge(
+    "startup_seconds", "Time spent in each server startup phase.", ("phase",)
+)
+FIRST_REQUEST_SECONDS = REGISTRY.gauge(
+    "first_request_duration_seconds", "Latency of the first request served on each route after startup.", ("route",)
+)
+INVENTORY_SEARCH_LATENCY = REGISTRY.histogram(
+    "inventory_search_duration_seconds", "Inventory search latency by match mode (exact / fuzzy).", ("mode",)
+)
+INVENTORY_INGEST_RECORDS = REGISTRY.counter(
+    "inventory_ingest_records_total", "Feed records seen by inventory ingest, by outcome.", ("change",)
+)
+INVENTORY_INGEST_SECONDS = REGISTRY.histogram(
+    "inventory_ingest_duration_seconds", "Time to stream, diff and index one inventory feed.", (),
+    buckets=(0.01, 0.05, 0.1, 0.5, 1.0, 5.0, 10.0, 30.0, 60.0, 120.0, 300.0),
+)
+TOOL_CACHE_REQUESTS = REGISTRY.counter(
+    "tool_cache_requests_total", "Tool result cache lookups by outcome (hit / miss / expired).", ("cache", "result")
+)
+TOOL_CACHE_ENTRIES = REGISTRY.gauge(
+    "tool_cache_entries", "Entries currently held in each tool result cache.", ("cache",)
+)
+TOOL_CACHE_HIT_RATIO = REGISTRY.gauge(
+    "tool_cache_hit_ratio", "Hits / lookups since start for each tool result cache.", ("cache",)
+)
+FEDERATED_SHARD_LATENCY = REGISTRY.histogram(
+    "federated_shard_duration_seconds", "Per-dealer shard search time inside a federated inventory search.", ("dealer_id",)
+)
+FEDERATED_SHARD_FAILURES = REGISTRY.counter(
+    "federated_shard_failures_total", "Shards left out of a federated search (deadline / error).", ("dealer_id", "reason")
+)
+IDEMPOTENT_REQUESTS = REGISTRY.counter(
+    "idempotent_requests_total", "Webhook deliveries by idempotency outcome (first / replayed / timeout).",
+    ("route", "result"),
+)
+CIRCUIT_STATE = REGISTRY.gauge(
+    "circuit_breaker_state", "Upstream circuit breaker state (0 closed, 1 half-open, 2 open).", ("service",)
+)
+CIRCUIT_TRANSITIONS = REGISTRY.counter(
+    "circuit_breaker_transitions_total", "Circuit breaker state changes, by the state entered.", ("service", "state")
+)
+HEDGED_REQUESTS = REGISTRY.counter(
+    "hedged_requests_total", "Hedged upstream requests: sent, and which copy answered first.", ("service", "outcome")
+)
+CAMPAIGN_CALLS = REGISTRY.counter(
+    "campaign_calls_total", "Outbound campaign dial attempts by result (placed / failed).", ("dealer_id", "result")
+)
+CAMPAIGN_ACTIVE_CALLS = REGISTRY.gauge(
+    "campaign_active_calls", "Campaign calls currently dialing or connected, per dealer.", ("dealer_id",)
+)
+ADMISSION_REJECTIONS = REGISTRY.counter(
+    "admission_rejections_total", "Requests turned away with 429 by reason (rate / concurrency).",
+    ("dealer_id", "route", "reason"),
+)
+ADMISSION_IN_FLIGHT = REGISTRY.gauge(
+    "admission_in_flight", "Admitted requests currently running, per dealer and route class.", ("dealer_id", "route")
+)
+LEAD_SCORING_SECONDS = REGISTRY.histogram(
+    "lead_scoring_duration_seconds", "Batch lead re-scoring runs (incremental / full).", ("mode",),
+    buckets=(0.01, 0.05, 0.1, 0.5, 1.0, 5.0, 10.0, 30.0, 60.0, 120.0),
+)
+LEAD_SCORING_LEADS = REGISTRY.counter(
+    "lead_scoring_leads_total", "Leads whose score was recomputed by the batch job.", ("mode",)
+)
+TRANSCRIPT_LEADS = REGISTRY.counter(
+    "transcript_leads_total",
+    "Finished-call transcripts mined for leads by outcome (created / updated / duplicate / no_signal / error).",
+    ("result",),
+)
+TRANSCRIPT_EXTRACT_SECONDS = REGISTRY.histogram(
+    "transcript_extract_duration_seconds", "Slot extraction time per transcript in the worker pool."
+)
+SMS_MODEL_TURNS = REGISTRY.counter(
+    "sms_model_turns_total", "SMS agent turns by model tier and the classifier's reason.", ("dealer_id", "tier", "reason")
+)
+SMS_MODEL_LATENCY = REGISTRY.histogram(
+    "sms_model_turn_duration_seconds", "Agent run time per SMS turn (LLM calls plus tools), by model tier.", ("tier",)
+)
+SMS_MODEL_TOKENS = REGISTRY.counter(
+    "sms_model_tokens_total", "LLM tokens used by SMS turns, by model tier and kind (input / output).", ("tier", "kind")
+)
+TOOL_TIMEOUTS = REGISTRY.counter(
+    "tool_timeouts_total",
+    "Tool calls answered with a fallback because their deadline ran out (before_start / running).",
+    ("tool", "channel", "stage"),
+)
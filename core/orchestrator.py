@@ -32,6 +32,40 @@ def _extract_vehicle(message: str):
     return None
 
 
+def _normalize_intent(raw: str) -> str:
+    text = (raw or "").lower()
+    if "service" in text:
+        return "service"
+    if "trade" in text:
+        return "trade_in"
+    return "sales"
+
+
+def _normalize_timeline(raw: str | None) -> str | None:
+    if not raw:
+        return None
+    text = raw.lower()
+    if any(x in text for x in ["asap", "now", "today", "this week", "next week"]):
+        return "asap"
+    if any(x in text for x in ["1-3", "few months", "next month"]):
+        return "1-3 months"
+    if any(x in text for x in ["3-6", "quarter"]):
+        return "3-6 months"
+    if any(x in text for x in ["later", "not sure", "someday"]):
+        return "later"
+    return None
+
+
+def lead_hotness(timeline: str | None, budget_max: int | None) -> str:
+    if timeline == "asap":
+        return "urgent"
+    if timeline in {"1-3 months", "3-6 months"}:
+        return "medium"
+    if budget_max and budget_max >= 70000:
+        return "medium"
+    return "cold"
+
+
 def update_lead_from_message(lead: Lead, message: str) -> Lead:
     if not lead.intent:
         lead.intent = _detect_intent(message)
@@ -69,3 +103,14 @@ def fallback_sms_turn(state: Dict, message: str) -> Tuple[str, Lead]:
     state["lead"] = lead.model_dump()
     reply = next_question(lead)
     return reply, lead
+
+
+def route_lead(routing: Dict, intent: str | None) -> Dict:
+    """Return routing queue for intent."""
+    intent = (intent or "sales").strip().lower()
+    queue = routing.get("nurture_queue")
+    if intent == "sales":
+        queue = routing.get("sales_queue")
+    elif intent == "service":
+        queue = routing.get("service_queue")
+    return {"queue": queue}
@@ -0,0 +1,116 @@
+from __future__ import annotations
+
+import asyncio
+import os
+import threading
+from typing import Dict, Tuple
+
+from .metrics import ADMISSION_IN_FLIGHT, ADMISSION_REJECTIONS
+from .schema import DealershipConfig
+from .store import MemoryStore, StateStore, get_store
+
+# route class -> (requests per second, burst, max concurrent requests per process)
+DEFAULT_LIMITS: Dict[str, Tuple[float, float, int]] = {
+    "outbound": (1.0, 5.0, 4),
+    "token": (2.0, 10.0, 8),
+    "tools": (20.0, 40.0, 16),
+}
+ENABLED = os.getenv("RATE_LIMITS", "on").lower() != "off"
+# "memory": per-process buckets; "store": buckets in the state store (shared when STATE_BACKEND=sqlite).
+BACKEND = os.getenv("RATE_LIMIT_BACKEND", "memory").lower()
+
+_LOCAL = MemoryStore()
+
+
+def _env_limits(route: str) -> Tuple[float, float, int]:
+    """RATE_LIMIT_<ROUTE>="rate,burst,concurrency" overrides the built-in default for every dealer."""
+    rate, burst, concurrency = DEFAULT_LIMITS[route]
+    raw = os.getenv(f"RATE_LIMIT_{route.upper()}")
+    if raw:
+        parts = [p.strip() for p in raw.split(",")]
+        rate = float(parts[0]) if parts[0] else rate
+        burst = float(parts[1]) if len(parts) > 1 and parts[1] else burst
+        concurrency = int(parts[2]) if len(parts) > 2 and parts[2] else concurrency
+    return rate, burst, concurrency
+
+
+def limits_for(config: DealershipConfig, route: str) -> Tuple[float, float, int]:
+    rate, burst, concurrency = _env_limits(route)
+    override = config.rate_limits.get(route) or {}
+    return (
+        float(override.get("rate", rate)),
+        float(override.get("burst", burst)),
+        int(override.get("concurrency", concurrency)),
+    )
+
+
+def _backend() -> StateStore:
+    return get_store() if BACKEND == "store" else _LOCAL
+
+
+class Rejected(Exception):
+    def __init__(self, reason: str, retry_after: float):
+        super().__init__(reason)
+        self.reason = reason
+        self.retry_after = retry_after
+
+
+class AdmissionController:
+    """Token bucket plus in-flight cap per (dealer, route class); rejects immediately instead of queueing."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._in_flight: Dict[Tuple[str, str], int] = {}
+
+    def admit(self, config: DealershipConfig, route: str) -> "_Admission":
+        rate, burst, concurrency = limits_for(config, route)
+        dealer_id = config.dealer_id
+        key = (dealer_id, route)
+        with self._lock:
+            if self._in_flight.get(key, 0) >= concurrency:
+                ADMISSION_REJECTIONS.inc(dealer_id=dealer_id, route=route, reason="concurrency")
+                raise Rejected("concurrency", 1.0)
+            self._in_flight[key] = self._in_flight.get(key, 0) + 1
+        # Concurrency is checked first so a rejected request doesn't also burn a token.
+        wait = _backend().take_tokens(f"{dealer_id}:{route}", rate, burst)
+        if wait > 0:
+            self._release(key)
+            ADMISSION_REJECTIONS.inc(dealer_id=dealer_id, route=route, reason="rate")
+            raise Rejected("rate", wait)
+        ADMISSION_IN_FLIGHT.inc(dealer_id=dealer_id, route=route)
+        return _Admission(self, key)
+
+    async def aadmit(self, config: DealershipConfig, route: str) -> "_Admission":
+        """`admit` for async handlers: store-backed buckets may wait on a SQLite write lock, so off the loop."""
+        if BACKEND != "store":
+            return self.admit(config, route)
+        task = asyncio.ensure_future(asyncio.to_thread(self.admit, config, route))
+        try:
+            return await asyncio.shield(task)
+        except asyncio.CancelledError:
+            # The caller went away mid-admit; hand back the slot the thread may still take.
+            task.add_done_callback(lambda done: done.exception() is None and done.result().__exit__())
+            raise
+
+    def _release(self, key: Tuple[str, str]) -> None:
+        with self._lock:
+            self._in_flight[key] -= 1
+
+    def in_flight(self, dealer_id: str, route: str) -> int:
+        return self._in_flight.get((dealer_id, route), 0)
+
+
+class _Admission:
+    def __init__(self, controller: AdmissionController, key: Tuple[str, str]):
+        self.controller = controller
+        self.key = key
+
+    def __enter__(self) -> "_Admission":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.controller._release(self.key)
+        ADMISSION_IN_FLIGHT.dec(dealer_id=self.key[0], route=self.key[1])
+
+
+ADMISSION = AdmissionController()
@@ -0,0 +1,170 @@
+from __future__ import annotations
+
+import asyncio
+import functools
+import threading
+import time
+from collections import deque
+from typing import Callable, Deque, List, TypeVar
+
+from .metrics import CIRCUIT_STATE, CIRCUIT_TRANSITIONS, HEDGED_REQUESTS
+
+T = TypeVar("T")
+
+CLOSED, HALF_OPEN, OPEN = "closed", "half_open", "open"
+_STATE_VALUE = {CLOSED: 0, HALF_OPEN: 1, OPEN: 2}
+
+
+class CircuitBreaker:
+    """Opens after `failure_threshold` consecutive failures, then fails fast for `reset_timeout` seconds.
+
+    After the cool-down a single trial request is let through (half-open): success closes the
+    breaker, failure re-opens it for another `reset_timeout`. A trial that is abandoned without either
+    (`release_trial`) or never reports back within `reset_timeout` frees the slot for the next request.
+    """
+
+    def __init__(self, name: str, failure_threshold: int = 5, reset_timeout: float = 20.0):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self._lock = threading.Lock()
+        self._state = CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._trial_in_flight = False
+        self._trial_started = 0.0
+        CIRCUIT_STATE.set_function(lambda: _STATE_VALUE[self.state], service=name)
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            if self._state == OPEN and time.monotonic() - self._opened_at >= self.reset_timeout:
+                self._transition(HALF_OPEN)
+            return self._state
+
+    def _transition(self, state: str) -> None:
+        if state != self._state:
+            self._state = state
+            CIRCUIT_TRANSITIONS.inc(service=self.name, state=state)
+
+    def allow(self) -> bool:
+        state = self.state
+        with self._lock:
+            if state == CLOSED:
+                return True
+            now = time.monotonic()
+            if state == HALF_OPEN and (not self._trial_in_flight or now - self._trial_started >= self.reset_timeout):
+                self._trial_in_flight = True
+                self._trial_started = now
+                return True
+            return False
+
+    def release_trial(self) -> None:
+        """The caller gave up (cancelled, unexpected error) without an outcome to record."""
+        with self._lock:
+            self._trial_in_flight = False
+
+    def record_success(self) -> None:
+        with self._lock:
+            self._failures = 0
+            self._trial_in_flight = False
+            self._transition(CLOSED)
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self._failures += 1
+            self._trial_in_flight = False
+            if self._state == HALF_OPEN or self._failures >= self.failure_threshold:
+                self._opened_at = time.monotonic()
+                self._transition(OPEN)
+
+
+class LatencyTracker:
+    """Rolling window of recent successful latencies; `hedge_delay` is their p95, clamped."""
+
+    def __init__(self, window: int = 200, min_samples: int = 20, default: float = 1.0,
+                 floor: float = 0.05, ceiling: float = 5.0):
+        self.min_samples = min_samples
+        self.default = default
+        self.floor = floor
+        self.ceiling = ceiling
+        self._samples: Deque[float] = deque(maxlen=window)
+
+    def observe(self, seconds: float) -> None:
+        self._samples.append(seconds)
+
+    def p95(self) -> float | None:
+        if len(self._samples) < self.min_samples:
+            return None
+        ordered = sorted(self._samples)
+        return ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))]
+
+    def hedge_delay(self) -> float:
+        p95 = self.p95()
+        return min(self.ceiling, max(self.floor, p95 if p95 is not None else self.default))
+
+
+async def hedged(
+    service: str,
+    attempt: Callable[[], T],
+    deadline: float,
+    hedge_delay: float,
+    is_good: Callable[[T], bool],
+    discard: Callable[[T], None] | None = None,
+) -> T:
+    """Run blocking `attempt` in a thread; if it hasn't answered after `hedge_delay`, fire a second copy.
+
+    The first good answer wins, and anything the other copy returns later goes to `discard` (e.g.
+    to tear down a duplicate call). Only slowness is hedged: a fast failure is returned / raised as
+    is. Raises TimeoutError once `deadline` seconds have passed without a good answer.
+    """
+    loop = asyncio.get_running_loop()
+    stop_at = loop.time() + deadline
+    hedge_at = loop.time() + hedge_delay
+    primary = asyncio.ensure_future(asyncio.to_thread(attempt))
+    pending = {primary}
+    hedge_sent = False
+    finished: List[asyncio.Future] = []
+    winner: asyncio.Future | None = None
+    last_result: asyncio.Future | None = None
+    last_exc: List[BaseException] = []
+    try:
+        while pending:
+            now = loop.time()
+            if now >= stop_at:
+                raise TimeoutError(f"{service} did not answer within {deadline:.2f}s")
+            wake_at = stop_at if hedge_sent else min(stop_at, hedge_at)
+            done, pending = await asyncio.wait(pending, timeout=wake_at - now, return_when=asyncio.FIRST_COMPLETED)
+            finished.extend(done)
+            for task in done:
+                exc = task.exception()
+                if exc is not None:
+                    last_exc.append(exc)
+                    continue
+                if is_good(task.result()):
+                    if hedge_sent:
+                        HEDGED_REQUESTS.inc(service=service, outcome="hedge_won" if task is not primary else "primary_won")
+                    winner = task
+                    return task.result()
+                last_result = task
+            if not done and not hedge_sent and loop.time() >= hedge_at:
+                hedge_sent = True
+                HEDGED_REQUESTS.inc(service=service, outcome="sent")
+                pending.add(asyncio.ensure_future(asyncio.to_thread(attempt)))
+        if last_result is not None:
+            winner = last_result
+            return last_result.result()
+        raise last_exc[-1]
+    finally:
+        if discard is not None:
+            # Both copies can land in the same wait round: the one not returned is discarded too.
+            for task in finished:
+                if task is not winner:
+                    _discard_late(discard, task)
+            for task in pending:
+                task.add_done_callback(functools.partial(_discard_late, discard))
+
+
+def _discard_late(discard: Callable[[T], None], task: asyncio.Task) -> None:
+    if not task.cancelled() and task.exception() is None:
+        discard(task.result())
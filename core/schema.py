@@ -1,7 +1,7 @@
 from __future__ import annotations
 
 from enum import Enum
-from typing import Optional, Literal
+from typing import Dict, List, Optional, Literal
 
 from pydantic import BaseModel, Field
 
@@ -58,8 +58,14 @@ class DealershipConfig(BaseModel):
     brand: str
     logo_url: Optional[str] = None
     timezone: str
+    phone_numbers: List[str] = Field(default_factory=list)
+    group_id: Optional[str] = None
+    location: Optional[Dict[str, float]] = None
     tone: str
     qualifying_questions: dict
     routing: dict
     crm: dict
     compliance: dict
+    outbound: dict = Field(default_factory=dict)
+    rate_limits: dict = Field(default_factory=dict)
+    models: dict = Field(default_factory=dict)
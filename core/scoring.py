@@ -0,0 +1,353 @@
+from __future__ import annotations
+
+import argparse
+import hashlib
+import json
+import os
+import threading
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, List, Tuple
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover - non-POSIX hosts run the job unlocked
+    fcntl = None
+
+import numpy as np
+
+from .contacts import normalize_email, normalize_phone
+from .crm import CRM_LOG_PATH
+from .metrics import LEAD_SCORING_LEADS, LEAD_SCORING_SECONDS
+
+SCORES_PATH = Path(
+    os.getenv("LEAD_SCORES_PATH", Path(__file__).resolve().parent.parent / "data" / "lead_scores.npz")
+)
+SCORE_HALF_LIFE_DAYS = float(os.getenv("LEAD_SCORE_HALF_LIFE_DAYS", "14"))
+HOT_SCORE = 60.0
+WARM_SCORE = 30.0
+
+# Small integer codes keep the table compact; index 0 is "unknown".
+TIMELINES = ("", "asap", "1-3 months", "3-6 months", "later")
+INTENTS = ("", "sales", "trade_in", "service", "nurture")
+CHANNELS = {"sms": 1, "voice": 2}
+OTHER_CHANNEL = 4
+_TIMELINE_WEIGHT = np.array([0.3, 1.0, 0.7, 0.45, 0.2], dtype=np.float32)
+_INTENT_WEIGHT = np.array([0.8, 1.0, 0.9, 0.6, 0.4], dtype=np.float32)
+
+COLUMNS = {
+    "key": "S64",
+    "dealer_id": "S32",
+    "first_ts": np.float64,
+    "last_ts": np.float64,
+    "touches": np.int32,
+    "channels": np.uint8,
+    "timeline": np.int8,
+    "intent": np.int8,
+    "budget": np.float32,
+    "score": np.float32,
+    "scored_at": np.float64,
+}
+Table = Dict[str, np.ndarray]
+
+_LOCK = threading.Lock()
+
+
+def empty_table() -> Table:
+    return {name: np.empty(0, dtype=dtype) for name, dtype in COLUMNS.items()}
+
+
+def load_table(path: Path = SCORES_PATH) -> Tuple[Table, Dict]:
+    if not path.exists():
+        return empty_table(), {"offset": 0}
+    with np.load(path, allow_pickle=False) as data:
+        table = {name: data[name] for name in COLUMNS}
+        meta = json.loads(str(data["meta"]))
+    return table, meta
+
+
+def save_table(table: Table, meta: Dict, path: Path = SCORES_PATH) -> None:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_name(path.name + ".tmp")
+    with tmp.open("wb") as fh:
+        np.savez(fh, meta=np.array(json.dumps(meta)), **table)
+    os.replace(tmp, path)
+
+
+def _lead_key(record: Dict) -> str | None:
+    if record.get("lead_id"):
+        return str(record["lead_id"])
+    lead = record.get("lead") or {}
+    phone = normalize_phone(lead.get("phone"))
+    if phone:
+        return f"phone:{phone}"
+    email = normalize_email(lead.get("email"))
+    return f"email:{email}" if email else None
+
+
+def _epoch_seconds(stamps: List[str]) -> np.ndarray:
+    """ISO-8601 UTC timestamps to epoch seconds in one vectorized parse; unparseable ones become 0."""
+    try:
+        parsed = np.array(stamps, dtype="datetime64[s]")
+    except ValueError:
+        parsed = np.array([_parse_stamp(stamp) for stamp in stamps], dtype="datetime64[s]")
+    seconds = parsed.astype(np.int64).astype(np.float64)
+    seconds[np.isnat(parsed)] = 0.0
+    return seconds
+
+
+def _parse_stamp(stamp: str) -> np.datetime64:
+    try:
+        return np.datetime64(stamp, "s")
+    except ValueError:
+        return np.datetime64("NaT")
+
+
+def read_log_columns(path: Path, offset: int) -> Tuple[Table, int]:
+    """Parse the log from `offset` into per-line columns; returns them and the offset after the last full line."""
+    with path.open("rb") as fh:
+        fh.seek(offset)
+        chunk = fh.read()
+    end = chunk.rfind(b"\n") + 1
+    cols: Dict[str, List] = {name: [] for name in ("key", "dealer_id", "ts", "channel", "timeline", "intent", "budget")}
+    timeline_codes = {name: i for i, name in enumerate(TIMELINES)}
+    intent_codes = {name: i for i, name in enumerate(INTENTS)}
+    decode = json.JSONDecoder().decode
+    for line in chunk[:end].decode("utf-8", errors="replace").splitlines():
+        if not line.strip():
+            continue
+        try:
+            record = decode(line)
+        except ValueError:
+            continue
+        key = _lead_key(record)
+        if key is None:
+            continue
+        lead = record.get("lead") or {}
+        metadata = record.get("metadata") or {}
+        cols["key"].append(key.encode())
+        cols["dealer_id"].append((metadata.get("dealer_id") or "").encode())
+        cols["ts"].append((record.get("timestamp") or "NaT")[:19])
+        cols["channel"].append(CHANNELS.get(metadata.get("channel"), OTHER_CHANNEL))
+        cols["timeline"].append(timeline_codes.get(lead.get("timeline") or "", 0))
+        cols["intent"].append(intent_codes.get(lead.get("intent") or "", 0))
+        cols["budget"].append(lead.get("budget_max") or 0)
+    columns = {
+        "key": np.array(cols["key"], dtype=COLUMNS["key"]),
+        "dealer_id": np.array(cols["dealer_id"], dtype=COLUMNS["dealer_id"]),
+        "ts": _epoch_seconds(cols["ts"]),
+        "channel": np.array(cols["channel"], dtype=np.uint8),
+        "timeline": np.array(cols["timeline"], dtype=np.int8),
+        "intent": np.array(cols["intent"], dtype=np.int8),
+        "budget": np.array(cols["budget"], dtype=np.float32),
+    }
+    return columns, offset + end
+
+
+def aggregate(rows: Table) -> Table:
+    """Collapse per-line columns to one row per lead (log order = time order, so the last line wins slots)."""
+    keys, inverse = np.unique(rows["key"], return_inverse=True)
+    n = len(keys)
+    last_row = np.full(n, -1, dtype=np.int64)
+    np.maximum.at(last_row, inverse, np.arange(len(inverse)))
+    first_ts = np.full(n, np.inf)
+    np.minimum.at(first_ts, inverse, rows["ts"])
+    last_ts = np.zeros(n)
+    np.maximum.at(last_ts, inverse, rows["ts"])
+    channels = np.zeros(n, dtype=np.uint8)
+    np.bitwise_or.at(channels, inverse, rows["channel"])
+    # Slots missing from the latest line keep the lead's last known value.
+    budget = _last_set(rows["budget"], inverse, n)
+    timeline = _last_set(rows["timeline"], inverse, n)
+    return {
+        "key": keys,
+        "dealer_id": rows["dealer_id"][last_row],
+        "first_ts": first_ts,
+        "last_ts": last_ts,
+        "touches": np.bincount(inverse, minlength=n).astype(np.int32),
+        "channels": channels,
+        "timeline": timeline,
+        "intent": rows["intent"][last_row],
+        "budget": budget,
+    }
+
+
+def _last_set(values: np.ndarray, inverse: np.ndarray, n: int) -> np.ndarray:
+    """Per key, the value from its last row where it is set (> 0); 0 where no row sets it."""
+    rows = np.nonzero(values > 0)[0]
+    last = np.full(n, -1, dtype=np.int64)
+    np.maximum.at(last, inverse[rows], rows)
+    out = np.zeros(n, dtype=values.dtype)
+    hit = last >= 0
+    out[hit] = values[last[hit]]
+    return out
+
+
+def merge(table: Table, batch: Table) -> Tuple[Table, np.ndarray]:
+    """Fold a batch of per-lead aggregates into the (key-sorted) table; returns it and the changed row mask."""
+    pos = np.searchsorted(table["key"], batch["key"])
+    found = pos < len(table["key"])
+    found[found] = table["key"][pos[found]] == batch["key"][found]
+    hit, rows = np.nonzero(found)[0], pos[found]
+
+    table = {name: col.copy() for name, col in table.items()}
+    table["first_ts"][rows] = np.minimum(table["first_ts"][rows], batch["first_ts"][hit])
+    table["last_ts"][rows] = np.maximum(table["last_ts"][rows], batch["last_ts"][hit])
+    table["touches"][rows] += batch["touches"][hit]
+    table["channels"][rows] |= batch["channels"][hit]
+    table["intent"][rows] = batch["intent"][hit]
+    table["dealer_id"][rows] = batch["dealer_id"][hit]
+    for name in ("timeline", "budget"):
+        newer = batch[name][hit] > 0
+        table[name][rows[newer]] = batch[name][hit][newer]
+    changed = np.zeros(len(table["key"]), dtype=bool)
+    changed[rows] = True
+
+    new = ~found
+    if new.any():
+        added = {name: batch[name][new] for name in batch}
+        added["score"] = np.zeros(int(new.sum()), dtype=np.float32)
+        added["scored_at"] = np.zeros(int(new.sum()))
+        table = {name: np.concatenate([table[name], added[name].astype(COLUMNS[name])]) for name in COLUMNS}
+        changed = np.concatenate([changed, np.ones(int(new.sum()), dtype=bool)])
+        order = np.argsort(table["key"], kind="stable")
+        table = {name: col[order] for name, col in table.items()}
+        changed = changed[order]
+    return table, changed
+
+
+def score(table: Table, now: float) -> np.ndarray:
+    """0-100: timeline, budget and engagement, weighted by intent and decayed by age since last contact."""
+    age_days = np.maximum(now - table["last_ts"], 0.0) / 86400.0
+    decay = np.exp2(-age_days / SCORE_HALF_LIFE_DAYS)
+    budget = np.clip(table["budget"] / 100_000.0, 0.0, 1.0)
+    engagement = 1.0 - np.exp(-table["touches"] / 3.0)
+    channels = table["channels"]
+    multichannel = ((channels & 1) > 0) & ((channels & 2) > 0)
+    channel_bonus = 0.1 * multichannel + 0.05 * ((channels & 2) > 0)
+    raw = 0.55 * _TIMELINE_WEIGHT[table["timeline"]] + 0.15 * budget + 0.2 * engagement + channel_bonus
+    return (100.0 * np.clip(raw * _INTENT_WEIGHT[table["intent"]] * decay, 0.0, 1.0)).astype(np.float32)
+
+
+def tiers(scores: np.ndarray) -> np.ndarray:
+    return np.where(scores >= HOT_SCORE, "hot", np.where(scores >= WARM_SCORE, "warm", "cold"))
+
+
+class _FileLock:
+    """Cross-process lock so two workers never fold the same log range into the table twice."""
+
+    def __init__(self, path: Path):
+        self.path = path
+
+    def __enter__(self):
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._fh = self.path.open("a")
+        if fcntl is not None:
+            fcntl.flock(self._fh.fileno(), fcntl.LOCK_EX)
+        return self
+
+    def __exit__(self, *exc):
+        if fcntl is not None:
+            fcntl.flock(self._fh.fileno(), fcntl.LOCK_UN)
+        self._fh.close()
+
+
+def log_identity(path: Path) -> str | None:
+    """Inode plus a hash of the first line: changes when the log is replaced or cleared and written again."""
+    if not path.exists():
+        return None
+    with path.open("rb") as fh:
+        first = fh.readline(4096)
+    if not first.endswith(b"\n"):
+        return None
+    return f"{path.stat().st_ino}:{hashlib.sha1(first).hexdigest()[:16]}"
+
+
+def rescore(full: bool = False, log_path: Path | None = None, out_path: Path | None = None) -> Dict:
+    """Fold CRM log lines written since the last run into the score table and rescore only the leads they touch."""
+    log_path = log_path or CRM_LOG_PATH
+    out_path = out_path or SCORES_PATH
+    start = time.perf_counter()
+    with _LOCK, _FileLock(out_path.with_name(out_path.name + ".lock")):
+        table, meta = load_table(out_path)
+        size = log_path.stat().st_size if log_path.exists() else 0
+        identity = log_identity(log_path)
+        offset = start_offset = int(meta.get("offset", 0))
+        if full or size < offset or (offset and meta.get("log_id") != identity):
+            # Full run, or the log was cleared / rotated underneath us (possibly regrown past the old offset).
+            table, offset = empty_table(), 0
+        if size > offset:
+            rows, offset = read_log_columns(log_path, offset)
+            table, changed = merge(table, aggregate(rows)) if len(rows["key"]) else (table, np.zeros(len(table["key"]), dtype=bool))
+        else:
+            changed = np.zeros(len(table["key"]), dtype=bool)
+        now = time.time()
+        if full:
+            changed[:] = True
+        if changed.any():
+            subset = {name: col[changed] for name, col in table.items()}
+            table["score"][changed] = score(subset, now)
+            table["scored_at"][changed] = now
+        if full or offset != start_offset or changed.any() or meta.get("log_id") != identity:
+            meta = {"offset": offset, "log_id": identity, "updated_at": datetime.utcnow().isoformat() + "Z", "leads": int(len(table["key"]))}
+            save_table(table, meta, out_path)
+    elapsed = time.perf_counter() - start
+    LEAD_SCORING_SECONDS.observe(elapsed, mode="full" if full else "incremental")
+    LEAD_SCORING_LEADS.inc(float(changed.sum()), mode="full" if full else "incremental")
+    return {
+        "rescored": int(changed.sum()),
+        "leads": int(len(table["key"])),
+        "offset": offset,
+        "full": full,
+        "elapsed_ms": round(elapsed * 1000, 2),
+    }
+
+
+def top_scores(dealer_id: str | None = None, tier: str | None = None, limit: int = 25, path: Path | None = None) -> List[Dict]:
+    table, _ = load_table(path or SCORES_PATH)
+    mask = np.ones(len(table["key"]), dtype=bool)
+    if dealer_id:
+        mask &= table["dealer_id"] == dealer_id.encode()
+    tier_names = tiers(table["score"])
+    if tier:
+        mask &= tier_names == tier
+    idx = np.nonzero(mask)[0]
+    if limit <= 0:
+        return []
+    if len(idx) > limit:
+        idx = idx[np.argpartition(-table["score"][idx], limit - 1)[:limit]]
+    idx = idx[np.argsort(-table["score"][idx], kind="stable")]
+    return [
+        {
+            "lead": table["key"][i].decode(),
+            "dealer_id": table["dealer_id"][i].decode(),
+            "score": round(float(table["score"][i]), 1),
+            "tier": str(tier_names[i]),
+            "touches": int(table["touches"][i]),
+            "channels": [name for name, bit in CHANNELS.items() if table["channels"][i] & bit],
+            "timeline": TIMELINES[table["timeline"][i]] or None,
+            "intent": INTENTS[table["intent"][i]] or None,
+            "last_contact": datetime.utcfromtimestamp(table["last_ts"][i]).isoformat() + "Z",
+        }
+        for i in idx
+    ]
+
+
+def main(argv: List[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description="Re-score leads from the mock CRM log into the score table.")
+    parser.add_argument("--full", action="store_true", help="Rebuild the table and rescore every lead")
+    parser.add_argument("--log", type=Path, help=f"CRM log (default {CRM_LOG_PATH})")
+    parser.add_argument("--out", type=Path, help=f"Score table (default {SCORES_PATH})")
+    parser.add_argument("--top", type=int, default=0, help="Print the N highest-scoring leads afterwards")
+    args = parser.parse_args(argv)
+
+    result = rescore(args.full, args.log, args.out)
+    print(json.dumps(result))
+    for row in top_scores(limit=args.top, path=args.out) if args.top else []:
+        print(json.dumps(row))
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
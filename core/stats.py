@@ -0,0 +1,227 @@
+from __future__ import annotations
+
+import argparse
+import json
+import os
+from collections import defaultdict
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Dict, Iterator, List, Tuple
+
+from .store import get_store
+
+NAMESPACE = "stats"
+# Lead counters live apart from the call counters so clearing the mock CRM can reset just them.
+LEAD_NAMESPACE = "stats_leads"
+VOICE_LOG_PATH = Path(
+    os.getenv("VOICE_LOG_PATH", Path(__file__).resolve().parent.parent / "data" / "voice_logs.jsonl")
+)
+# Counter key: kind|granularity|bucket|dealer_id|dimension=value|...
+_SEP = "|"
+
+
+def _bucket(timestamp: str | None) -> Tuple[str, str]:
+    """(day, hour) buckets for an ISO timestamp, falling back to now."""
+    stamp = (timestamp or datetime.utcnow().isoformat())[:13]
+    return stamp[:10], stamp
+
+
+def _clean(value) -> str:
+    return str(value if value not in (None, "") else "unknown").replace(_SEP, "/")
+
+
+def _keys(kind: str, timestamp: str | None, dealer_id: str | None, **dims) -> List[str]:
+    day, hour = _bucket(timestamp)
+    tail = _SEP.join(f"{name}={_clean(value)}" for name, value in sorted(dims.items()))
+    dealer = _clean(dealer_id)
+    return [_SEP.join((kind, "day", day, dealer, tail)), _SEP.join((kind, "hour", hour, dealer, tail))]
+
+
+def _counts(keys: List[str]) -> Dict[str, float]:
+    return {key: 1 for key in keys}
+
+
+def lead_counts(record: Dict, created: bool) -> Dict[str, float]:
+    """Counters for one CRM write (`record` as appended to the mock CRM log): new leads vs merges into one."""
+    lead = record.get("lead") or {}
+    return _counts(
+        _keys(
+            "lead" if created else "lead_updated",
+            record.get("timestamp"),
+            (record.get("metadata") or {}).get("dealer_id"),
+            intent=lead.get("intent"),
+            lead_type=lead.get("lead_type"),
+            channel=(record.get("metadata") or {}).get("channel"),
+        )
+    )
+
+
+def voice_counts(event: Dict) -> Dict[str, float]:
+    """Counters for one voice-log event: calls started by direction, calls ended by end reason."""
+    name = event.get("event")
+    timestamp = event.get("timestamp")
+    if name == "ultravox_webhook":
+        payload = event.get("payload") or {}
+        if payload.get("event") != "call.ended":
+            return {}
+        reason = (payload.get("call") or {}).get("endReason")
+        return _counts(_keys("call_ended", timestamp, event.get("dealer_id"), end_reason=reason))
+    if name == "ultravox_join_url":
+        direction = "webrtc"
+    elif event.get("direction") == "outbound":
+        direction = "outbound"
+    elif name is None and event.get("call_sid") and event.get("call_id"):
+        direction = "inbound"
+    else:
+        return {}
+    return _counts(_keys("call_started", timestamp, event.get("dealer_id"), direction=direction))
+
+
+def record_lead(record: Dict, created: bool) -> None:
+    get_store().incr(LEAD_NAMESPACE, lead_counts(record, created))
+
+
+def clear_lead_stats() -> None:
+    """Drop the lead counters (the mock CRM was cleared); call counters are kept."""
+    get_store().clear_counters(LEAD_NAMESPACE)
+
+
+def record_voice_event(event: Dict) -> None:
+    counts = voice_counts(event)
+    if counts:
+        get_store().incr(NAMESPACE, counts)
+
+
+def summarize(
+    granularity: str = "day",
+    dealer_id: str | None = None,
+    since: str | None = None,
+) -> Dict:
+    """Roll the counters up by each dimension; cost is the number of counters, never the log size."""
+    out: Dict[str, Dict] = {}
+    store = get_store()
+    counters = {**store.counters(NAMESPACE), **store.counters(LEAD_NAMESPACE)}
+    for key, value in counters.items():
+        kind, gran, bucket, dealer, tail = key.split(_SEP, 4)
+        if gran != granularity or (dealer_id and dealer != dealer_id) or (since and bucket < since):
+            continue
+        section = out.setdefault(kind, {"total": 0, "by_bucket": defaultdict(float), "by_dealer": defaultdict(float)})
+        section["total"] += value
+        section["by_bucket"][bucket] += value
+        section["by_dealer"][dealer] += value
+        for pair in tail.split(_SEP) if tail else []:
+            name, dim_value = pair.split("=", 1)
+            section.setdefault(f"by_{name}", defaultdict(float))[dim_value] += value
+    for section in out.values():
+        for name, values in section.items():
+            if name.startswith("by_"):
+                section[name] = {k: int(v) for k, v in sorted(values.items())}
+        section["total"] = int(section["total"])
+    return out
+
+
+def _log_size(path: Path) -> int:
+    try:
+        return path.stat().st_size
+    except OSError:
+        return 0
+
+
+def _iter_jsonl(path: Path, end: int | None = None) -> Iterator[Dict]:
+    """Records from a JSONL log, stopping at byte offset `end` (lines appended after it are left out)."""
+    if not path.exists():
+        return
+    with path.open("rb") as fh:
+        while end is None or fh.tell() < end:
+            line = fh.readline()
+            if not line:
+                break
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                yield json.loads(line)
+            except ValueError:
+                continue
+
+
+def seed(crm_log: Path | None = None, voice_log: Path | None = None, batch: int = 5000) -> Dict:
+    """Add the counts for everything already in the CRM and voice logs, without clearing anything.
+
+    Each log is read only up to its size when seeding starts. Writes that land later are counted live
+    by `record_lead` / `record_voice_event`, so traffic arriving meanwhile is neither lost nor counted twice.
+    """
+    from .crm import CRM_LOG_PATH
+
+    crm_log = crm_log or CRM_LOG_PATH
+    voice_log = voice_log or VOICE_LOG_PATH
+    ends = {"crm": _log_size(crm_log), "voice": _log_size(voice_log)}
+    store = get_store()
+    lines = {"crm": 0, "voice": 0}
+
+    def add(namespace: str, pending: Dict[str, float], counts: Dict[str, float]) -> None:
+        for key, amount in counts.items():
+            pending[key] += amount
+        if len(pending) >= batch:
+            store.incr(namespace, dict(pending))
+            pending.clear()
+
+    pending: Dict[str, float] = defaultdict(float)
+    seen_leads = set()
+    for record in _iter_jsonl(crm_log, ends["crm"]):
+        lines["crm"] += 1
+        lead_id = record.get("lead_id")
+        created = lead_id is None or lead_id not in seen_leads
+        if lead_id:
+            seen_leads.add(lead_id)
+        add(LEAD_NAMESPACE, pending, lead_counts(record, created))
+    if pending:
+        store.incr(LEAD_NAMESPACE, dict(pending))
+    pending = defaultdict(float)
+    for event in _iter_jsonl(voice_log, ends["voice"]):
+        lines["voice"] += 1
+        add(NAMESPACE, pending, voice_counts(event))
+    if pending:
+        store.incr(NAMESPACE, dict(pending))
+    counters = len(store.counters(NAMESPACE)) + len(store.counters(LEAD_NAMESPACE))
+    return {"lines": lines, "counters": counters}
+
+
+def rebuild(crm_log: Path | None = None, voice_log: Path | None = None, batch: int = 5000) -> Dict:
+    """Recompute every counter from the CRM and voice logs (recovery after a lost or corrupted store).
+
+    This clears the counters first, so run it while no server is writing to the logs.
+    """
+    get_store().clear_counters(NAMESPACE)
+    get_store().clear_counters(LEAD_NAMESPACE)
+    return seed(crm_log, voice_log, batch)
+
+
+def ensure_built() -> None:
+    """First start against a fresh store (always, for the in-memory backend): seed counters from the logs.
+
+    Call it before serving traffic; with STATE_BACKEND=sqlite only the first process to start seeds.
+    """
+    if get_store().add("stats_meta", "built", datetime.utcnow().isoformat() + "Z"):
+        seed()
+
+
+def main(argv: List[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description="Dashboard aggregates over the CRM and voice logs.")
+    parser.add_argument("--rebuild", action="store_true", help="Recompute all counters from the logs")
+    parser.add_argument("--crm-log", type=Path)
+    parser.add_argument("--voice-log", type=Path)
+    parser.add_argument("--granularity", choices=["day", "hour"], default="day")
+    parser.add_argument("--dealer-id")
+    parser.add_argument("--days", type=int, help="Only buckets from the last N days")
+    args = parser.parse_args(argv)
+
+    if args.rebuild:
+        print(json.dumps(rebuild(args.crm_log, args.voice_log)))
+    since = (datetime.utcnow() - timedelta(days=args.days)).strftime("%Y-%m-%d") if args.days else None
+    print(json.dumps(summarize(args.granularity, args.dealer_id, since), indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,319 @@
+from __future__ import annotations
+
+import json
+import os
+import sqlite3
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Dict, Optional, Tuple
+
+STATE_DB_PATH = Path(
+    os.getenv("STATE_DB_PATH", Path(__file__).resolve().parent.parent / "data" / "state.db")
+)
+# How often (at most) a SQLite writer sweeps expired kv rows; reads already skip them.
+PURGE_INTERVAL_S = float(os.getenv("STATE_PURGE_INTERVAL_S", "300"))
+
+
+class StateStore(ABC):
+    """Shared state for sessions, TTL'd keys (dedupe / idempotency / call index), token buckets and counters."""
+
+    @abstractmethod
+    def get_session(self, session_id: str) -> Dict:
+        raise NotImplementedError
+
+    @abstractmethod
+    def save_session(self, session_id: str, state: Dict) -> None:
+        raise NotImplementedError
+
+    @abstractmethod
+    def get(self, namespace: str, key: str) -> Optional[Any]:
+        raise NotImplementedError
+
+    @abstractmethod
+    def set(self, namespace: str, key: str, value: Any, ttl: float | None = None) -> None:
+        raise NotImplementedError
+
+    @abstractmethod
+    def add(self, namespace: str, key: str, value: Any, ttl: float | None = None) -> bool:
+        """Set `key` only if it is absent (or expired); True if this caller won."""
+        raise NotImplementedError
+
+    @abstractmethod
+    def delete(self, namespace: str, key: str) -> None:
+        raise NotImplementedError
+
+    @abstractmethod
+    def take_tokens(self, key: str, rate: float, burst: float, cost: float = 1.0) -> float:
+        """Token bucket: spend `cost` tokens from `key` and return 0, or the seconds until they would be available."""
+        raise NotImplementedError
+
+    @abstractmethod
+    def incr(self, namespace: str, counts: Dict[str, float]) -> None:
+        """Add each amount to its counter in one batch (counters never expire)."""
+        raise NotImplementedError
+
+    @abstractmethod
+    def counters(self, namespace: str) -> Dict[str, float]:
+        raise NotImplementedError
+
+    @abstractmethod
+    def clear_counters(self, namespace: str) -> None:
+        raise NotImplementedError
+
+
+def _spend(
+    buckets: Dict[str, Tuple[float, float]],
+    key: str,
+    tokens: float,
+    updated: float,
+    now: float,
+    rate: float,
+    burst: float,
+    cost: float,
+) -> float:
+    tokens = min(burst, tokens + max(0.0, now - updated) * rate)
+    if tokens >= cost:
+        buckets[key] = (tokens - cost, now)
+        return 0.0
+    buckets[key] = (tokens, now)
+    return (cost - tokens) / rate if rate > 0 else float("inf")
+
+
+class MemoryStore(StateStore):
+    def __init__(self, max_keys: int = 100_000):
+        self.max_keys = max_keys
+        self._lock = threading.Lock()
+        self._sessions: Dict[str, Dict] = {}
+        self._kv: "OrderedDict[Tuple[str, str], Tuple[Any, float | None]]" = OrderedDict()
+        self._buckets: Dict[str, Tuple[float, float]] = {}
+        self._counters: Dict[str, Dict[str, float]] = {}
+
+    def get_session(self, session_id: str) -> Dict:
+        with self._lock:
+            return self._sessions.setdefault(session_id, {})
+
+    def save_session(self, session_id: str, state: Dict) -> None:
+        with self._lock:
+            self._sessions[session_id] = state
+
+    def _live(self, key: Tuple[str, str], now: float) -> Optional[Tuple[Any, float | None]]:
+        entry = self._kv.get(key)
+        if entry is None:
+            return None
+        if entry[1] is not None and entry[1] <= now:
+            del self._kv[key]
+            return None
+        return entry
+
+    def _put(self, key: Tuple[str, str], value: Any, ttl: float | None, now: float) -> None:
+        self._kv[key] = (value, now + ttl if ttl else None)
+        self._kv.move_to_end(key)
+        while len(self._kv) > self.max_keys:
+            self._kv.popitem(last=False)
+
+    def get(self, namespace: str, key: str) -> Optional[Any]:
+        with self._lock:
+            entry = self._live((namespace, key), time.time())
+            return entry[0] if entry else None
+
+    def set(self, namespace: str, key: str, value: Any, ttl: float | None = None) -> None:
+        with self._lock:
+            self._put((namespace, key), value, ttl, time.time())
+
+    def add(self, namespace: str, key: str, value: Any, ttl: float | None = None) -> bool:
+        now = time.time()
+        with self._lock:
+            if self._live((namespace, key), now) is not None:
+                return False
+            self._put((namespace, key), value, ttl, now)
+            return True
+
+    def delete(self, namespace: str, key: str) -> None:
+        with self._lock:
+            self._kv.pop((namespace, key), None)
+
+    def take_tokens(self, key: str, rate: float, burst: float, cost: float = 1.0) -> float:
+        now = time.monotonic()
+        with self._lock:
+            tokens, updated = self._buckets.get(key, (burst, now))
+            return _spend(self._buckets, key, tokens, updated, now, rate, burst, cost)
+
+    def incr(self, namespace: str, counts: Dict[str, float]) -> None:
+        with self._lock:
+            counters = self._counters.setdefault(namespace, {})
+            for key, amount in counts.items():
+                counters[key] = counters.get(key, 0) + amount
+
+    def counters(self, namespace: str) -> Dict[str, float]:
+        with self._lock:
+            return dict(self._counters.get(namespace, {}))
+
+    def clear_counters(self, namespace: str) -> None:
+        with self._lock:
+            self._counters.pop(namespace, None)
+
+
+class SQLiteStore(StateStore):
+    """SQLite in WAL mode: many reader/writer processes on one host, one connection per thread."""
+
+    def __init__(self, path: Path = STATE_DB_PATH, busy_timeout_ms: int = 5000):
+        self.path = Path(path)
+        self.busy_timeout_ms = busy_timeout_ms
+        self._local = threading.local()
+        self._purged_at = 0.0
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        conn = self._conn()
+        with conn:
+            conn.executescript(
+                """
+                CREATE TABLE IF NOT EXISTS sessions (
+                    session_id TEXT PRIMARY KEY,
+                    state TEXT NOT NULL,
+                    updated_at REAL NOT NULL
+                );
+                CREATE TABLE IF NOT EXISTS kv (
+                    namespace TEXT NOT NULL,
+                    key TEXT NOT NULL,
+                    value TEXT NOT NULL,
+                    expires_at REAL,
+                    PRIMARY KEY (namespace, key)
+                );
+                CREATE TABLE IF NOT EXISTS counters (
+                    namespace TEXT NOT NULL,
+                    key TEXT NOT NULL,
+                    value REAL NOT NULL,
+                    PRIMARY KEY (namespace, key)
+                );
+                CREATE TABLE IF NOT EXISTS buckets (
+                    key TEXT PRIMARY KEY,
+                    tokens REAL NOT NULL,
+                    updated_at REAL NOT NULL
+                );
+                """
+            )
+
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=self.busy_timeout_ms / 1000, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute(f"PRAGMA busy_timeout={int(self.busy_timeout_ms)}")
+            self._local.conn = conn
+        return conn
+
+    def get_session(self, session_id: str) -> Dict:
+        row = self._conn().execute("SELECT state FROM sessions WHERE session_id = ?", (session_id,)).fetchone()
+        return json.loads(row[0]) if row else {}
+
+    def save_session(self, session_id: str, state: Dict) -> None:
+        self._conn().execute(
+            "INSERT INTO sessions (session_id, state, updated_at) VALUES (?, ?, ?) "
+            "ON CONFLICT(session_id) DO UPDATE SET state = excluded.state, updated_at = excluded.updated_at",
+            (session_id, json.dumps(state), time.time()),
+        )
+
+    def get(self, namespace: str, key: str) -> Optional[Any]:
+        row = self._conn().execute(
+            "SELECT value FROM kv WHERE namespace = ? AND key = ? AND (expires_at IS NULL OR expires_at > ?)",
+            (namespace, key, time.time()),
+        ).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def set(self, namespace: str, key: str, value: Any, ttl: float | None = None) -> None:
+        self._maybe_purge()
+        now = time.time()
+        self._conn().execute(
+            "INSERT OR REPLACE INTO kv (namespace, key, value, expires_at) VALUES (?, ?, ?, ?)",
+            (namespace, key, json.dumps(value), now + ttl if ttl else None),
+        )
+
+    def add(self, namespace: str, key: str, value: Any, ttl: float | None = None) -> bool:
+        self._maybe_purge()
+        now = time.time()
+        conn = self._conn()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            conn.execute(
+                "DELETE FROM kv WHERE namespace = ? AND key = ? AND expires_at IS NOT NULL AND expires_at <= ?",
+                (namespace, key, now),
+            )
+            cur = conn.execute(
+                "INSERT OR IGNORE INTO kv (namespace, key, value, expires_at) VALUES (?, ?, ?, ?)",
+                (namespace, key, json.dumps(value), now + ttl if ttl else None),
+            )
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        return cur.rowcount == 1
+
+    def delete(self, namespace: str, key: str) -> None:
+        self._conn().execute("DELETE FROM kv WHERE namespace = ? AND key = ?", (namespace, key))
+
+    def take_tokens(self, key: str, rate: float, burst: float, cost: float = 1.0) -> float:
+        now = time.time()
+        conn = self._conn()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            row = conn.execute("SELECT tokens, updated_at FROM buckets WHERE key = ?", (key,)).fetchone()
+            tokens, updated = row if row else (burst, now)
+            buckets: Dict[str, Tuple[float, float]] = {}
+            wait = _spend(buckets, key, tokens, updated, now, rate, burst, cost)
+            conn.execute(
+                "INSERT OR REPLACE INTO buckets (key, tokens, updated_at) VALUES (?, ?, ?)", (key, *buckets[key])
+            )
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        return wait
+
+    def incr(self, namespace: str, counts: Dict[str, float]) -> None:
+        conn = self._conn()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            conn.executemany(
+                "INSERT INTO counters (namespace, key, value) VALUES (?, ?, ?) "
+                "ON CONFLICT(namespace, key) DO UPDATE SET value = value + excluded.value",
+                [(namespace, key, amount) for key, amount in counts.items()],
+            )
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+
+    def counters(self, namespace: str) -> Dict[str, float]:
+        rows = self._conn().execute("SELECT key, value FROM counters WHERE namespace = ?", (namespace,)).fetchall()
+        return dict(rows)
+
+    def clear_counters(self, namespace: str) -> None:
+        self._conn().execute("DELETE FROM counters WHERE namespace = ?", (namespace,))
+
+    def purge_expired(self) -> int:
+        self._purged_at = time.monotonic()
+        cur = self._conn().execute("DELETE FROM kv WHERE expires_at IS NOT NULL AND expires_at <= ?", (time.time(),))
+        return cur.rowcount
+
+    def _maybe_purge(self) -> None:
+        # TTL'd rows (dedupe, idempotency, call index) would otherwise pile up forever.
+        if time.monotonic() - self._purged_at >= PURGE_INTERVAL_S:
+            self.purge_expired()
+
+
+_STORE: StateStore | None = None
+_STORE_LOCK = threading.Lock()
+
+
+def get_store() -> StateStore:
+    """Process-wide store: STATE_BACKEND=sqlite shares state across workers, otherwise in-memory."""
+    global _STORE
+    if _STORE is None:
+        with _STORE_LOCK:
+            if _STORE is None:
+                backend = os.getenv("STATE_BACKEND", "memory").lower()
+                _STORE = SQLiteStore(STATE_DB_PATH) if backend == "sqlite" else MemoryStore()
+    return _STORE
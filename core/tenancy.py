@@ -0,0 +1,180 @@
+from __future__ import annotations
+
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Tuple
+
+from . import config as config_module
+from .contacts import normalize_phone
+from .crm import CRMAdapter, get_crm_adapter
+from .schema import DealershipConfig
+from .store import get_store
+
+DEFAULT_DEALER_ID = os.getenv("DEFAULT_DEALER_ID", "demo_bmw")
+CALL_INDEX_TTL = 24 * 3600
+# How often a cached config re-checks its file's mtime (tool calls would otherwise stat on every request).
+CONFIG_RECHECK_S = float(os.getenv("DEALER_CONFIG_RECHECK_S", "2"))
+
+
+class UnknownDealer(FileNotFoundError):
+    """No config for this dealer id (never existed, or its file was removed)."""
+
+
+class DealerDirectory:
+    """Preloaded dealer configs plus O(1) lookups by Twilio number and Ultravox call id."""
+
+    def __init__(self, max_calls: int = 50_000):
+        self.max_calls = max_calls
+        self._lock = threading.Lock()
+        # dealer_id -> (file mtime, config, monotonic time of the last mtime check)
+        self._configs: Dict[str, Tuple[float, DealershipConfig, float]] = {}
+        self._by_number: Dict[str, str] = {}
+        self._by_call: "OrderedDict[str, str]" = OrderedDict()
+        self._adapters: Dict[Tuple[str, str], CRMAdapter] = {}
+        self._loaded = False
+        self._last_scan = 0.0
+
+    def load(self) -> None:
+        now = time.monotonic()
+        configs: Dict[str, Tuple[float, DealershipConfig, float]] = {}
+        by_number: Dict[str, str] = {}
+        for dealer_id in config_module.list_dealers():
+            path = config_module.CONFIG_DIR / f"{dealer_id}.json"
+            try:
+                configs[dealer_id] = (path.stat().st_mtime, config_module.load_dealer_config(dealer_id), now)
+            except (OSError, ValueError):
+                continue
+            for number in configs[dealer_id][1].phone_numbers:
+                normalized = normalize_phone(number)
+                if normalized:
+                    by_number[normalized] = dealer_id
+        with self._lock:
+            self._configs = configs
+            self._by_number = by_number
+            self._loaded = True
+            self._last_scan = now
+
+    def _ensure_loaded(self) -> None:
+        if not self._loaded:
+            self.load()
+
+    def dealer_ids(self) -> list[str]:
+        self._ensure_loaded()
+        return sorted(self._configs)
+
+    def is_known(self, dealer_id: str | None) -> bool:
+        """Whether `dealer_id` names a config in CONFIG_DIR; a miss rescans the directory at most every CONFIG_RECHECK_S."""
+        self._ensure_loaded()
+        if not dealer_id:
+            return False
+        if dealer_id not in self._configs and time.monotonic() - self._last_scan > CONFIG_RECHECK_S:
+            self.load()
+        return dealer_id in self._configs
+
+    def config(self, dealer_id: str) -> DealershipConfig:
+        # Only ids found in CONFIG_DIR ever reach the path below; request input can't point it elsewhere.
+        cached = self._configs.get(dealer_id) if self.is_known(dealer_id) else None
+        if cached is None:
+            raise UnknownDealer(f"Unknown dealer: {dealer_id!r}")
+        now = time.monotonic()
+        if now - cached[2] < CONFIG_RECHECK_S:
+            return cached[1]
+        path = config_module.CONFIG_DIR / f"{dealer_id}.json"
+        try:
+            mtime = path.stat().st_mtime
+        except OSError:
+            self._forget(dealer_id)
+            raise UnknownDealer(f"Unknown dealer: {dealer_id!r}")
+        if cached[0] == mtime:
+            with self._lock:
+                self._configs[dealer_id] = (mtime, cached[1], now)
+            return cached[1]
+        # Picked up edits saved from the dashboard.
+        try:
+            cfg = config_module.load_dealer_config(dealer_id)
+        except FileNotFoundError:
+            self._forget(dealer_id)
+            raise UnknownDealer(f"Unknown dealer: {dealer_id!r}")
+        with self._lock:
+            self._configs[dealer_id] = (mtime, cfg, now)
+            stale = [num for num, owner in self._by_number.items() if owner == dealer_id]
+            for num in stale:
+                self._by_number.pop(num, None)
+            for number in cfg.phone_numbers:
+                normalized = normalize_phone(number)
+                if normalized:
+                    self._by_number[normalized] = dealer_id
+            self._adapters = {k: v for k, v in self._adapters.items() if k[0] != dealer_id}
+        return cfg
+
+    def _forget(self, dealer_id: str) -> None:
+        # The config file was removed: drop the dealer and its numbers until a rescan finds it again.
+        with self._lock:
+            self._configs.pop(dealer_id, None)
+            self._by_number = {num: owner for num, owner in self._by_number.items() if owner != dealer_id}
+            self._adapters = {k: v for k, v in self._adapters.items() if k[0] != dealer_id}
+
+    def group_members(self, dealer_id: str) -> list[str]:
+        """Dealers sharing `dealer_id`'s group_id (itself first); just the dealer when it has no group."""
+        group_id = self.config(dealer_id).group_id
+        if not group_id:
+            return [dealer_id]
+        with self._lock:
+            others = [d for d, (_, cfg, _) in self._configs.items() if cfg.group_id == group_id and d != dealer_id]
+        return [dealer_id, *sorted(others)]
+
+    def dealer_for_number(self, number: str | None) -> str | None:
+        self._ensure_loaded()
+        normalized = normalize_phone(number)
+        return self._by_number.get(normalized) if normalized else None
+
+    def remember_call(self, call_id: str | None, dealer_id: str) -> None:
+        if not call_id:
+            return
+        self._remember_local(call_id, dealer_id)
+        # Tool calls for this call may land on another worker.
+        get_store().set("call_dealer", call_id, dealer_id, ttl=CALL_INDEX_TTL)
+
+    def _remember_local(self, call_id: str, dealer_id: str) -> None:
+        with self._lock:
+            self._by_call[call_id] = dealer_id
+            self._by_call.move_to_end(call_id)
+            while len(self._by_call) > self.max_calls:
+                self._by_call.popitem(last=False)
+
+    def dealer_for_call(self, call_id: str | None) -> str | None:
+        if not call_id:
+            return None
+        dealer_id = self._by_call.get(call_id)
+        if dealer_id is None:
+            dealer_id = get_store().get("call_dealer", call_id)
+            if dealer_id:
+                self._remember_local(call_id, dealer_id)
+        return dealer_id
+
+    def resolve(
+        self,
+        default: str,
+        dealer_id: str | None = None,
+        call_id: str | None = None,
+        number: str | None = None,
+    ) -> str:
+        """Explicit dealer id wins, then the call index, then the dialed number, then `default`."""
+        if self.is_known(dealer_id):
+            return dealer_id
+        return self.dealer_for_call(call_id) or self.dealer_for_number(number) or default
+
+    def crm_adapter(self, dealer_id: str) -> CRMAdapter:
+        provider = self.config(dealer_id).crm.get("provider", "mock")
+        key = (dealer_id, provider)
+        adapter = self._adapters.get(key)
+        if adapter is None:
+            adapter = get_crm_adapter(provider)
+            with self._lock:
+                adapter = self._adapters.setdefault(key, adapter)
+        return adapter
+
+
+DIRECTORY = DealerDirectory()
@@ -0,0 +1,185 @@
+from __future__ import annotations
+
+import contextvars
+import os
+import random
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional
+
+from .eventlog import EventLogWriter
+
+TRACE_PATH = Path(
+    os.getenv("TRACE_PATH", Path(__file__).resolve().parent.parent / "data" / "traces.jsonl")
+)
+
+
+class Span:
+    __slots__ = ("name", "trace_id", "span_id", "parent_id", "start", "end", "attributes", "status", "exported")
+
+    def __init__(self, name: str, trace_id: str, parent_id: str | None, attributes: Dict):
+        self.name = name
+        self.trace_id = trace_id
+        self.span_id = uuid.uuid4().hex[:16]
+        self.parent_id = parent_id
+        self.start = time.monotonic()
+        self.end: float | None = None
+        self.attributes = attributes
+        self.status = "ok"
+        # Root spans only: the finished trace, as handed to the exporter.
+        self.exported: List[Dict] | None = None
+
+    def set(self, **attributes) -> None:
+        self.attributes.update(attributes)
+
+    @property
+    def duration_ms(self) -> float:
+        end = self.end if self.end is not None else time.monotonic()
+        return (end - self.start) * 1000
+
+    def to_dict(self) -> Dict:
+        return {
+            "name": self.name,
+            "trace_id": self.trace_id,
+            "span_id": self.span_id,
+            "parent_id": self.parent_id,
+            "start": self.start,
+            "end": self.end,
+            "duration_ms": round(self.duration_ms, 3),
+            "status": self.status,
+            "attributes": self.attributes,
+        }
+
+
+class _NoopSpan:
+    trace_id = None
+    span_id = None
+    exported = None
+
+    def set(self, **attributes) -> None:
+        pass
+
+
+NOOP_SPAN = _NoopSpan()
+
+
+class InMemoryExporter:
+    """Keeps the most recent `capacity` traces in a ring buffer."""
+
+    def __init__(self, capacity: int = 200):
+        self.capacity = capacity
+        self._traces: "OrderedDict[str, List[Dict]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def export(self, trace_id: str, spans: List[Dict]) -> None:
+        with self._lock:
+            self._traces[trace_id] = spans
+            self._traces.move_to_end(trace_id)
+            while len(self._traces) > self.capacity:
+                self._traces.popitem(last=False)
+
+    def get(self, trace_id: str) -> List[Dict] | None:
+        with self._lock:
+            return self._traces.get(trace_id)
+
+    def recent(self, limit: int = 20) -> List[List[Dict]]:
+        with self._lock:
+            return list(self._traces.values())[-limit:]
+
+
+class JsonlExporter:
+    """Appends one line per finished trace through the background event-log writer."""
+
+    def __init__(self, path: Path = TRACE_PATH):
+        self._writer = EventLogWriter(path)
+
+    def export(self, trace_id: str, spans: List[Dict]) -> None:
+        self._writer.write({"trace_id": trace_id, "spans": spans})
+
+    def flush(self) -> None:
+        self._writer.flush()
+
+
+_CURRENT: contextvars.ContextVar[Optional[Span]] = contextvars.ContextVar("current_span", default=None)
+_TRACE_SPANS: contextvars.ContextVar[Optional[List[Span]]] = contextvars.ContextVar("trace_spans", default=None)
+
+
+class Tracer:
+    def __init__(self, exporter=None, sample_rate: float = 1.0):
+        self.exporter = exporter or InMemoryExporter()
+        self.sample_rate = sample_rate
+
+    @contextmanager
+    def start_trace(self, name: str, **attributes) -> Iterator[Span | _NoopSpan]:
+        """Open a root span with a fresh trace id; spans opened inside nest under it."""
+        if self.sample_rate <= 0 or random.random() >= self.sample_rate:
+            yield NOOP_SPAN
+            return
+        root = Span(name, uuid.uuid4().hex, None, dict(attributes))
+        spans: List[Span] = [root]
+        spans_token = _TRACE_SPANS.set(spans)
+        current_token = _CURRENT.set(root)
+        try:
+            yield root
+        except BaseException:
+            root.status = "error"
+            raise
+        finally:
+            root.end = time.monotonic()
+            _CURRENT.reset(current_token)
+            _TRACE_SPANS.reset(spans_token)
+            root.exported = [span.to_dict() for span in spans]
+            self.exporter.export(root.trace_id, root.exported)
+
+    @contextmanager
+    def span(self, name: str, **attributes) -> Iterator[Span | _NoopSpan]:
+        parent = _CURRENT.get()
+        spans = _TRACE_SPANS.get()
+        if parent is None or spans is None:
+            yield NOOP_SPAN
+            return
+        span = Span(name, parent.trace_id, parent.span_id, dict(attributes))
+        spans.append(span)
+        token = _CURRENT.set(span)
+        try:
+            yield span
+        except BaseException as exc:
+            span.status = "error"
+            span.attributes["error"] = str(exc)
+            raise
+        finally:
+            span.end = time.monotonic()
+            _CURRENT.reset(token)
+
+
+def current_trace_id() -> str | None:
+    span = _CURRENT.get()
+    return span.trace_id if span is not None else None
+
+
+def _exporter_from_env():
+    kind = os.getenv("TRACE_EXPORTER", "memory").lower()
+    if kind == "jsonl":
+        return JsonlExporter(TRACE_PATH)
+    return InMemoryExporter(int(os.getenv("TRACE_BUFFER_SIZE", "200")))
+
+
+TRACER = Tracer(_exporter_from_env(), float(os.getenv("TRACE_SAMPLE_RATE", "1.0")))
+
+
+def span(name: str, **attributes):
+    return TRACER.span(name, **attributes)
+
+
+def start_trace(name: str, **attributes):
+    return TRACER.start_trace(name, **attributes)
+
+
+def get_trace(trace_id: str) -> List[Dict] | None:
+    """Spans for a finished trace when the in-memory exporter is active."""
+    getter = getattr(TRACER.exporter, "get", None)
+    return getter(trace_id) if getter else None
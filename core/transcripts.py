@@ -0,0 +1,349 @@
+from __future__ import annotations
+
+import argparse
+import json
+import multiprocessing
+import os
+import sys
+import threading
+import time
+import uuid
+from concurrent.futures import Future, ProcessPoolExecutor, as_completed
+from concurrent.futures.process import BrokenProcessPool
+from datetime import datetime
+from pathlib import Path
+from typing import Callable, Dict, Iterator, List, Tuple
+
+from .contacts import normalize_phone
+from .metrics import TRANSCRIPT_EXTRACT_SECONDS, TRANSCRIPT_LEADS
+from .orchestrator import _detect_intent, _normalize_timeline, lead_hotness, update_lead_from_message
+from .schema import Lead
+from .store import get_store
+from .tenancy import DEFAULT_DEALER_ID, DIRECTORY
+
+TRANSCRIPT_WORKERS = int(os.getenv("TRANSCRIPT_WORKERS", str(max(1, min(4, (os.cpu_count() or 2) - 1)))))
+# "llm" adds an LLM pass over the whole transcript on top of the rule-based extractors (needs OPENAI_API_KEY).
+TRANSCRIPT_EXTRACTOR = os.getenv("TRANSCRIPT_EXTRACTOR", "rules").lower()
+TRANSCRIPT_LLM_MODEL = os.getenv("TRANSCRIPT_LLM_MODEL", "gpt-4o-mini")
+PROCESSED_TTL = 30 * 86400
+VOICE_LOG_PATH = Path(
+    os.getenv("VOICE_LOG_PATH", Path(__file__).resolve().parent.parent / "data" / "voice_logs.jsonl")
+)
+
+USER_ROLES = {"MESSAGE_ROLE_USER", "user", "USER"}
+LLM_FIELDS = (
+    "intent", "timeline", "budget_max", "trade_in", "trade_in_vehicle", "vehicle_interest",
+    "contact_preference", "customer_name", "email", "notes",
+)
+
+
+def user_utterances(messages) -> List[str]:
+    """Customer lines from an Ultravox messages payload ({"results": [...]} or a bare list)."""
+    if isinstance(messages, dict):
+        messages = messages.get("results") or messages.get("messages") or []
+    return [
+        str(msg.get("text")).strip()
+        for msg in messages or []
+        if isinstance(msg, dict) and msg.get("role") in USER_ROLES and msg.get("text")
+    ]
+
+
+def extract_slots(utterances: List[str]) -> Dict | None:
+    """Run the orchestrator's rule-based extractors over every customer line; None if the caller never spoke."""
+    if not utterances:
+        return None
+    lead = Lead(intent=_detect_intent(" ".join(utterances)))
+    for text in utterances:
+        lead = update_lead_from_message(lead, text)
+        if lead.timeline is None:
+            lead.timeline = _normalize_timeline(text)
+    return lead.model_dump(mode="json")
+
+
+def _llm_slots(utterances: List[str]) -> Dict:
+    from openai import OpenAI  # only when the LLM extractor is switched on
+
+    response = OpenAI().chat.completions.create(
+        model=TRANSCRIPT_LLM_MODEL,
+        response_format={"type": "json_object"},
+        messages=[
+            {
+                "role": "system",
+                "content": (
+                    "Extract dealership lead fields from the customer's side of a phone call. Reply with a JSON "
+                    f"object using only these keys when stated: {', '.join(LLM_FIELDS)}. intent is one of sales, "
+                    "service, trade_in, nurture; timeline one of asap, 1-3 months, 3-6 months, later; "
+                    "budget_max is whole dollars."
+                ),
+            },
+            {"role": "user", "content": "\n".join(utterances)},
+        ],
+    )
+    data = json.loads(response.choices[0].message.content or "{}")
+    return {key: data[key] for key in LLM_FIELDS if data.get(key) not in (None, "")}
+
+
+def extract_transcript(job: Dict) -> Dict:
+    """Worker entry point (runs in the process pool): transcript job in, lead slots (or the reason there are none) out."""
+    start = time.perf_counter()
+    utterances = user_utterances(job.get("messages"))
+    slots = extract_slots(utterances)
+    result = {"call_id": job["call_id"], "dealer_id": job.get("dealer_id"), "phone": job.get("phone"), "lead": slots}
+    if slots is not None and job.get("extractor") == "llm":
+        try:
+            merged = dict(slots, **_llm_slots(utterances))
+            Lead.model_validate(merged)
+            result["lead"] = merged
+        except Exception as exc:  # the rule-based slots still stand
+            result["llm_error"] = str(exc)
+    result["elapsed_s"] = time.perf_counter() - start
+    return result
+
+
+def build_lead(result: Dict) -> Lead | None:
+    slots = result.get("lead")
+    if not slots:
+        return None
+    lead = Lead.model_validate(dict(slots, phone=result.get("phone") or slots.get("phone")))
+    lead.lead_type = lead_hotness(lead.timeline, lead.budget_max)
+    return lead
+
+
+def write_lead(dealer_id: str | None, lead: Lead, metadata: Dict) -> Dict:
+    """Hand an extracted lead to the dealer's CRM adapter (identity merge happens there)."""
+    config = DIRECTORY.config(DIRECTORY.resolve(DEFAULT_DEALER_ID, dealer_id=dealer_id))
+    metadata = dict(metadata, dealer_id=config.dealer_id, dealer_name=config.dealer_name)
+    return DIRECTORY.crm_adapter(config.dealer_id).create_lead(lead, metadata).model_dump()
+
+
+def transcript_job(event: Dict, calls: Dict[str, Dict] | None = None) -> Dict:
+    """Job for one `ultravox_transcript` log event; older events get dealer/phone from the call records."""
+    call_id = event.get("call_id")
+    known = (calls or {}).get(call_id, {})
+    return {
+        "call_id": call_id,
+        "dealer_id": event.get("dealer_id") or known.get("dealer_id"),
+        "phone": normalize_phone(event.get("customer_phone") or known.get("phone")),
+        "messages": event.get("messages"),
+        "extractor": TRANSCRIPT_EXTRACTOR,
+    }
+
+
+class TranscriptPipeline:
+    """Post-call lead extraction: parsing on a process pool, CRM writes back in this process."""
+
+    def __init__(self, write_lead: Callable[[str | None, Lead, Dict], Dict] = write_lead, workers: int = TRANSCRIPT_WORKERS):
+        self.write_lead = write_lead
+        self.workers = workers
+        self._pool: ProcessPoolExecutor | None = None
+        self._lock = threading.Lock()
+
+    def pool(self) -> ProcessPoolExecutor:
+        with self._lock:
+            if self._pool is None:
+                # spawn: forking a threaded server process can deadlock the child.
+                self._pool = ProcessPoolExecutor(self.workers, mp_context=multiprocessing.get_context("spawn"))
+            return self._pool
+
+    def _discard(self, pool: ProcessPoolExecutor) -> None:
+        # A worker that died (OOM, segfault) breaks the whole pool; the next submit starts a fresh one.
+        with self._lock:
+            if self._pool is pool:
+                self._pool = None
+
+    def shutdown(self) -> None:
+        """Drop queued jobs and wait for the workers to exit, so no child process outlives the server."""
+        with self._lock:
+            pool, self._pool = self._pool, None
+        if pool is not None:
+            pool.shutdown(wait=True, cancel_futures=True)
+
+    def claim(self, call_id: str | None, force: bool = False) -> bool:
+        if not call_id:
+            return False
+        if force:
+            get_store().set("transcript_processed", call_id, True, ttl=PROCESSED_TTL)
+            return True
+        return get_store().add("transcript_processed", call_id, True, ttl=PROCESSED_TTL)
+
+    def release(self, call_id: str) -> None:
+        """Forget a claim whose extraction failed so the next backfill retries it."""
+        get_store().delete("transcript_processed", call_id)
+
+    def submit(self, job: Dict) -> Future | None:
+        """Queue one finished call; every call id is processed once across live traffic and backfills."""
+        if not self.claim(job.get("call_id")):
+            TRANSCRIPT_LEADS.inc(result="already_processed")
+            return None
+        pool = self.pool()
+        try:
+            future = pool.submit(extract_transcript, job)
+        except BrokenProcessPool:
+            self._discard(pool)
+            pool = self.pool()
+            future = pool.submit(extract_transcript, job)
+        future.add_done_callback(lambda done: self._on_done(done, pool, job["call_id"]))
+        return future
+
+    def _on_done(self, future: Future, pool: ProcessPoolExecutor, call_id: str) -> None:
+        try:
+            self.handle(future.result())
+        except Exception as exc:
+            if isinstance(exc, BrokenProcessPool):
+                self._discard(pool)
+            self.release(call_id)
+            TRANSCRIPT_LEADS.inc(result="error")
+
+    def handle(self, result: Dict) -> str:
+        TRANSCRIPT_EXTRACT_SECONDS.observe(result.get("elapsed_s", 0.0))
+        lead = build_lead(result)
+        if lead is None:
+            TRANSCRIPT_LEADS.inc(result="no_signal")
+            return "no_signal"
+        metadata = {"call_id": result["call_id"], "lead_source": "Call transcript", "channel": "voice"}
+        response = self.write_lead(result.get("dealer_id"), lead, metadata)
+        data = response.get("data") or {}
+        if not response.get("ok", True):
+            outcome = "error"
+        else:
+            outcome = "created" if data.get("created") else "updated" if data.get("changed") else "duplicate"
+        TRANSCRIPT_LEADS.inc(result=outcome)
+        return outcome
+
+    def backfill(
+        self,
+        log_path: Path | None = None,
+        force: bool = False,
+        limit: int | None = None,
+        progress: Callable[[Dict], None] | None = None,
+        chunk: int = 64,
+    ) -> Dict:
+        """Mine every transcript in the voice log in parallel; `progress` gets a snapshot as results land."""
+        calls, events = scan_voice_log(log_path or VOICE_LOG_PATH)
+        jobs = []
+        for event in events:
+            # Stop claiming once `limit` is reached: a claim marks the call done for PROCESSED_TTL.
+            if limit is not None and len(jobs) >= limit:
+                break
+            if self.claim(event.get("call_id"), force):
+                jobs.append(transcript_job(event, calls))
+        state = {"total": len(jobs), "done": 0, "created": 0, "updated": 0, "duplicate": 0, "no_signal": 0, "error": 0}
+        started = time.perf_counter()
+        pool = self.pool()
+        # Several transcripts per task keep the IPC overhead small next to the parsing.
+        batches = [jobs[i : i + chunk] for i in range(0, len(jobs), chunk)]
+        futures = {pool.submit(_extract_batch, batch): batch for batch in batches}
+        for future in as_completed(futures):
+            batch = futures[future]
+            try:
+                results = future.result()
+            except Exception as exc:
+                if isinstance(exc, BrokenProcessPool):
+                    self._discard(pool)
+                results = [{"call_id": job["call_id"], "failed": True} for job in batch]
+            for result in results:
+                try:
+                    if result.get("failed"):
+                        raise RuntimeError("extraction failed")
+                    state[self.handle(result)] += 1
+                except Exception:
+                    self.release(result["call_id"])
+                    state["error"] += 1
+                    TRANSCRIPT_LEADS.inc(result="error")
+            state["done"] += len(batch)
+            if progress is not None:
+                elapsed = time.perf_counter() - started
+                progress(dict(state, elapsed_s=round(elapsed, 2), per_s=round(state["done"] / elapsed, 1) if elapsed else None))
+        state["elapsed_s"] = round(time.perf_counter() - started, 2)
+        return state
+
+
+def _extract_batch(jobs: List[Dict]) -> List[Dict]:
+    return [extract_transcript(job) for job in jobs]
+
+
+def _iter_jsonl(path: Path) -> Iterator[Dict]:
+    if not path.exists():
+        return
+    with path.open() as fh:
+        for line in fh:
+            line = line.strip()
+            if line:
+                try:
+                    yield json.loads(line)
+                except ValueError:
+                    continue
+
+
+def scan_voice_log(path: Path) -> Tuple[Dict[str, Dict], List[Dict]]:
+    """One pass: call id -> {dealer_id, phone} from call records, plus every transcript event."""
+    calls: Dict[str, Dict] = {}
+    events: List[Dict] = []
+    for record in _iter_jsonl(path):
+        if record.get("event") == "ultravox_transcript":
+            events.append(record)
+            continue
+        call_id = record.get("call_id")
+        if not call_id:
+            continue
+        info = calls.setdefault(call_id, {})
+        if record.get("dealer_id"):
+            info["dealer_id"] = record["dealer_id"]
+        phone = record.get("from") if record.get("direction") != "outbound" else record.get("to")
+        if phone and normalize_phone(phone):
+            info["phone"] = phone
+    return calls, events
+
+
+def start_backfill(pipeline: TranscriptPipeline, force: bool = False, limit: int | None = None) -> str:
+    """Run a backfill on a background thread; progress is kept in the state store under its job id."""
+    job_id = uuid.uuid4().hex[:12]
+    started_at = datetime.utcnow().isoformat() + "Z"
+
+    def report(state: Dict) -> None:
+        get_store().set("transcript_backfill", job_id, dict(state, started_at=started_at), ttl=7 * 86400)
+
+    def run() -> None:
+        report({"status": "running"})
+        try:
+            state = pipeline.backfill(force=force, limit=limit, progress=lambda s: report(dict(s, status="running")))
+            report(dict(state, status="completed"))
+        except Exception as exc:
+            report({"status": "failed", "error": str(exc)})
+
+    threading.Thread(target=run, name=f"transcript-backfill-{job_id}", daemon=True).start()
+    return job_id
+
+
+def backfill_status(job_id: str) -> Dict | None:
+    return get_store().get("transcript_backfill", job_id)
+
+
+def main(argv: List[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description="Mine finished-call transcripts in the voice log for leads.")
+    parser.add_argument("--log", type=Path, default=VOICE_LOG_PATH)
+    parser.add_argument("--workers", type=int, default=TRANSCRIPT_WORKERS)
+    parser.add_argument("--force", action="store_true", help="Re-process calls that were already mined")
+    parser.add_argument("--limit", type=int)
+    args = parser.parse_args(argv)
+
+    def progress(state: Dict) -> None:
+        print(
+            f"\r{state['done']}/{state['total']} transcripts  created={state['created']} updated={state['updated']} "
+            f"duplicate={state['duplicate']} no_signal={state['no_signal']} error={state['error']}  {state['per_s']}/s",
+            end="",
+            file=sys.stderr,
+        )
+
+    pipeline = TranscriptPipeline(workers=args.workers)
+    try:
+        result = pipeline.backfill(args.log, force=args.force, limit=args.limit, progress=progress)
+    finally:
+        pipeline.shutdown()
+    print(file=sys.stderr)
+    print(json.dumps(result))
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -7,8 +7,12 @@ if [ ! -d "frontend/dist" ]; then
   exit 1
 fi
 
-# Start API (port 8000)
-uvicorn server:app --host 0.0.0.0 --port 8000 &
+# Start API (port 8000). With more than one worker, sessions / dedupe / call index live in SQLite.
+WEB_CONCURRENCY=${WEB_CONCURRENCY:-1}
+if [ "$WEB_CONCURRENCY" -gt 1 ]; then
+  export STATE_BACKEND=${STATE_BACKEND:-sqlite}
+fi
+uvicorn server:app --host 0.0.0.0 --port 8000 --workers "$WEB_CONCURRENCY" &
 
 # Start Streamlit (port 8501)
 streamlit run app.py --server.address 0.0.0.0 --server.port 8501 &
@@ -64,7 +64,10 @@ callBtn.onclick = async () => {
   }
   log("Calling...");
   try {
-    activeCall = await device.connect({ params: { To: "agent" } });
+    const dealerId = new URLSearchParams(window.location.search).get("dealer_id");
+    const params = { To: "agent" };
+    if (dealerId) params.dealer_id = dealerId;
+    activeCall = await device.connect({ params });
     activeCall.on("error", (err) => log("Call error: " + err.message));
     activeCall.on("accept", () => log("Call accepted"));
   } catch (err) {
@@ -1,21 +1,50 @@
 from __future__ import annotations
 
-import json
+import asyncio
+import functools
+import math
 import os
+import threading
+import time
 from datetime import datetime
 from pathlib import Path
 from typing import Dict
+from urllib.parse import quote
 
 import requests
 from dotenv import load_dotenv
 from fastapi import FastAPI, Request, Response
-from fastapi.responses import PlainTextResponse
+from fastapi.responses import JSONResponse, PlainTextResponse
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.staticfiles import StaticFiles
-from twilio.jwt.access_token import AccessToken
-from twilio.jwt.access_token.grants import VoiceGrant
 
-from core.config import load_dealer_config
+from core.campaigns import cancel_campaign, get_campaign, notify_call_ended, start_campaign
+from core.crm import create_lead_result, find_mock_leads, lookup_lead
+from core.deadline import INVENTORY_FOLLOW_UP, LEAD_FOLLOW_UP, arun_with_deadline, remaining
+from core.eventlog import EventLogWriter
+from core.federation import federated_search
+from core.idempotency import run_once
+from core.inventory import get_inventory_index, lookup_inventory, lookup_vin
+from core.metrics import (
+    CONTENT_TYPE as METRICS_CONTENT_TYPE,
+    EVENT_LOG_QUEUE_DEPTH,
+    FIRST_REQUEST_SECONDS,
+    HTTP_LATENCY,
+    HTTP_REQUESTS,
+    REGISTRY,
+    STARTUP_SECONDS,
+    TOOL_ERRORS,
+    TOOL_LATENCY,
+    UPSTREAM_ERRORS,
+    UPSTREAM_LATENCY,
+)
+from core.ratelimit import ADMISSION, ENABLED as RATE_LIMITS_ENABLED, Rejected
+from core.resilience import CircuitBreaker, LatencyTracker, hedged
+from core.orchestrator import _normalize_intent, _normalize_timeline, lead_hotness, route_lead
+from core.schema import DealershipConfig, InventoryQuery, Lead
+from core.stats import ensure_built as ensure_stats_built, record_voice_event, summarize as summarize_stats
+from core.tenancy import DEFAULT_DEALER_ID, DIRECTORY, UnknownDealer
+from core.transcripts import TranscriptPipeline, backfill_status, start_backfill, transcript_job
 
 load_dotenv()
 
@@ -37,7 +66,6 @@ app.add_middleware(
 
 ULTRAVOX_API_KEY = os.getenv("ULTRAVOX_API_KEY", "")
 ULTRAVOX_BASE_URL = os.getenv("ULTRAVOX_BASE_URL", "https://api.ultravox.ai/api")
-DEFAULT_DEALER_ID = os.getenv("DEFAULT_DEALER_ID", "demo_bmw")
 PUBLIC_BASE_URL = os.getenv("PUBLIC_BASE_URL", "").rstrip("/")
 API_BASE_PATH = os.getenv("API_BASE_PATH", "")
 TWILIO_ACCOUNT_SID = os.getenv("TWILIO_ACCOUNT_SID", "")
@@ -46,17 +74,301 @@ TWILIO_FROM_NUMBER = os.getenv("TWILIO_FROM_NUMBER", "")
 TWILIO_API_KEY_SID = os.getenv("TWILIO_API_KEY_SID", "")
 TWILIO_API_KEY_SECRET = os.getenv("TWILIO_API_KEY_SECRET", "")
 TWILIO_APP_SID = os.getenv("TWILIO_APP_SID", "")
-LOG_PATH = Path(__file__).resolve().parent / "data" / "voice_logs.jsonl"
+TWILIO_API_BASE_URL = os.getenv("TWILIO_API_BASE_URL", "https://api.twilio.com").rstrip("/")
+LOG_PATH = Path(
+    os.getenv("VOICE_LOG_PATH", Path(__file__).resolve().parent / "data" / "voice_logs.jsonl")
+)
+ULTRAVOX_CALL_DEADLINE_S = float(os.getenv("ULTRAVOX_CALL_DEADLINE_S", "4"))
+ULTRAVOX_BREAKER = CircuitBreaker(
+    "ultravox",
+    failure_threshold=int(os.getenv("ULTRAVOX_BREAKER_FAILURES", "5")),
+    reset_timeout=float(os.getenv("ULTRAVOX_BREAKER_RESET_S", "20")),
+)
+ULTRAVOX_CREATE_LATENCY = LatencyTracker()
+FALLBACK_TWIML = """<?xml version="1.0" encoding="UTF-8"?>
+<Response>
+  <Say>Sorry, we are having trouble connecting the assistant. Please try again.</Say>
+  <Hangup/>
+</Response>"""
+EVENT_LOG = EventLogWriter(LOG_PATH)
+EVENT_LOG_QUEUE_DEPTH.set_function(EVENT_LOG.depth)
+TRANSCRIPTS = TranscriptPipeline()
+STARTUP: Dict = {"ready": False, "warmup_s": None, "dealers": 0}
+_FIRST_REQUEST_ROUTES: set = set()
+
+
+@app.middleware("http")
+async def record_request_metrics(request: Request, call_next):
+    start = time.perf_counter()
+    status = 500
+    try:
+        response = await call_next(request)
+        status = response.status_code
+        return response
+    finally:
+        elapsed = time.perf_counter() - start
+        route = request.scope.get("route")
+        route_path = getattr(route, "path", None) or "unmatched"
+        HTTP_LATENCY.observe(elapsed, method=request.method, route=route_path)
+        HTTP_REQUESTS.inc(method=request.method, route=route_path, status=str(status))
+        if route_path not in _FIRST_REQUEST_ROUTES:
+            _FIRST_REQUEST_ROUTES.add(route_path)
+            FIRST_REQUEST_SECONDS.set(elapsed, route=route_path)
+
+
+@app.exception_handler(UnknownDealer)
+async def unknown_dealer(request: Request, exc: UnknownDealer):
+    # A dealer whose config file was removed after the request resolved it.
+    return JSONResponse({"error": str(exc)}, status_code=404)
+
+
+@app.on_event("startup")
+async def warm_up():
+    # Load everything a live call touches so the first tool call doesn't pay for parsing or imports.
+    start = time.perf_counter()
+    DIRECTORY.load()
+    dealer_ids = DIRECTORY.dealer_ids()
+    for dealer_id in dealer_ids:
+        config = DIRECTORY.config(dealer_id)
+        get_inventory_index(dealer_id).search(InventoryQuery())
+        DIRECTORY.crm_adapter(dealer_id)
+        call_payload_template(config)
+    Lead(intent=_normalize_intent("sales"), lead_type=lead_hotness(_normalize_timeline("asap"), None))
+    # Seed the dashboard counters before taking traffic, so live increments never race the scan.
+    await asyncio.to_thread(ensure_stats_built)
+    elapsed = time.perf_counter() - start
+    STARTUP_SECONDS.set(elapsed, phase="warmup")
+    STARTUP.update(ready=True, warmup_s=round(elapsed, 4), dealers=len(dealer_ids))
+
+
+@app.on_event("shutdown")
+async def flush_event_log():
+    EVENT_LOG.close()
+    TRANSCRIPTS.shutdown()
+
+
+def upstream_request(service: str, operation: str, method: str, url: str, **kwargs) -> requests.Response:
+    left = remaining()
+    if left is not None:
+        # Under a turn/tool deadline the socket timeout is whatever budget is left.
+        if left <= 0:
+            UPSTREAM_ERRORS.inc(service=service, operation=operation, reason="deadline")
+            raise requests.Timeout(f"{service} {operation}: deadline exceeded")
+        timeout = kwargs.get("timeout")
+        kwargs["timeout"] = left if not isinstance(timeout, (int, float)) else min(timeout, left)
+    start = time.perf_counter()
+    try:
+        resp = requests.request(method, url, **kwargs)
+    except requests.RequestException as exc:
+        UPSTREAM_ERRORS.inc(service=service, operation=operation, reason=type(exc).__name__)
+        raise
+    finally:
+        UPSTREAM_LATENCY.observe(time.perf_counter() - start, service=service, operation=operation)
+    if resp.status_code >= 400:
+        UPSTREAM_ERRORS.inc(service=service, operation=operation, reason=str(resp.status_code))
+    return resp
+
+
+def _log_ultravox_error(status, body: str) -> None:
+    log_event(
+        {
+            "timestamp": datetime.utcnow().isoformat() + "Z",
+            "event": "ultravox_error",
+            "status": status,
+            "body": body,
+        }
+    )
+
+
+def _delete_ultravox_call(resp: requests.Response) -> None:
+    # The losing copy of a hedged create still made a call; don't leave it dangling.
+    call_id = resp.json().get("callId") if resp.status_code < 400 else None
+    if not call_id:
+        return
+    threading.Thread(
+        target=lambda: upstream_request(
+            "ultravox", "delete_call", "DELETE", f"{ULTRAVOX_BASE_URL}/calls/{call_id}",
+            headers={"X-API-Key": ULTRAVOX_API_KEY}, timeout=10,
+        ),
+        daemon=True,
+    ).start()
+
+
+async def create_ultravox_call(payload: Dict) -> Dict | None:
+    """POST /calls within ULTRAVOX_CALL_DEADLINE_S, hedged after the recent p95, behind a circuit breaker.
+
+    Returns the call (callId / joinUrl) or None when the caller should get FALLBACK_TWIML.
+    """
+    if not ULTRAVOX_BREAKER.allow():
+        _log_ultravox_error("circuit_open", "Ultravox marked down; skipped call creation")
+        return None
+
+    def attempt() -> requests.Response:
+        start = time.perf_counter()
+        resp = upstream_request(
+            "ultravox",
+            "create_call",
+            "POST",
+            f"{ULTRAVOX_BASE_URL}/calls",
+            headers={
+                "Content-Type": "application/json",
+                "X-API-Key": ULTRAVOX_API_KEY,
+            },
+            json=payload,
+            timeout=ULTRAVOX_CALL_DEADLINE_S,
+        )
+        if resp.status_code < 400:
+            ULTRAVOX_CREATE_LATENCY.observe(time.perf_counter() - start)
+        return resp
+
+    try:
+        resp = await hedged(
+            "ultravox",
+            attempt,
+            ULTRAVOX_CALL_DEADLINE_S,
+            ULTRAVOX_CREATE_LATENCY.hedge_delay(),
+            is_good=lambda r: r.status_code < 400,
+            discard=_delete_ultravox_call,
+        )
+    except (requests.RequestException, TimeoutError) as exc:
+        ULTRAVOX_BREAKER.record_failure()
+        _log_ultravox_error("timeout", str(exc))
+        return None
+    except BaseException:
+        # Client disconnect (CancelledError) or a bug: no verdict on Ultravox, but free a half-open trial.
+        ULTRAVOX_BREAKER.release_trial()
+        raise
+    if resp.status_code >= 500 or resp.status_code == 429:
+        ULTRAVOX_BREAKER.record_failure()
+    else:
+        ULTRAVOX_BREAKER.record_success()
+    if resp.status_code >= 400:
+        _log_ultravox_error(resp.status_code, resp.text)
+        return None
+    return resp.json()
+
+
+def fallback_twiml() -> Response:
+    # no-store: a Twilio retry after a transient failure should try Ultravox again, not replay this.
+    return Response(content=FALLBACK_TWIML, media_type="text/xml", headers={"Cache-Control": "no-store"})
+
+
+def idempotent(route: str, key_for):
+    """Collapse webhook retries: the same key (CallSid / callId + event) gets the original response back."""
+
+    def decorator(handler):
+        @functools.wraps(handler)
+        async def wrapper(request: Request, *args, **kwargs):
+            key = await key_for(request)
+            if not key:
+                return await handler(request, *args, **kwargs)
+
+            async def compute() -> Dict:
+                result = await handler(request, *args, **kwargs)
+                if not isinstance(result, Response):
+                    result = JSONResponse(result)
+                return {
+                    "status_code": result.status_code,
+                    "media_type": result.media_type,
+                    "body": result.body.decode(),
+                    "cacheable": "no-store" not in result.headers.get("cache-control", ""),
+                }
+
+            snapshot = await run_once(route, key, compute)
+            return Response(
+                content=snapshot["body"], status_code=snapshot["status_code"], media_type=snapshot["media_type"]
+            )
+
+        return wrapper
+
+    return decorator
+
+
+async def _twilio_call_key(request: Request) -> str | None:
+    call_sid = (await request.form()).get("CallSid")
+    return f"twilio:{call_sid}:{request.url.path}" if call_sid else None
+
+
+async def _ultravox_event_key(request: Request) -> str | None:
+    payload = await request.json()
+    call_id = payload.get("callId")
+    return f"ultravox:{call_id}:{payload.get('event')}" if call_id else None
+
+
+def admitted(route: str, explicit_dealer: bool = False):
+    """Per-dealer token bucket + in-flight cap for a route class; over the limit gets an immediate 429.
+
+    The dealer is resolved once, before any tokens are spent, and handed to the handler as
+    `request.state.dealer_id`. With `explicit_dealer` the body's `dealer_id` is taken as is: an unknown
+    one is a 404 rather than a fallback to (and a charge against) the default dealer.
+    """
+
+    def decorator(handler):
+        @functools.wraps(handler)
+        async def wrapper(request: Request, *args, **kwargs):
+            body = await _request_body(request)
+            if explicit_dealer:
+                dealer_id = body.get("dealer_id", DEFAULT_DEALER_ID)
+                if not DIRECTORY.is_known(dealer_id):
+                    return JSONResponse({"error": f"Unknown dealer '{dealer_id}'"}, status_code=404)
+            else:
+                dealer_id = resolve_tool_dealer(request, body)
+            request.state.dealer_id = dealer_id
+            if not RATE_LIMITS_ENABLED:
+                return await handler(request, *args, **kwargs)
+            try:
+                admission = await ADMISSION.aadmit(DIRECTORY.config(dealer_id), route)
+            except Rejected as exc:
+                return JSONResponse(
+                    {"ok": False, "error": "rate_limited", "reason": exc.reason, "retry_after": round(exc.retry_after, 3)},
+                    status_code=429,
+                    headers={"Retry-After": str(max(1, math.ceil(exc.retry_after)))},
+                )
+            with admission:
+                return await handler(request, *args, **kwargs)
+
+        return wrapper
+
+    return decorator
+
+
+async def _request_body(request: Request) -> dict:
+    body = {}
+    if request.headers.get("content-type", "").startswith("application/json"):
+        try:
+            body = await request.json()
+        except ValueError:
+            body = {}
+    return body if isinstance(body, dict) else {}
 
 
 @app.get("/health")
 async def health():
-    return {"ok": True}
+    if not STARTUP["ready"]:
+        return JSONResponse({"ok": False, **STARTUP}, status_code=503)
+    return {"ok": True, **STARTUP}
+
+
+@app.get("/stats")
+async def stats(granularity: str = "day", dealer_id: str | None = None, since: str | None = None):
+    """Lead and call counts rolled up by dealer, intent, hotness, channel, direction and end reason."""
+    if granularity not in ("day", "hour"):
+        return JSONResponse({"error": "granularity must be 'day' or 'hour'"}, status_code=400)
+    return summarize_stats(granularity, dealer_id, since)
+
+
+@app.get("/metrics")
+async def metrics():
+    return Response(content=REGISTRY.render(), media_type=METRICS_CONTENT_TYPE)
 
 @app.get("/token")
-async def token(identity: str = "web_user"):
+@admitted("token")
+async def token(request: Request, identity: str = "web_user"):
     if not (TWILIO_ACCOUNT_SID and TWILIO_API_KEY_SID and TWILIO_API_KEY_SECRET and TWILIO_APP_SID):
         return PlainTextResponse("Missing Twilio API Key SID/Secret or TwiML App SID", status_code=500)
+    # Only the WebRTC dialer needs the Twilio JWT helpers; keep them off the startup path.
+    from twilio.jwt.access_token import AccessToken
+    from twilio.jwt.access_token.grants import VoiceGrant
 
     access_token = AccessToken(
         TWILIO_ACCOUNT_SID,
@@ -80,10 +392,11 @@ async def token(identity: str = "web_user"):
 
 
 @app.post("/twiml")
+@idempotent("twiml", _twilio_call_key)
 async def twiml(request: Request):
     form = await request.form()
     identity = form.get("Caller") or "web_user"
-    dealer_id = DEFAULT_DEALER_ID
+    dealer_id = DIRECTORY.resolve(DEFAULT_DEALER_ID, dealer_id=form.get("dealer_id"), number=form.get("To"))
     log_event(
         {
             "timestamp": datetime.utcnow().isoformat() + "Z",
@@ -93,84 +406,24 @@ async def twiml(request: Request):
         }
     )
 
-    config = load_dealer_config(dealer_id)
+    config = DIRECTORY.config(dealer_id)
     if not ULTRAVOX_API_KEY:
         return PlainTextResponse("Missing ULTRAVOX_API_KEY", status_code=500)
 
-    payload: Dict = {
-        "systemPrompt": (
-            f"You are DealSmart AI for {config.dealer_name}. "
-            "You are a polite dealership concierge. "
-            "Qualify intent, timeline, budget, and trade-in status. "
-            "Never invent inventory or pricing; ask to connect a human if unsure."
-        ),
-        "medium": {"twilio": {}},
-        "recordingEnabled": True,
-        "transcriptOptional": False,
-        "firstSpeakerSettings": {
-            "agent": {
-                "text": "Thanks for calling! Are you calling about sales or service today?"
-            }
-        },
-        "metadata": {
-            "dealer_id": config.dealer_id,
-            "caller": identity,
-            "source": "webrtc",
-        },
-    }
-    if PUBLIC_BASE_URL:
-        payload["selectedTools"] = build_temporary_tools(PUBLIC_BASE_URL)
-        base = f"{PUBLIC_BASE_URL}{API_BASE_PATH}"
-        payload["callbacks"] = {
-            "joined": {"url": f"{base}/ultravox/webhook"},
-            "ended": {"url": f"{base}/ultravox/webhook"},
-        }
+    payload = build_call_payload(
+        config,
+        {"dealer_id": config.dealer_id, "caller": identity, "source": "webrtc"},
+        INBOUND_FIRST_SPEAKER,
+    )
 
-    try:
-        resp = requests.post(
-            f"{ULTRAVOX_BASE_URL}/calls",
-            headers={
-                "Content-Type": "application/json",
-                "X-API-Key": ULTRAVOX_API_KEY,
-            },
-            json=payload,
-            timeout=30,
-        )
-    except requests.RequestException as exc:
-        log_event(
-            {
-                "timestamp": datetime.utcnow().isoformat() + "Z",
-                "event": "ultravox_error",
-                "status": "timeout",
-                "body": str(exc),
-            }
-        )
-        fallback = """<?xml version="1.0" encoding="UTF-8"?>
-<Response>
-  <Say>Sorry, we are having trouble connecting the assistant. Please try again.</Say>
-  <Hangup/>
-</Response>"""
-        return Response(content=fallback, media_type="text/xml")
-    if resp.status_code >= 400:
-        log_event(
-            {
-                "timestamp": datetime.utcnow().isoformat() + "Z",
-                "event": "ultravox_error",
-                "status": resp.status_code,
-                "body": resp.text,
-            }
-        )
-        fallback = """<?xml version="1.0" encoding="UTF-8"?>
-<Response>
-  <Say>Sorry, we are having trouble connecting the assistant. Please try again.</Say>
-  <Hangup/>
-</Response>"""
-        return Response(content=fallback, media_type="text/xml")
-    data = resp.json()
+    data = await create_ultravox_call(payload)
+    if data is None:
+        return fallback_twiml()
     join_url = data.get("joinUrl")
 
     if not join_url:
         return PlainTextResponse("Ultravox joinUrl missing", status_code=500)
+    DIRECTORY.remember_call(data.get("callId"), config.dealer_id)
 
     log_event(
         {
@@ -178,6 +431,8 @@ async def twiml(request: Request):
             "event": "ultravox_join_url",
             "join_url": join_url,
             "caller": identity,
+            "call_id": data.get("callId"),
+            "dealer_id": config.dealer_id,
         }
     )
 
@@ -190,6 +445,68 @@ async def twiml(request: Request):
     return Response(content=twiml, media_type="text/xml")
 
 
+INBOUND_FIRST_SPEAKER = {
+    "agent": {
+        "text": "Thanks for calling! Are you calling about sales or service today?"
+    }
+}
+_CALL_TEMPLATES: Dict[str, tuple] = {}
+
+
+def call_payload_template(config: DealershipConfig) -> Dict:
+    # Prompt, tools and callbacks only change with the dealer config, so build them once per config.
+    cached = _CALL_TEMPLATES.get(config.dealer_id)
+    if cached is not None and cached[0] is config:
+        return cached[1]
+    template: Dict = {
+        "systemPrompt": (
+            f"You are DealSmart AI for {config.dealer_name}. "
+            "You are a polite dealership concierge. "
+            "Qualify intent, timeline, budget, and trade-in status. "
+            "Never invent inventory or pricing; ask to connect a human if unsure."
+        ),
+        "medium": {"twilio": {}},
+        "recordingEnabled": True,
+        "transcriptOptional": False,
+    }
+    if PUBLIC_BASE_URL:
+        template["selectedTools"] = build_temporary_tools(PUBLIC_BASE_URL, config.dealer_id)
+        base = f"{PUBLIC_BASE_URL}{API_BASE_PATH}"
+        template["callbacks"] = {
+            "joined": {"url": f"{base}/ultravox/webhook"},
+            "ended": {"url": f"{base}/ultravox/webhook"},
+        }
+    _CALL_TEMPLATES[config.dealer_id] = (config, template)
+    return template
+
+
+def build_call_payload(config: DealershipConfig, metadata: Dict, first_speaker: Dict) -> Dict:
+    payload = dict(call_payload_template(config))
+    payload["firstSpeakerSettings"] = first_speaker
+    payload["metadata"] = metadata
+    return payload
+
+
+LEAD_CONTEXT_FIELDS = ("customer_name", "intent", "timeline", "budget_max", "vehicle_interest", "trade_in_vehicle")
+
+
+def add_lead_context(payload: Dict, config: DealershipConfig, phone: str | None) -> Dict:
+    """Brief the agent on a returning caller so it doesn't re-ask what an earlier SMS or call captured."""
+    record = lookup_lead(config.dealer_id, phone=phone)
+    if record is None:
+        return payload
+    known = ", ".join(
+        f"{field}={record['lead'][field]}" for field in LEAD_CONTEXT_FIELDS if record["lead"].get(field) not in (None, "")
+    )
+    last = record["history"][-1] if record["history"] else {}
+    payload["systemPrompt"] = (
+        f"{payload['systemPrompt']} Returning customer, last contact {last.get('at')} via {last.get('channel') or 'unknown'}. "
+        f"Already known: {known}. Confirm rather than re-ask these."
+    )
+    payload["metadata"]["lead_id"] = record["lead_id"]
+    return payload
+
+
 @app.get("/webrtc")
 async def webrtc_page():
     if FRONTEND_DIST.exists():
@@ -303,7 +620,10 @@ async def webrtc_page():
             log("Device.connect is undefined");
             return;
           }
-          activeCall = await device.connect({ params: { To: "agent" } });
+          const dealerId = new URLSearchParams(window.location.search).get("dealer_id");
+          const params = { To: "agent" };
+          if (dealerId) params.dealer_id = dealerId;
+          activeCall = await device.connect({ params });
           activeCall.on("error", (err) => log("Call error: " + err.message));
           activeCall.on("accept", () => log("Call accepted"));
         } catch (err) {
@@ -331,63 +651,35 @@ async def webrtc_page():
 
 
 @app.post("/incoming")
+@idempotent("incoming", _twilio_call_key)
 async def incoming(request: Request):
     form = await request.form()
     call_sid = form.get("CallSid")
     from_number = form.get("From")
+    to_number = form.get("To")
 
-    config = load_dealer_config(DEFAULT_DEALER_ID)
+    config = DIRECTORY.config(DIRECTORY.resolve(DEFAULT_DEALER_ID, number=to_number))
 
     if not ULTRAVOX_API_KEY:
         return PlainTextResponse("Missing ULTRAVOX_API_KEY", status_code=500)
 
-    payload: Dict = {
-        "systemPrompt": (
-            f"You are DealSmart AI for {config.dealer_name}. "
-            "You are a polite dealership concierge. "
-            "Qualify intent, timeline, budget, and trade-in status. "
-            "Never invent inventory or pricing; ask to connect a human if unsure."
-        ),
-        "medium": {"twilio": {}},
-        "recordingEnabled": True,
-        "transcriptOptional": False,
-        "firstSpeakerSettings": {
-            "agent": {
-                "text": "Thanks for calling! Are you calling about sales or service today?"
-            }
-        },
-        "metadata": {
-            "dealer_id": config.dealer_id,
-            "call_sid": call_sid,
-            "from": from_number,
-        },
-    }
-    if PUBLIC_BASE_URL:
-        payload["selectedTools"] = build_temporary_tools(PUBLIC_BASE_URL)
-        base = f"{PUBLIC_BASE_URL}{API_BASE_PATH}"
-        payload["callbacks"] = {
-            "joined": {"url": f"{base}/ultravox/webhook"},
-            "ended": {"url": f"{base}/ultravox/webhook"},
-        }
+    payload = build_call_payload(
+        config,
+        {"dealer_id": config.dealer_id, "call_sid": call_sid, "from": from_number, "to": to_number},
+        INBOUND_FIRST_SPEAKER,
+    )
+    add_lead_context(payload, config, from_number)
 
     # Note: Adjust endpoint/payload per Ultravox inbound quickstart if needed.
-    resp = requests.post(
-        f"{ULTRAVOX_BASE_URL}/calls",
-        headers={
-            "Content-Type": "application/json",
-            "X-API-Key": ULTRAVOX_API_KEY,
-        },
-        json=payload,
-        timeout=15,
-    )
-    if resp.status_code >= 400:
-        return PlainTextResponse(f"Ultravox error ({resp.status_code}): {resp.text}", status_code=500)
-    data = resp.json()
+    data = await create_ultravox_call(payload)
+    if data is None:
+        return fallback_twiml()
     join_url = data.get("joinUrl")
     call_id = data.get("callId")
 
     if not join_url:
         return PlainTextResponse("Ultravox joinUrl missing", status_code=500)
+    DIRECTORY.remember_call(call_id, config.dealer_id)
 
     twiml = f"""<?xml version=\"1.0\" encoding=\"UTF-8\"?>
 <Response>
@@ -401,6 +693,8 @@ async def incoming(request: Request):
             "timestamp": datetime.utcnow().isoformat() + "Z",
             "call_sid": call_sid,
             "from": from_number,
+            "to": to_number,
+            "dealer_id": config.dealer_id,
             "join_url": join_url,
             "call_id": call_id,
         }
@@ -409,46 +703,28 @@ async def incoming(request: Request):
     return Response(content=twiml, media_type="text/xml")
 
 
-@app.post("/outbound")
-async def outbound(request: Request):
-    body = await request.json()
-    to_number = body.get("to")
-    dealer_id = body.get("dealer_id", DEFAULT_DEALER_ID)
+class OutboundCallError(Exception):
+    def __init__(self, message: str, status_code: int = 500):
+        super().__init__(message)
+        self.status_code = status_code
+
 
+def place_outbound_call(config: DealershipConfig, to_number: str, metadata: Dict | None = None) -> Dict:
+    """Create the Ultravox call and have Twilio dial `to_number` into it (blocking; shared with campaigns)."""
     if not (TWILIO_ACCOUNT_SID and TWILIO_AUTH_TOKEN and TWILIO_FROM_NUMBER):
-        return PlainTextResponse("Missing Twilio credentials", status_code=500)
+        raise OutboundCallError("Missing Twilio credentials")
     if not ULTRAVOX_API_KEY:
-        return PlainTextResponse("Missing ULTRAVOX_API_KEY", status_code=500)
-    if not to_number:
-        return PlainTextResponse("Missing 'to' phone number", status_code=400)
+        raise OutboundCallError("Missing ULTRAVOX_API_KEY")
 
-    config = load_dealer_config(dealer_id)
-
-    payload: Dict = {
-        "systemPrompt": (
-            f"You are DealSmart AI for {config.dealer_name}. "
-            "You are a polite dealership concierge. "
-            "Qualify intent, timeline, budget, and trade-in status. "
-            "Never invent inventory or pricing; ask to connect a human if unsure."
-        ),
-        "medium": {"twilio": {}},
-        "recordingEnabled": True,
-        "transcriptOptional": False,
-        "firstSpeakerSettings": {"user": {}},
-        "metadata": {
-            "dealer_id": config.dealer_id,
-            "to": to_number,
-        },
-    }
-    if PUBLIC_BASE_URL:
-        payload["selectedTools"] = build_temporary_tools(PUBLIC_BASE_URL)
-        base = f"{PUBLIC_BASE_URL}{API_BASE_PATH}"
-        payload["callbacks"] = {
-            "joined": {"url": f"{base}/ultravox/webhook"},
-            "ended": {"url": f"{base}/ultravox/webhook"},
-        }
+    payload = build_call_payload(
+        config, {"dealer_id": config.dealer_id, "to": to_number, **(metadata or {})}, {"user": {}}
+    )
+    add_lead_context(payload, config, to_number)
 
-    resp = requests.post(
+    resp = upstream_request(
+        "ultravox",
+        "create_call",
+        "POST",
         f"{ULTRAVOX_BASE_URL}/calls",
         headers={
             "Content-Type": "application/json",
@@ -458,12 +734,13 @@ async def outbound(request: Request):
         timeout=15,
     )
     if resp.status_code >= 400:
-        return PlainTextResponse(f"Ultravox error ({resp.status_code}): {resp.text}", status_code=500)
+        raise OutboundCallError(f"Ultravox error ({resp.status_code}): {resp.text}")
     data = resp.json()
     join_url = data.get("joinUrl")
     call_id = data.get("callId")
     if not join_url:
-        return PlainTextResponse("Ultravox joinUrl missing", status_code=500)
+        raise OutboundCallError("Ultravox joinUrl missing")
+    DIRECTORY.remember_call(call_id, config.dealer_id)
 
     twiml = f"""<?xml version=\"1.0\" encoding=\"UTF-8\"?>
 <Response>
@@ -472,8 +749,11 @@ async def outbound(request: Request):
   </Connect>
 </Response>"""
 
-    twilio_resp = requests.post(
-        f"https://api.twilio.com/2010-04-01/Accounts/{TWILIO_ACCOUNT_SID}/Calls.json",
+    twilio_resp = upstream_request(
+        "twilio",
+        "create_call",
+        "POST",
+        f"{TWILIO_API_BASE_URL}/2010-04-01/Accounts/{TWILIO_ACCOUNT_SID}/Calls.json",
         auth=(TWILIO_ACCOUNT_SID, TWILIO_AUTH_TOKEN),
         data={
             "To": to_number,
@@ -489,11 +769,13 @@ async def outbound(request: Request):
         {
             "timestamp": datetime.utcnow().isoformat() + "Z",
             "direction": "outbound",
+            "dealer_id": config.dealer_id,
             "to": to_number,
             "from": TWILIO_FROM_NUMBER,
             "join_url": join_url,
             "call_id": call_id,
             "twilio_call_sid": twilio_data.get("sid"),
+            **({"campaign_id": metadata["campaign_id"]} if metadata and "campaign_id" in metadata else {}),
         }
     )
 
@@ -505,11 +787,106 @@ async def outbound(request: Request):
     }
 
 
+@app.post("/outbound")
+@admitted("outbound", explicit_dealer=True)
+async def outbound(request: Request):
+    body = await request.json()
+    to_number = body.get("to")
+
+    if not to_number:
+        return PlainTextResponse("Missing 'to' phone number", status_code=400)
+
+    config = DIRECTORY.config(request.state.dealer_id)
+    try:
+        return await asyncio.to_thread(place_outbound_call, config, to_number)
+    except OutboundCallError as exc:
+        return PlainTextResponse(str(exc), status_code=exc.status_code)
+
+
+@app.post("/campaigns")
+@admitted("outbound", explicit_dealer=True)
+async def create_campaign(request: Request):
+    """Dial a list of numbers, or the mock-CRM leads matching `crm_query`, under the dealer's pacing limits."""
+    body = await request.json()
+    config = DIRECTORY.config(request.state.dealer_id)
+
+    numbers = body.get("numbers") or []
+    crm_query = body.get("crm_query")
+    if crm_query is not None:
+        leads = find_mock_leads(
+            dealer_id=config.dealer_id,
+            intent=crm_query.get("intent"),
+            lead_type=crm_query.get("lead_type"),
+            older_than_days=crm_query.get("older_than_days"),
+            limit=crm_query.get("limit"),
+        )
+        # Older CRM lines may lack a phone; skip them rather than fail the whole campaign.
+        numbers = [*numbers, *(phone for lead in leads if (phone := lead.get("lead", {}).get("phone")))]
+    if not numbers:
+        return JSONResponse({"error": "Provide 'numbers' or a 'crm_query' that matches leads"}, status_code=400)
+
+    campaign = start_campaign(
+        config,
+        numbers,
+        place_outbound_call,
+        max_concurrent=body.get("max_concurrent"),
+        calls_per_second=body.get("calls_per_second"),
+        source={"crm_query": crm_query} if crm_query is not None else {"numbers": len(numbers)},
+    )
+    return JSONResponse(campaign.snapshot(), status_code=202)
+
+
+@app.get("/campaigns/{campaign_id}")
+async def campaign_status(campaign_id: str, details: bool = False):
+    snapshot = get_campaign(campaign_id, details)
+    if snapshot is None:
+        return JSONResponse({"error": "Campaign not found"}, status_code=404)
+    return snapshot
+
+
+@app.post("/campaigns/{campaign_id}/cancel")
+async def campaign_cancel(campaign_id: str):
+    if not cancel_campaign(campaign_id):
+        return JSONResponse({"error": "Campaign not found or already finished"}, status_code=404)
+    return {"ok": True, "id": campaign_id}
+
+
+@app.post("/leads/rescore")
+async def leads_rescore(full: bool = False):
+    """Fold new CRM log lines into the score table; `full=true` rescores every lead (e.g. to refresh age decay)."""
+    from core.scoring import rescore  # NumPy stays off the call-handling startup path
+
+    return await asyncio.to_thread(rescore, full)
+
+
+@app.get("/leads/scores")
+async def lead_scores(dealer_id: str | None = None, tier: str | None = None, limit: int = 25):
+    from core.scoring import top_scores
+
+    return {"leads": await asyncio.to_thread(top_scores, dealer_id, tier, min(max(limit, 0), 500))}
+
+
+@app.post("/transcripts/backfill")
+async def transcripts_backfill(force: bool = False, limit: int | None = None):
+    return {"job_id": start_backfill(TRANSCRIPTS, force=force, limit=limit)}
+
+
+@app.get("/transcripts/backfill/{job_id}")
+async def transcripts_backfill_status(job_id: str):
+    status = backfill_status(job_id)
+    if status is None:
+        return JSONResponse({"error": "Backfill job not found"}, status_code=404)
+    return status
+
+
 @app.get("/ultravox/calls/{call_id}/messages")
 async def ultravox_call_messages(call_id: str):
     if not ULTRAVOX_API_KEY:
         return PlainTextResponse("Missing ULTRAVOX_API_KEY", status_code=500)
-    resp = requests.get(
+    resp = upstream_request(
+        "ultravox",
+        "call_messages",
+        "GET",
         f"{ULTRAVOX_BASE_URL}/calls/{call_id}/messages",
         headers={"X-API-Key": ULTRAVOX_API_KEY},
         timeout=15,
@@ -523,7 +900,10 @@ async def ultravox_call_messages(call_id: str):
 async def ultravox_call_detail(call_id: str):
     if not ULTRAVOX_API_KEY:
         return PlainTextResponse("Missing ULTRAVOX_API_KEY", status_code=500)
-    resp = requests.get(
+    resp = upstream_request(
+        "ultravox",
+        "call_detail",
+        "GET",
         f"{ULTRAVOX_BASE_URL}/calls/{call_id}",
         headers={"X-API-Key": ULTRAVOX_API_KEY},
         timeout=15,
@@ -534,6 +914,7 @@ async def ultravox_call_detail(call_id: str):
 
 
 @app.post("/ultravox/webhook")
+@idempotent("ultravox_webhook", _ultravox_event_key)
 async def ultravox_webhook(request: Request):
     payload = await request.json()
     event = payload.get("event")
@@ -542,37 +923,58 @@ async def ultravox_webhook(request: Request):
         {
             "timestamp": datetime.utcnow().isoformat() + "Z",
             "event": "ultravox_webhook",
+            "dealer_id": DIRECTORY.dealer_for_call(call_id),
             "payload": payload,
         }
     )
     if event == "call.ended" and call_id:
+        notify_call_ended(call_id)
         try:
-            messages_resp = requests.get(
+            messages_resp = upstream_request(
+                "ultravox",
+                "call_messages",
+                "GET",
                 f"{ULTRAVOX_BASE_URL}/calls/{call_id}/messages",
                 headers={"X-API-Key": ULTRAVOX_API_KEY},
                 timeout=15,
             )
             if messages_resp.status_code < 400:
-                log_event(
-                    {
-                        "timestamp": datetime.utcnow().isoformat() + "Z",
-                        "event": "ultravox_transcript",
-                        "call_id": call_id,
-                        "messages": messages_resp.json(),
-                    }
-                )
+                metadata = (payload.get("call") or {}).get("metadata") or {}
+                event = {
+                    "timestamp": datetime.utcnow().isoformat() + "Z",
+                    "event": "ultravox_transcript",
+                    "call_id": call_id,
+                    "dealer_id": DIRECTORY.dealer_for_call(call_id) or metadata.get("dealer_id"),
+                    # Inbound calls carry the caller in "from"; outbound ones only the dialed "to".
+                    "customer_phone": metadata.get("from") or metadata.get("to"),
+                    "messages": messages_resp.json(),
+                }
+                log_event(event)
+                # Slot parsing runs on the worker pool; the CRM write lands from its done-callback.
+                TRANSCRIPTS.submit(transcript_job(event))
         except requests.RequestException:
             pass
     return {"ok": True}
 
 
-def build_temporary_tools(base_url: str) -> list[dict]:
+def build_temporary_tools(base_url: str, dealer_id: str = DEFAULT_DEALER_ID) -> list[dict]:
+    # The dealer rides along in the tool URL; the call id header lets the server fall back to its call index.
+    query = f"?dealer_id={quote(dealer_id)}"
+    call_id_header = {
+        "name": "X-Ultravox-Call-Id",
+        "location": "PARAMETER_LOCATION_HEADER",
+        "knownValue": "KNOWN_PARAM_CALL_ID",
+    }
     return [
         {"toolName": "hangUp"},
         {
             "temporaryTool": {
                 "modelToolName": "inventory_lookup",
-                "description": "Lookup vehicle inventory and availability.",
+                "description": (
+                    "Lookup vehicle inventory and availability. Returns a few vehicles plus counts by "
+                    "model/trim/price band when there are more; pass next_cursor as cursor for the next page. "
+                    "match is \"fuzzy\" when nothing matched exactly: offer those vehicles as close alternatives."
+                ),
                 "dynamicParameters": [
                     {
                         "name": "year",
@@ -598,9 +1000,80 @@ def build_temporary_tools(base_url: str) -> list[dict]:
                         "schema": {"type": "string"},
                         "required": False,
                     },
+                    {
+                        "name": "limit",
+                        "location": "PARAMETER_LOCATION_BODY",
+                        "schema": {"type": "integer", "minimum": 0, "maximum": 25},
+                        "required": False,
+                    },
+                    {
+                        "name": "cursor",
+                        "location": "PARAMETER_LOCATION_BODY",
+                        "schema": {"type": "string"},
+                        "required": False,
+                    },
+                    {
+                        "name": "fields",
+                        "location": "PARAMETER_LOCATION_BODY",
+                        "schema": {"type": "array", "items": {"type": "string"}},
+                        "required": False,
+                    },
+                    {
+                        "name": "summary",
+                        "location": "PARAMETER_LOCATION_BODY",
+                        "schema": {"type": "boolean"},
+                        "required": False,
+                    },
+                ],
+                "automaticParameters": [call_id_header],
+                "http": {
+                    "baseUrlPattern": f"{base_url}/tools/inventory_lookup{query}",
+                    "httpMethod": "POST",
+                },
+            }
+        },
+        {
+            "temporaryTool": {
+                "modelToolName": "group_inventory_lookup",
+                "description": (
+                    "Search sister stores in this dealer group when this store has no match. "
+                    "sort is price or distance."
+                ),
+                "dynamicParameters": [
+                    {"name": "year", "location": "PARAMETER_LOCATION_BODY", "schema": {"type": "integer"}, "required": False},
+                    {"name": "make", "location": "PARAMETER_LOCATION_BODY", "schema": {"type": "string"}, "required": False},
+                    {"name": "model", "location": "PARAMETER_LOCATION_BODY", "schema": {"type": "string"}, "required": False},
+                    {"name": "trim", "location": "PARAMETER_LOCATION_BODY", "schema": {"type": "string"}, "required": False},
+                    {
+                        "name": "sort",
+                        "location": "PARAMETER_LOCATION_BODY",
+                        "schema": {"type": "string", "enum": ["price", "distance"]},
+                        "required": False,
+                    },
+                    {"name": "limit", "location": "PARAMETER_LOCATION_BODY", "schema": {"type": "integer"}, "required": False},
+                ],
+                "automaticParameters": [call_id_header],
+                "http": {
+                    "baseUrlPattern": f"{base_url}/tools/group_inventory_lookup{query}",
+                    "httpMethod": "POST",
+                },
+            }
+        },
+        {
+            "temporaryTool": {
+                "modelToolName": "vin_lookup",
+                "description": "Look up one vehicle by VIN (full 17 characters or at least the last 8).",
+                "dynamicParameters": [
+                    {
+                        "name": "vin",
+                        "location": "PARAMETER_LOCATION_BODY",
+                        "schema": {"type": "string"},
+                        "required": True,
+                    }
                 ],
+                "automaticParameters": [call_id_header],
                 "http": {
-                    "baseUrlPattern": f"{base_url}/tools/inventory_lookup",
+                    "baseUrlPattern": f"{base_url}/tools/vin_lookup{query}",
                     "httpMethod": "POST",
                 },
             }
@@ -627,8 +1100,9 @@ def build_temporary_tools(base_url: str) -> list[dict]:
                     {"name": "email", "location": "PARAMETER_LOCATION_BODY", "schema": {"type": "string"}, "required": False},
                     {"name": "notes", "location": "PARAMETER_LOCATION_BODY", "schema": {"type": "string"}, "required": False},
                 ],
+                "automaticParameters": [call_id_header],
                 "http": {
-                    "baseUrlPattern": f"{base_url}/tools/create_lead",
+                    "baseUrlPattern": f"{base_url}/tools/create_lead{query}",
                     "httpMethod": "POST",
                 },
             }
@@ -645,8 +1119,9 @@ def build_temporary_tools(base_url: str) -> list[dict]:
                         "required": True,
                     }
                 ],
+                "automaticParameters": [call_id_header],
                 "http": {
-                    "baseUrlPattern": f"{base_url}/tools/route_lead",
+                    "baseUrlPattern": f"{base_url}/tools/route_lead{query}",
                     "httpMethod": "POST",
                 },
             }
@@ -655,49 +1130,134 @@ def build_temporary_tools(base_url: str) -> list[dict]:
 
 
 def log_event(event: dict) -> None:
-    LOG_PATH.parent.mkdir(parents=True, exist_ok=True)
-    LOG_PATH.write_text(
-        (LOG_PATH.read_text() if LOG_PATH.exists() else "")
-        + json.dumps(event)
-        + "\n"
+    EVENT_LOG.write(event)
+    record_voice_event(event)
+
+
+def timed_tool(tool: str):
+    def decorator(handler):
+        @functools.wraps(handler)
+        async def wrapper(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                result = await handler(*args, **kwargs)
+            except Exception:
+                TOOL_ERRORS.inc(tool=tool, channel="voice")
+                raise
+            finally:
+                TOOL_LATENCY.observe(time.perf_counter() - start, tool=tool, channel="voice")
+            if isinstance(result, dict) and result.get("ok") is False:
+                TOOL_ERRORS.inc(tool=tool, channel="voice")
+            return result
+
+        return wrapper
+
+    return decorator
+
+
+def resolve_tool_dealer(request: Request, body: dict) -> str:
+    return DIRECTORY.resolve(
+        DEFAULT_DEALER_ID,
+        dealer_id=request.query_params.get("dealer_id") or body.get("dealer_id"),
+        call_id=request.headers.get("X-Ultravox-Call-Id"),
     )
 
 
-@app.post("/tools/inventory_lookup")
-async def tool_inventory_lookup(request: Request):
-    body = await request.json()
+def log_tool_request(tool: str, request: Request, body: dict) -> None:
+    # The dealer query param and call-id header pick the dealer, so replay needs them as well as the body.
+    log_event(
+        {
+            "timestamp": datetime.utcnow().isoformat() + "Z",
+            "event": f"tool_{tool}",
+            "body": body,
+            "dealer_id": request.query_params.get("dealer_id"),
+            "call_id": request.headers.get("X-Ultravox-Call-Id"),
+        }
+    )
+
+
+def log_tool_result(tool: str, request: Request, body: dict, response: dict) -> dict:
+    # Paired with the request event by (dealer_id, body) so recorded traffic can be replayed and diffed (bench/replay.py).
     log_event(
         {
             "timestamp": datetime.utcnow().isoformat() + "Z",
-            "event": "tool_inventory_lookup",
+            "event": f"tool_{tool}_result",
             "body": body,
+            "dealer_id": request.query_params.get("dealer_id"),
+            "response": response,
         }
     )
+    return response
+
+
+@app.post("/tools/inventory_lookup")
+@admitted("tools")
+@timed_tool("inventory_lookup")
+async def tool_inventory_lookup(request: Request):
+    body = await request.json()
+    log_tool_request("inventory_lookup", request, body)
     year = body.get("year")
     make = body.get("make")
     model = body.get("model")
     trim = body.get("trim")
-    from core.inventory import search_inventory
-    from core.schema import InventoryQuery
-    results = search_inventory(InventoryQuery(year=year, make=make, model=model, trim=trim))
-    return {"count": len(results), "results": [r.model_dump() for r in results]}
+    dealer_id = request.state.dealer_id
+    page = await arun_with_deadline(
+        "inventory_lookup",
+        "voice",
+        lookup_inventory,
+        INVENTORY_FOLLOW_UP,
+        InventoryQuery(year=year, make=make, model=model, trim=trim),
+        dealer_id,
+        body.get("limit"),
+        body.get("cursor"),
+        body.get("fields"),
+        body.get("summary"),
+    )
+    return log_tool_result("inventory_lookup", request, body, page)
+
+
+@app.post("/tools/group_inventory_lookup")
+@admitted("tools")
+@timed_tool("group_inventory_lookup")
+async def tool_group_inventory_lookup(request: Request):
+    body = await request.json()
+    log_tool_request("group_inventory_lookup", request, body)
+    dealer_id = request.state.dealer_id
+    query = InventoryQuery(year=body.get("year"), make=body.get("make"), model=body.get("model"), trim=body.get("trim"))
+    result = await arun_with_deadline(
+        "group_inventory_lookup",
+        "voice",
+        federated_search,
+        dict(INVENTORY_FOLLOW_UP, shards={}),
+        query,
+        dealer_id,
+        body.get("sort") or "price",
+        body.get("limit"),
+    )
+    return log_tool_result("group_inventory_lookup", request, body, result)
+
+
+@app.post("/tools/vin_lookup")
+@admitted("tools")
+@timed_tool("vin_lookup")
+async def tool_vin_lookup(request: Request):
+    body = await request.json()
+    log_tool_request("vin_lookup", request, body)
+    dealer_id = request.state.dealer_id
+    result = await arun_with_deadline(
+        "vin_lookup", "voice", lookup_vin, dict(INVENTORY_FOLLOW_UP, match="none"), body.get("vin") or "", dealer_id
+    )
+    return log_tool_result("vin_lookup", request, body, result)
 
 
 @app.post("/tools/create_lead")
+@admitted("tools")
+@timed_tool("create_lead")
 async def tool_create_lead(request: Request):
     body = await request.json()
-    log_event(
-        {
-            "timestamp": datetime.utcnow().isoformat() + "Z",
-            "event": "tool_create_lead",
-            "body": body,
-        }
-    )
-    from core.crm import get_crm_adapter
-    from core.schema import Lead
-    from sms_agent.agent import _normalize_intent, _normalize_timeline, _lead_hotness
-    config = load_dealer_config(DEFAULT_DEALER_ID)
-    adapter = get_crm_adapter(config.crm.get("provider", "mock"))
+    log_tool_request("create_lead", request, body)
+    config = DIRECTORY.config(request.state.dealer_id)
+    adapter = DIRECTORY.crm_adapter(config.dealer_id)
     norm_intent = _normalize_intent(body.get("intent"))
     norm_timeline = _normalize_timeline(body.get("timeline"))
     lead = Lead(
@@ -712,16 +1272,16 @@ async def tool_create_lead(request: Request):
         phone=body.get("phone"),
         email=body.get("email"),
         notes=body.get("notes"),
-        lead_type=_lead_hotness(norm_timeline, body.get("budget_max")),
+        lead_type=lead_hotness(norm_timeline, body.get("budget_max")),
     )
     metadata = {
         "dealer_id": config.dealer_id,
         "dealer_name": config.dealer_name,
         "lead_source": config.crm.get("lead_source", "AI Concierge"),
+        "channel": "voice",
     }
-    try:
-        return adapter.create_lead(lead, metadata).model_dump()
-    except Exception as exc:
+
+    def log_error(exc: Exception) -> None:
         log_event(
             {
                 "timestamp": datetime.utcnow().isoformat() + "Z",
@@ -729,25 +1289,20 @@ async def tool_create_lead(request: Request):
                 "error": str(exc),
             }
         )
-        return {"ok": False, "message": f"create_lead failed: {exc}"}
+
+    # A slow CRM keeps writing in the background; the caller hears "we'll follow up" instead of dead air.
+    result = await arun_with_deadline(
+        "create_lead", "voice", create_lead_result, LEAD_FOLLOW_UP, adapter, lead, metadata, log_error
+    )
+    return log_tool_result("create_lead", request, body, result)
 
 
 @app.post("/tools/route_lead")
+@admitted("tools")
+@timed_tool("route_lead")
 async def tool_route_lead(request: Request):
     body = await request.json()
-    log_event(
-        {
-            "timestamp": datetime.utcnow().isoformat() + "Z",
-            "event": "tool_route_lead",
-            "body": body,
-        }
-    )
-    intent = body.get("intent", "sales")
-    config = load_dealer_config(DEFAULT_DEALER_ID)
-    routing = config.routing
-    queue = routing.get("nurture_queue")
-    if intent == "sales":
-        queue = routing.get("sales_queue")
-    elif intent == "service":
-        queue = routing.get("service_queue")
-    return {"queue": queue}
+    log_tool_request("route_lead", request, body)
+    dealer_id = request.state.dealer_id
+    config = DIRECTORY.config(dealer_id)
+    return log_tool_result("route_lead", request, body, route_lead(config.routing, body.get("intent", "sales")))
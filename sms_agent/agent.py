@@ -1,53 +1,45 @@
 from __future__ import annotations
 
+import contextvars
 import os
+import time
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeout
 from typing import Dict, List, Tuple
 
-from agents import Agent, Runner, function_tool
+from agents import Agent, ModelSettings, RunConfig, Runner, function_tool
+from openai import APITimeoutError
 
 from core.config import load_dealer_config
-from core.crm import get_crm_adapter
-from core.inventory import search_inventory
+from core.crm import create_lead_result, get_crm_adapter
+from core.deadline import (
+    INVENTORY_FOLLOW_UP,
+    LEAD_FOLLOW_UP,
+    SMS_TURN_DEADLINE_MS,
+    deadline,
+    remaining,
+    run_with_deadline,
+)
+from core.federation import federated_search
+from core.inventory import lookup_inventory, lookup_vin
+from core.metrics import SMS_MODEL_LATENCY, SMS_MODEL_TOKENS, SMS_MODEL_TURNS, TOOL_ERRORS, TOOL_LATENCY
+from core.store import get_store
 from core.schema import DealershipConfig, InventoryQuery, Lead, ToolResult
-from core.orchestrator import fallback_sms_turn
+from core.orchestrator import (
+    _normalize_intent,
+    _normalize_timeline,
+    fallback_sms_turn,
+    lead_hotness,
+    route_lead as route_lead_for_intent,
+)
+from core.tracing import span, start_trace
+from sms_agent.tiering import classify_turn, model_for
 
-_AGENTS: Dict[str, Agent] = {}
+# (dealer_id, tier) -> agent; tiers share instructions and tools and differ only in model.
+_AGENTS: Dict[Tuple[str, str], Agent] = {}
 _AGENT_CONFIG_HASH: Dict[str, str] = {}
-
-
-def _normalize_intent(raw: str) -> str:
-    text = (raw or "").lower()
-    if "service" in text:
-        return "service"
-    if "trade" in text:
-        return "trade_in"
-    return "sales"
-
-
-def _normalize_timeline(raw: str | None) -> str | None:
-    if not raw:
-        return None
-    text = raw.lower()
-    if any(x in text for x in ["asap", "now", "today", "this week", "next week"]):
-        return "asap"
-    if any(x in text for x in ["1-3", "few months", "next month"]):
-        return "1-3 months"
-    if any(x in text for x in ["3-6", "quarter"]):
-        return "3-6 months"
-    if any(x in text for x in ["later", "not sure", "someday"]):
-        return "later"
-    return None
-
-
-def _lead_hotness(timeline: str | None, budget_max: int | None) -> str:
-    if timeline == "asap":
-        return "urgent"
-    if timeline in {"1-3 months", "3-6 months"}:
-        return "medium"
-    if budget_max and budget_max >= 70000:
-        return "medium"
-    return "cold"
-_SESSIONS: Dict[str, dict] = {}
+SMS_TURN_TIMEOUT_REPLY = "Sorry for the wait! Let me have a specialist follow up with you shortly."
+# Model runs happen here so a turn can stop waiting at its deadline; the run itself winds down behind it.
+_MODEL_POOL = ThreadPoolExecutor(max_workers=int(os.getenv("SMS_MODEL_WORKERS", "8")), thread_name_prefix="sms-model")
 
 
 def _build_agent(config: DealershipConfig) -> Agent:
@@ -57,14 +49,45 @@ def _build_agent(config: DealershipConfig) -> Agent:
     def inventory_lookup(year: int | None = None,
                          make: str | None = None,
                          model: str | None = None,
-                         trim: str | None = None) -> Dict:
-        """Lookup inventory. Only use this tool to share availability or pricing."""
-        query = InventoryQuery(year=year, make=make, model=model, trim=trim)
-        results = search_inventory(query)
-        return {
-            "count": len(results),
-            "results": [item.model_dump() for item in results],
-        }
+                         trim: str | None = None,
+                         limit: int | None = None,
+                         cursor: str | None = None,
+                         fields: List[str] | None = None,
+                         summary: bool | None = None) -> Dict:
+        """Lookup inventory. Only use this tool to share availability or pricing.
+
+        Returns a few vehicles plus counts by model/trim/price band when there are more; narrow the
+        query, pass `next_cursor` as `cursor` for the next page, or limit `fields` (e.g. price, status).
+        """
+        with TOOL_LATENCY.time(tool="inventory_lookup", channel="sms"), span("tool.inventory_lookup"):
+            query = InventoryQuery(year=year, make=make, model=model, trim=trim)
+            return run_with_deadline(
+                "inventory_lookup", "sms", lookup_inventory, INVENTORY_FOLLOW_UP,
+                query, config.dealer_id, limit, cursor, fields, summary,
+            )
+
+    @function_tool
+    def vin_lookup(vin: str) -> Dict:
+        """Look up one vehicle by VIN (full 17 characters or at least the last 8), e.g. from a texted VIN or stock link."""
+        with TOOL_LATENCY.time(tool="vin_lookup", channel="sms"), span("tool.vin_lookup"):
+            return run_with_deadline(
+                "vin_lookup", "sms", lookup_vin, dict(INVENTORY_FOLLOW_UP, match="none"), vin, config.dealer_id
+            )
+
+    @function_tool
+    def group_inventory_lookup(year: int | None = None,
+                               make: str | None = None,
+                               model: str | None = None,
+                               trim: str | None = None,
+                               sort: str = "price",
+                               limit: int | None = None) -> Dict:
+        """Search sister stores in this dealer group too. Use when this store has no match; sort by "price" or "distance"."""
+        with TOOL_LATENCY.time(tool="group_inventory_lookup", channel="sms"), span("tool.group_inventory_lookup"):
+            query = InventoryQuery(year=year, make=make, model=model, trim=trim)
+            return run_with_deadline(
+                "group_inventory_lookup", "sms", federated_search, dict(INVENTORY_FOLLOW_UP, shards={}),
+                query, config.dealer_id, sort, limit,
+            )
 
     @function_tool
     def create_lead(intent: str,
@@ -78,41 +101,42 @@ def _build_agent(config: DealershipConfig) -> Agent:
                     phone: str | None = None,
                     email: str | None = None,
                     notes: str | None = None) -> Dict:
-        """Create or update a lead in the CRM."""
-        norm_intent = _normalize_intent(intent)
-        norm_timeline = _normalize_timeline(timeline)
-        lead = Lead(
-            intent=norm_intent,
-            timeline=norm_timeline,
-            budget_max=budget_max,
-            trade_in=trade_in,
-            trade_in_vehicle=trade_in_vehicle,
-            vehicle_interest=vehicle_interest,
-            contact_preference=contact_preference,
-            customer_name=customer_name,
-            phone=phone,
-            email=email,
-            notes=notes,
-            lead_type=_lead_hotness(norm_timeline, budget_max),
-        )
-        metadata = {
-            "dealer_id": config.dealer_id,
-            "dealer_name": config.dealer_name,
-            "lead_source": config.crm.get("lead_source", "AI Concierge"),
-        }
-        result = crm_adapter.create_lead(lead, metadata)
-        return result.model_dump()
+        """Create or update a lead in the CRM. Leads with the same phone or email are merged; the result includes prior history."""
+        with TOOL_LATENCY.time(tool="create_lead", channel="sms"), span("tool.create_lead"):
+            norm_intent = _normalize_intent(intent)
+            norm_timeline = _normalize_timeline(timeline)
+            lead = Lead(
+                intent=norm_intent,
+                timeline=norm_timeline,
+                budget_max=budget_max,
+                trade_in=trade_in,
+                trade_in_vehicle=trade_in_vehicle,
+                vehicle_interest=vehicle_interest,
+                contact_preference=contact_preference,
+                customer_name=customer_name,
+                phone=phone,
+                email=email,
+                notes=notes,
+                lead_type=lead_hotness(norm_timeline, budget_max),
+            )
+            metadata = {
+                "dealer_id": config.dealer_id,
+                "dealer_name": config.dealer_name,
+                "lead_source": config.crm.get("lead_source", "AI Concierge"),
+                "channel": "sms",
+            }
+            result = run_with_deadline(
+                "create_lead", "sms", create_lead_result, LEAD_FOLLOW_UP, crm_adapter, lead, metadata
+            )
+            if not result.get("ok"):
+                TOOL_ERRORS.inc(tool="create_lead", channel="sms")
+            return result
 
     @function_tool
     def route_lead(intent: str) -> Dict:
         """Return routing queue for intent."""
-        routing = config.routing
-        queue = routing.get("nurture_queue")
-        if intent == "sales":
-            queue = routing.get("sales_queue")
-        elif intent == "service":
-            queue = routing.get("service_queue")
-        return {"queue": queue}
+        with TOOL_LATENCY.time(tool="route_lead", channel="sms"), span("tool.route_lead"):
+            return route_lead_for_intent(config.routing, intent)
 
     instructions = f"""
 You are DealSmart AI, a dealership concierge for {config.dealer_name} ({config.brand}).
@@ -122,9 +146,13 @@ Goal: Qualify the customer and capture intent, timeline, budget, trade-in status
 Rules:
 - Ask 1 question at a time.
 - Keep qualification to the minimum needed: aim to capture intent + 2-3 key fields, then offer a handoff.
-- Do not invent inventory or pricing. Only share availability/pricing if you used inventory_lookup.
+- Do not invent inventory or pricing. Only share availability/pricing if you used inventory_lookup or vin_lookup.
+- If inventory_lookup returns match "fuzzy", nothing matched exactly: present the results as close alternatives.
+- If nothing matches here, use group_inventory_lookup to offer a unit at a sister store (say which store).
+- If the customer sends a VIN (or the last 8 characters of one) or a vehicle link, use vin_lookup.
 - If the customer asks for specifics you cannot verify, offer to connect a human specialist.
-- When you have enough details to create a lead, call create_lead.
+- When you have enough details to create a lead, call create_lead. If it returns history, the customer has
+  contacted us before: use what is already known instead of asking again.
 - Use route_lead once intent is clear and mention that you will connect them to the right team.
 Constraints:
 - For create_lead.intent use one of: sales, service, trade_in, nurture.
@@ -134,7 +162,7 @@ Constraints:
     return Agent(
         name="SMS Qualifier",
         instructions=instructions,
-        tools=[inventory_lookup, create_lead, route_lead],
+        tools=[inventory_lookup, group_inventory_lookup, vin_lookup, create_lead, route_lead],
     )
 
 
@@ -142,24 +170,32 @@ def _config_hash(config: DealershipConfig) -> str:
     return str(hash(config.model_dump_json()))
 
 
-def get_agent(dealer_id: str) -> Agent:
-    config = load_dealer_config(dealer_id)
+def get_agent(dealer_id: str, tier: str = "default", config: DealershipConfig | None = None) -> Agent:
+    config = config or load_dealer_config(dealer_id)
     cfg_hash = _config_hash(config)
-    if dealer_id not in _AGENTS or _AGENT_CONFIG_HASH.get(dealer_id) != cfg_hash:
-        _AGENTS[dealer_id] = _build_agent(config)
+    if _AGENT_CONFIG_HASH.get(dealer_id) != cfg_hash:
+        clear_agent_cache(dealer_id)
+        _AGENTS[(dealer_id, "default")] = _build_agent(config)
         _AGENT_CONFIG_HASH[dealer_id] = cfg_hash
-    return _AGENTS[dealer_id]
+    agent = _AGENTS.get((dealer_id, tier))
+    if agent is None:
+        agent = _AGENTS[(dealer_id, "default")].clone(model=model_for(config, tier))
+        _AGENTS[(dealer_id, tier)] = agent
+    return agent
 
 
 def clear_agent_cache(dealer_id: str) -> None:
-    _AGENTS.pop(dealer_id, None)
+    for key in [key for key in _AGENTS if key[0] == dealer_id]:
+        _AGENTS.pop(key, None)
     _AGENT_CONFIG_HASH.pop(dealer_id, None)
 
 
 def get_session(session_id: str) -> dict:
-    if session_id not in _SESSIONS:
-        _SESSIONS[session_id] = {}
-    return _SESSIONS[session_id]
+    return get_store().get_session(session_id)
+
+
+def save_session(session_id: str, state: dict) -> None:
+    get_store().save_session(session_id, state)
 
 
 def run_sms_turn(
@@ -168,21 +204,76 @@ def run_sms_turn(
     session_id: str,
     state: Dict | None = None,
     history: List[Dict] | None = None,
+) -> Tuple[str, Dict]:
+    # Callers that don't carry their own state get it from the shared store, so any worker can take the turn.
+    persist = state is None
+    if persist:
+        state = get_session(session_id)
+    with start_trace("sms_turn", dealer_id=dealer_id, session_id=session_id) as root, deadline(SMS_TURN_DEADLINE_MS):
+        reply, trace = _run_sms_turn(message, dealer_id, state, history)
+    if persist and "state" in trace:
+        save_session(session_id, trace["state"])
+    if root.exported is not None:
+        trace["trace_id"] = root.trace_id
+        trace["spans"] = root.exported
+    return reply, trace
+
+
+def _run_sms_turn(
+    message: str,
+    dealer_id: str,
+    state: Dict | None,
+    history: List[Dict] | None,
 ) -> Tuple[str, Dict]:
     if not os.getenv("OPENAI_API_KEY"):
         state = state or {}
-        reply, lead = fallback_sms_turn(state, message)
+        with span("fallback_sms_turn"):
+            reply, lead = fallback_sms_turn(state, message)
         return reply, {"lead": lead.model_dump(), "note": "Fallback mode (no OPENAI_API_KEY set).", "state": state}
 
-    agent = get_agent(dealer_id)
+    config = load_dealer_config(dealer_id)
+    history = history or []
+    tier, reason = classify_turn(config, message, history)
+    model = model_for(config, tier)
+    agent = get_agent(dealer_id, tier, config)
+    SMS_MODEL_TURNS.inc(dealer_id=dealer_id, tier=tier, reason=reason)
     # The current Agents SDK Session is a Protocol in some versions.
     # Use stateless runs for compatibility.
-    history = history or []
     history_text = "\n".join(
         [f"{m['role'].upper()}: {m['content']}" for m in history[-12:]]
     )
     full_input = f"{history_text}\nUSER: {message}".strip()
-    result = Runner.run_sync(agent, input=full_input)
+    with span("llm.run", agent=agent.name, tier=tier, model=model or "default", reason=reason) as llm_span:
+        start = time.perf_counter()
+        # The model gets what is left of the turn: each request is capped at it, and the turn stops
+        # waiting once it is spent (client retries could otherwise run past it).
+        left = remaining(SMS_TURN_DEADLINE_MS / 1000)
+        llm_span.set(budget_ms=round(left * 1000, 1))
+        result = None
+        if left > 0:
+            run_config = RunConfig(model_settings=ModelSettings(extra_args={"timeout": left}))
+            future = _MODEL_POOL.submit(
+                contextvars.copy_context().run, Runner.run_sync, agent, full_input, run_config=run_config
+            )
+            try:
+                result = future.result(timeout=left)
+            except (FutureTimeout, APITimeoutError):
+                future.cancel()
+        if result is None:
+            llm_span.set(timed_out=True)
+            SMS_MODEL_LATENCY.observe(time.perf_counter() - start, tier=tier)
+            return SMS_TURN_TIMEOUT_REPLY, {"output": SMS_TURN_TIMEOUT_REPLY, "timed_out": True, "model": {"tier": tier}}
+        elapsed = time.perf_counter() - start
+        usage = result.context_wrapper.usage
+        llm_span.set(
+            items=len(getattr(result, "new_items", []) or []),
+            requests=usage.requests,
+            input_tokens=usage.input_tokens,
+            output_tokens=usage.output_tokens,
+        )
+    SMS_MODEL_LATENCY.observe(elapsed, tier=tier)
+    SMS_MODEL_TOKENS.inc(usage.input_tokens, tier=tier, kind="input")
+    SMS_MODEL_TOKENS.inc(usage.output_tokens, tier=tier, kind="output")
     output_text = result.final_output or ""
 
     new_items = getattr(result, "new_items", []) or []
@@ -202,5 +293,14 @@ def run_sms_turn(
         "output": output_text,
         "new_items": [item.__class__.__name__ for item in new_items],
         "tool_calls": tool_calls,
+        "model": {
+            "tier": tier,
+            "model": model or "default",
+            "reason": reason,
+            "latency_ms": round(elapsed * 1000, 1),
+            "requests": usage.requests,
+            "input_tokens": usage.input_tokens,
+            "output_tokens": usage.output_tokens,
+        },
     }
     return output_text, trace
@@ -0,0 +1,50 @@
+from __future__ import annotations
+
+import re
+from typing import Dict, List, Tuple
+
+from core.schema import DealershipConfig
+
+# Turns that will likely need tools (inventory, pricing, VINs, sister stores) or careful negotiation.
+_STRONG_HINTS = re.compile(
+    r"\b(price|pricing|cost|how much|msrp|otd|out the door|discount|deal|negotiat\w*|offer|lease|financ\w*|apr|"
+    r"payment|monthly|in stock|stock|available|availability|inventory|vin|compare|versus|vs|other store|"
+    r"sister store|nearby|color|colors|trim|trims|options|package)\b",
+    re.I,
+)
+# A link, a full VIN, or the last 8 of one (must contain a digit, so plain words don't match).
+_VIN_OR_LINK = re.compile(r"https?://|\b(?=[A-Z]*\d)(?:[A-HJ-NPR-Z0-9]{17}|[A-HJ-NPR-Z0-9]{8})\b", re.I)
+
+DEFAULT_LONG_CONTEXT_TURNS = 8
+DEFAULT_LONG_MESSAGE_CHARS = 400
+
+
+def tiering_enabled(config: DealershipConfig) -> bool:
+    return bool(config.models.get("fast") and config.models.get("strong"))
+
+
+def classify_turn(config: DealershipConfig, message: str, history: List[Dict] | None = None) -> Tuple[str, str]:
+    """Pick the model tier for one SMS turn with cheap string checks: (tier, reason).
+
+    Without a `models` block in the dealer config every turn runs on the SDK default model.
+    """
+    if not tiering_enabled(config):
+        return "default", "tiering_off"
+    models = config.models
+    history = history or []
+    if _VIN_OR_LINK.search(message):
+        return "strong", "vin_or_link"
+    if _STRONG_HINTS.search(message):
+        return "strong", "tool_intent"
+    if len(message) >= int(models.get("long_message_chars", DEFAULT_LONG_MESSAGE_CHARS)):
+        return "strong", "long_message"
+    if len(history) >= int(models.get("long_context_turns", DEFAULT_LONG_CONTEXT_TURNS)):
+        return "strong", "long_context"
+    return "fast", "routine"
+
+
+def model_for(config: DealershipConfig, tier: str) -> str | None:
+    """Model name for a tier; None means the SDK default."""
+    if tier == "default":
+        return None
+    return config.models.get(tier)